@@ -0,0 +1,130 @@
+"""
+Vectorized bounding box operations for parking space detection
+Boxes are (N, 4) arrays of x1, y1, x2, y2
+"""
+import numpy as np
+
+
+def to_numpy(values):
+    """Return a NumPy array from a NumPy array or a (possibly GPU) torch tensor"""
+    if hasattr(values, 'cpu'):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+def as_boxes(boxes):
+    """Return boxes as a float32 (N, 4) array"""
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def rects_to_boxes(rects):
+    """Convert (N, 4) x, y, width, height rectangles to x1, y1, x2, y2 boxes"""
+    rects = as_boxes(rects)
+    return np.concatenate([rects[:, :2], rects[:, :2] + rects[:, 2:]], axis=1)
+
+
+def box_area(boxes):
+    boxes = as_boxes(boxes)
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def intersection_matrix(boxes_a, boxes_b):
+    """Return the (N, M) intersection areas of every pair of boxes"""
+    # Contiguous coordinate columns broadcast much faster than strided (N, 4) slices
+    a = np.ascontiguousarray(as_boxes(boxes_a).T)[:, :, None]
+    b = np.ascontiguousarray(as_boxes(boxes_b).T)[:, None, :]
+    w = np.minimum(a[2], b[2])
+    w -= np.maximum(a[0], b[0])
+    h = np.minimum(a[3], b[3])
+    h -= np.maximum(a[1], b[1])
+    np.maximum(w, 0, out=w)
+    np.maximum(h, 0, out=h)
+    w *= h
+    return w
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Return the (N, M) intersection-over-union of every pair of boxes"""
+    inter = intersection_matrix(boxes_a, boxes_b)
+    union = box_area(boxes_a)[:, None] + box_area(boxes_b)[None, :]
+    union -= inter
+    # Degenerate pairs have no intersection, so any positive union leaves them at 0
+    np.maximum(union, np.finfo(np.float32).tiny, out=union)
+    inter /= union
+    return inter
+
+
+def best_matches(boxes_a, boxes_b):
+    """Return, for every box in boxes_a, the index of the boxes_b box it overlaps most and that IoU
+
+    Boxes without any overlap get index -1 and IoU 0.
+    """
+    iou = iou_matrix(boxes_a, boxes_b)
+    if iou.shape[1] == 0:
+        return np.full(len(iou), -1, dtype=np.int64), np.zeros(len(iou), dtype=np.float32)
+    best = iou.argmax(axis=1)
+    best_iou = iou[np.arange(len(iou)), best]
+    best[best_iou <= 0] = -1
+    return best, best_iou
+
+
+def take_matched(values, index, fill):
+    """Return values[index] where index >= 0 and fill where it is -1, as from best_matches"""
+    values = np.asarray(values)
+    out = np.full(len(index), fill, dtype=values.dtype)
+    matched = index >= 0
+    out[matched] = values[index[matched]]
+    return out
+
+
+def intersection_over_smaller(boxes_a, boxes_b):
+    """Return the (N, M) intersection divided by the smaller box area of every pair"""
+    inter = intersection_matrix(boxes_a, boxes_b)
+    smaller = np.minimum(box_area(boxes_a)[:, None], box_area(boxes_b)[None, :])
+    np.maximum(smaller, np.finfo(np.float32).tiny, out=smaller)
+    inter /= smaller
+    return inter
+
+
+def nms(boxes, scores, iou_threshold, classes=None):
+    """Return the indices of the boxes kept by greedy non-maximum suppression, best first
+
+    With classes, only boxes of the same class suppress each other.
+    """
+    return merge_nms(boxes, scores, iou_threshold, classes)[0]
+
+
+def merge_nms(boxes, scores, iou_threshold, classes=None, containment_threshold=None):
+    """Greedy non-maximum suppression that can grow each kept box over the boxes it suppresses
+
+    Returns (indices kept best first, their merged boxes). containment_threshold also
+    suppresses pairs where one box lies mostly inside the other, such as a car truncated
+    at a tile edge next to its full detection; the merged box then covers both.
+    """
+    boxes = as_boxes(boxes)
+    order = np.argsort(-np.asarray(scores, dtype=np.float32), kind='stable')
+    boxes = boxes[order]
+    if classes is not None:
+        classes = np.asarray(classes)[order]
+
+    overlap = iou_matrix(boxes, boxes) > iou_threshold
+    if containment_threshold is not None:
+        overlap |= intersection_over_smaller(boxes, boxes) > containment_threshold
+    if classes is not None:
+        overlap &= classes[:, None] == classes[None, :]
+
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep, merged = [], []
+    for i in range(len(boxes)):
+        if suppressed[i]:
+            continue
+        group = overlap[i] & ~suppressed
+        group[i] = True
+        suppressed |= group
+        keep.append(i)
+        if containment_threshold is None:
+            merged.append(boxes[i])
+        else:
+            members = boxes[group]
+            merged.append(np.concatenate([members[:, :2].min(axis=0), members[:, 2:].max(axis=0)]))
+    return order[keep], np.array(merged, dtype=np.float32).reshape(-1, 4)
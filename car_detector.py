@@ -1,12 +1,13 @@
-from ultralytics import YOLO
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import os
+import threading
+import time
 import config
 import logging
+from box_ops import rects_to_boxes, best_matches, to_numpy
+from tiled_detection import TiledDetector, layout_region
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,30 +15,91 @@ logger = logging.getLogger(__name__)
 
 class CarDetector:
     def __init__(self):
-        """Initialize the car detector with YOLOv8 model"""
-        # Load YOLOv8 model
-        logger.info(f"Loading YOLOv8 model from {config.MODEL_PATH}...")
+        """Initialize the car detector; the YOLOv8 model is loaded on first use"""
+        self._model = None
+        self._tiled = None
+        self._model_lock = threading.Lock()
+        self._warmup_thread = None
+        self.load_seconds = None  # Time spent importing ultralytics and loading the model
+
+        self.car_classes = config.CAR_CLASSES
+        self.confidence_threshold = config.CONFIDENCE_THRESHOLD
+
+    @property
+    def model(self):
+        """The YOLOv8 model, imported and loaded on first access"""
+        with self._model_lock:
+            if self._model is None:
+                self._model = self._load_model()
+            return self._model
+
+    @property
+    def tiled(self):
+        """The tiled detector around the model, or None unless TILED_DETECTION is enabled"""
+        if config.TILED_DETECTION and self._tiled is None:
+            self._tiled = TiledDetector(self.model)
+        return self._tiled
+
+    def _load_model(self):
+        logger.info(f"Loading YOLOv8 model from {config.MODEL_PATH} ({config.INFERENCE_BACKEND} backend)...")
         print(f"Loading YOLOv8 model...")
+        started = time.perf_counter()
         try:
-            self.model = YOLO(config.MODEL_PATH)
-            logger.info("YOLOv8 model loaded successfully!")
-            print("✓ Model loaded successfully!")
+            # Importing ultralytics pulls in torch, so it waits until the model is needed
+            from inference_backend import load_model
+            model = load_model()
         except Exception as e:
             logger.error(f"Error loading YOLO model: {e}")
             raise IOError(f"Failed to load YOLO model from {config.MODEL_PATH}: {e}")
+        self.load_seconds = time.perf_counter() - started
+        logger.info(f"YOLOv8 model loaded successfully in {self.load_seconds:.2f} s!")
+        print("✓ Model loaded successfully!")
+        return model
 
-        self.car_classes = config.CAR_CLASSES
-        self.confidence_threshold = config.CONFIDENCE_THRESHOLD
-        
-    def detect_cars(self, image):
-        """Run YOLOv8 inference on image to detect vehicles"""
+    def warm_up(self, background=True):
+        """Load the model and run one dummy inference so the first real detection is fast
+
+        With background=True this happens on a daemon thread and the call returns at once.
+        """
+        def run():
+            try:
+                self.model(np.zeros((64, 64, 3), dtype=np.uint8), conf=self.confidence_threshold, verbose=False)
+                logger.info("YOLOv8 model warmed up")
+            except Exception as e:
+                logger.error(f"Error warming up YOLO model: {e}")
+
+        if not background:
+            run()
+        elif self._warmup_thread is None:
+            self._warmup_thread = threading.Thread(target=run, name='model-warmup', daemon=True)
+            self._warmup_thread.start()
+
+    def detect_cars(self, image, rects=None):
+        """Run YOLOv8 inference on image to detect vehicles
+
+        In tiled mode, rects (the layout's (N, 4) x, y, width, height) limits the search to
+        the layout's bounding region.
+        """
         try:
+            if self.tiled is not None:
+                return self.tiled.detect(image, layout_region(rects, image.shape) if rects is not None else None)
             results = self.model(image, conf=self.confidence_threshold)
             return results[0]
         except Exception as e:
             logger.error(f"Error during vehicle detection: {e}")
             raise
 
+    def vehicle_boxes(self, results):
+        """Return (boxes, classes, confidences) arrays of the vehicle detections in YOLO results"""
+        boxes = results.boxes
+        if boxes is None or len(boxes) == 0:
+            return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        xyxy = to_numpy(boxes.xyxy).astype(np.float32)
+        classes = to_numpy(boxes.cls).astype(np.int64)
+        confidences = to_numpy(boxes.conf).astype(np.float32)
+        keep = np.isin(classes, self.car_classes)
+        return xyxy[keep], classes[keep], confidences[keep]
+
     def detect_special_parking(self, image, x, y, width, height):
         """Detect if a parking space has special marking (e.g., yellow lines for disabled parking)"""
         # Extract the parking space region
@@ -98,35 +160,26 @@ class CarDetector:
     
     def process_detections(self, results, parking_spaces, image):
         """Process YOLO detection results and match them with parking spaces"""
-        # Get bounding boxes for detected vehicles
         detections = []
         space_status = []
+        width, height = config.PARKING_WIDTH, config.PARKING_HEIGHT  # Standard parking space dimensions
 
-        for pos in parking_spaces:
-            x, y = pos
-            width, height = config.PARKING_WIDTH, config.PARKING_HEIGHT  # Standard parking space dimensions
-            
+        # Match every space to its best-overlapping vehicle box in one vectorized step
+        boxes, classes, confidences = self.vehicle_boxes(results)
+        positions = [tuple(pos) for pos in parking_spaces]
+        space_boxes = rects_to_boxes([(x, y, width, height) for x, y in positions])
+        best, _ = best_matches(space_boxes, boxes)
+
+        for (x, y), match in zip(positions, best.tolist()):
             # Check if it's a special parking space
             is_special = self.detect_special_parking(image, x, y, width, height)
             
             # Check occupancy
             is_occupied = self.check_space_occupancy(image, x, y, width, height)
             
-            # Check for vehicle detection in this space
-            vehicle_detected = False
-            vehicle_type = None
-            confidence = 0
-            
-            for box in results.boxes:
-                if int(box.cls) in self.car_classes:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    # Check if the detected vehicle overlaps with this parking space
-                    if (x1 < x + width and x2 > x and 
-                        y1 < y + height and y2 > y):
-                        vehicle_detected = True
-                        vehicle_type = int(box.cls)
-                        confidence = float(box.conf[0])
-                        break
+            vehicle_detected = match >= 0
+            vehicle_type = int(classes[match]) if vehicle_detected else None
+            confidence = float(confidences[match]) if vehicle_detected else 0
             
             space_status.append({
                 'position': (x, y),
@@ -149,6 +202,12 @@ class CarDetector:
     
     def generate_report(self, image, parking_spaces, detections, space_status, output_dir=None):
         """Generate comprehensive visual and text reports for parking lot analysis"""
+        # Plotting is only needed for reports, so matplotlib is imported here. Reports are only
+        # saved to files, possibly from the report thread, so no GUI backend is needed
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
         # Use config directory if not specified
         if output_dir is None:
             output_dir = config.REPORTS_DIR
@@ -0,0 +1,99 @@
+"""
+Per-space change gating for parking space detection
+Flags only the spaces whose content moved since they were last classified
+"""
+import cv2
+import numpy as np
+import config
+
+
+class ChangeGate:
+    def __init__(self, scale=config.CHANGE_GATE_SCALE, threshold=config.CHANGE_GATE_THRESHOLD,
+                 refresh_interval=config.CHANGE_GATE_REFRESH_FRAMES):
+        """Initialize the gate with its downsampling factor, change threshold and refresh interval"""
+        self.scale = scale
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.rects = np.empty((0, 4), dtype=np.int64)
+        self.changed = np.zeros(0, dtype=bool)  # Spaces whose content moved on the last update
+        self._small = None
+        self._gray = None
+        self._diff = None
+        self._integral = None
+        self.reset()
+
+    def set_layout(self, rects):
+        """Set the (x, y, w, h) rectangles to watch; every space is reclassified next frame"""
+        self.rects = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+        self.reset()
+
+    def reset(self):
+        """Forget all reference patches"""
+        self.reference = None
+        # Stagger forced refreshes so they do not all land on the same frame
+        self.age = np.arange(len(self.rects)) % max(1, self.refresh_interval)
+        self.changed = np.zeros(len(self.rects), dtype=bool)
+
+    def _downsample(self, frame):
+        """Write a downsampled grayscale copy of the frame into reused buffers"""
+        h, w = frame.shape[:2]
+        size = (max(1, w // self.scale), max(1, h // self.scale))
+        small_shape = size[::-1] + frame.shape[2:]
+        if self._small is None or self._small.shape != small_shape:
+            self._small = np.empty(small_shape, dtype=np.uint8)
+            self._gray = np.empty(size[::-1], dtype=np.uint8)
+            self._diff = np.empty(size[::-1], dtype=np.uint8)
+            self._integral = np.empty((size[1] + 1, size[0] + 1), dtype=np.int32)
+            self.reference = None
+
+        cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        if frame.ndim == 2:
+            np.copyto(self._gray, self._small)
+        else:
+            code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            cv2.cvtColor(self._small, code, dst=self._gray)
+        return self._gray
+
+    def _small_rects(self, shape):
+        """Map the layout rectangles onto the downsampled grid, clipped to it"""
+        h, w = shape
+        s = self.scale
+        x1 = np.clip(self.rects[:, 0] // s, 0, w)
+        y1 = np.clip(self.rects[:, 1] // s, 0, h)
+        x2 = np.clip(-(-(self.rects[:, 0] + self.rects[:, 2]) // s), 0, w)
+        y2 = np.clip(-(-(self.rects[:, 1] + self.rects[:, 3]) // s), 0, h)
+        return x1, y1, x2, y2
+
+    def update(self, frame):
+        """Return a boolean array of the spaces that must be reclassified on this frame
+
+        The returned spaces are assumed to be reclassified, so their reference patches
+        are refreshed from this frame. `changed` keeps the subset whose content actually
+        moved, without the forced refreshes.
+        """
+        n = len(self.rects)
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+
+        gray = self._downsample(frame)
+        x1, y1, x2, y2 = self._small_rects(gray.shape)
+
+        self.age += 1
+        if self.reference is None:
+            self.reference = gray.copy()
+            self.changed = np.ones(n, dtype=bool)
+            return self.changed.copy()
+
+        # Mean absolute difference per space from one integral image of the frame difference
+        cv2.absdiff(gray, self.reference, dst=self._diff)
+        cv2.integral(self._diff, self._integral, cv2.CV_32S)
+        ii = self._integral
+        sums = ii[y2, x2] - ii[y1, x2] - ii[y2, x1] + ii[y1, x1]
+        areas = np.maximum((x2 - x1) * (y2 - y1), 1)
+        self.changed = sums / areas > self.threshold
+        stale = self.changed | (self.age >= self.refresh_interval)
+
+        for i in np.flatnonzero(stale).tolist():
+            self.reference[y1[i]:y2[i], x1[i]:x2[i]] = gray[y1[i]:y2[i], x1[i]:x2[i]]
+        self.age[stale] = 0
+        return stale
@@ -7,16 +7,107 @@ All configurable parameters are centralized here for easy management
 PARKING_WIDTH = 107
 PARKING_HEIGHT = 48
 
+# Layout Editing
+LAYOUT_ALLOW_OVERLAP = True  # Set to False to reject new spaces that overlap existing ones
+
 # Detection Thresholds
 OCCUPANCY_THRESHOLD = 900  # Pixel count threshold for space occupancy
 CONFIDENCE_THRESHOLD = 0.5  # Minimum confidence for vehicle detection
 
+# Occupancy Backend
+OCCUPANCY_BACKEND = 'count'  # 'count': pixels per space vs OCCUPANCY_THRESHOLD, 'patch': perspective-rectified patches,
+                             # 'classifier': trained classifier over rectified patches (train_occupancy_classifier.py)
+PATCH_SIZE = (64, 32)  # Canonical (width, height) every space is rectified to by the 'patch' backend
+PATCH_OCCUPANCY_FRACTION = 0.175  # Fraction of a rectified patch that must be set (~900 / (107 * 48))
+OCCUPANCY_CLASSIFIER_PATH = 'models/occupancy_classifier.npz'  # Weights used by the 'classifier' backend
+CLASSIFIER_GRID = (4, 8)  # (rows, cols) of fill-fraction cells the classifier sees per patch
+CLASSIFIER_PROBABILITY = 0.5  # Occupied at or above this predicted probability
+
+# Preprocessing Pipeline
+BLUR_KERNEL_SIZE = (3, 3)
+BLUR_SIGMA = 1
+THRESHOLD_BLOCK_SIZE = 25  # Neighbourhood size for adaptive thresholding (odd)
+THRESHOLD_C = 16
+MEDIAN_KERNEL_SIZE = 5
+DILATE_KERNEL_SIZE = (3, 3)
+DILATE_ITERATIONS = 1
+ROI_PREPROCESSING = True  # Only preprocess padded tiles around the marked parking spaces
+
+# Change Gating
+CHANGE_GATING = True  # Only reclassify spaces whose content changed since the last classification
+CHANGE_GATE_SCALE = 4  # Downsampling factor for the change detector
+CHANGE_GATE_THRESHOLD = 4.0  # Mean absolute grayscale difference that counts as a change
+CHANGE_GATE_REFRESH_FRAMES = 50  # Force reclassification of every space at least this often
+
+# Video Prefetching
+PREFETCH_QUEUE_SIZE = 8  # Decoded frames buffered ahead of analysis
+PREFETCH_POLICY = 'block'  # 'block' analyzes every frame, 'drop' discards stale frames (live streams)
+
+# Adaptive Frame Sampling
+FRAME_SAMPLING = False  # Analyze frames at an adaptive rate instead of every frame
+SAMPLING_BASE_RATE_HZ = 2.0  # Analysis rate while the lot is quiet
+SAMPLING_MAX_RATE_HZ = 10.0  # Analysis rate while many spaces are changing
+SAMPLING_FULL_ACTIVITY = 0.05  # Fraction of spaces changing per analyzed frame that reaches the max rate
+SAMPLING_SMOOTHING = 0.3  # Weight of the newest observation in the activity average
+
+# Parallel Video Analysis
+PARALLEL_WORKERS = None  # Worker processes for chunked analysis (None = all CPU cores)
+PARALLEL_MIN_CHUNK_FRAMES = 500  # Smallest frame range handed to one worker
+HEADLESS_CHANGE_GATING = False  # Change-gate headless analysis too: faster, but no longer identical to --workers N
+
+# Multi-Camera Supervisor
+SUPERVISOR_WORKERS = None  # Worker threads shared by all streams (None = one per stream)
+SUPERVISOR_OPENCV_THREADS = 1  # OpenCV threads per call, to avoid oversubscribing the workers
+SUPERVISOR_REPORT_INTERVAL = 10  # Seconds between per-stream fps/lag log lines
+SUPERVISOR_DETECTION_INTERVAL = None  # Seconds between shared-YOLO detections per stream (None = off)
+
 # YOLO Model Configuration
-MODEL_PATH = 'yolov8n.pt'
+MODEL_PATH = 'yolov8n.pt'  # Loaded on the first detection, not at startup
+MODEL_WARMUP = False  # Load and warm up the model in the background when the image editor opens
+
+# Inference Backend
+INFERENCE_BACKEND = 'torch'  # 'torch' (PyTorch), 'onnx' (ONNX Runtime) or 'openvino'; exports are cached in MODELS_DIR
+INFERENCE_IMGSZ = 640  # Input size exported models are built for
+INFERENCE_INT8 = False  # Quantize the exported model to int8, calibrated on our own lot frames
+INT8_CALIBRATION_SOURCE = None  # Video, image or image directory for calibration (None = DEFAULT_VIDEO_PATH)
+INT8_CALIBRATION_FRAMES = 200  # Frames sampled evenly from the calibration source
 CAR_CLASSES = [2, 3, 5, 7]  # COCO classes: cars, motorcycles, buses, trucks
+VEHICLE_CLASS_NAMES = {2: 'car', 3: 'motorcycle', 5: 'bus', 7: 'truck'}  # Labels of CAR_CLASSES
+CROP_INPUT_SIZE = (256, 96)  # (width, height) space crops are letterboxed to for batched inference (multiples of 32)
+CROP_BATCH_SIZE = 32  # Space crops per batched model call
+
+# Hybrid Escalation
+HYBRID_ESCALATION = False  # Let batched YOLO on space crops decide the spaces the pixel count is unsure about
+ESCALATION_BAND = 0.25  # Counts within this fraction of the occupancy threshold are uncertain (675-1125 at 900)
+CLASSIFIER_ESCALATION_BAND = 0.15  # With the 'classifier' backend, probabilities within this of CLASSIFIER_PROBABILITY are uncertain
+ESCALATE_FLIPS = True  # Also escalate spaces whose pixel-count state just flipped
+
+# Asynchronous Detection
+ASYNC_DETECTION = False  # Run YOLO in a worker process during video playback and fuse its results
+ASYNC_DETECTION_INTERVAL = 2.0  # Seconds between detections on the latest frame
+ASYNC_DETECTION_MIN_IOU = 0.3  # IoU between a vehicle box and a space that counts as occupied
+
+# Vehicle Tracking
+VEHICLE_TRACKING = False  # During video playback, carry YOLO detections across frames instead of detecting each frame
+                          # (fed by the detection worker when ASYNC_DETECTION is on)
+TRACK_REDETECT_FRAMES = 150  # Rerun full-frame detection at least this often
+TRACK_CHANGE_REDETECT_FRAMES = 10  # Minimum frames between re-detections of the region where the change gate fired
+TRACK_IOU_THRESHOLD = 0.3  # IoU at which a detection continues an existing track
+TRACK_MAX_MISSES = 2  # Detection rounds a track survives without a match
+
+# Tiled Detection
+TILED_DETECTION = False  # Run YOLO on native-resolution tiles of the layout region (high-resolution cameras)
+TILE_SIZE = 640  # Tile edge in pixels, also the model input size
+TILE_OVERLAP = 128  # Pixels shared by neighbouring tiles
+TILE_BATCH_SIZE = 8  # Tiles per batched model call
+TILE_REGION_MARGIN = 64  # Pixels searched around the layout's bounding box
+TILE_NMS_IOU = 0.5  # IoU above which detections from overlapping tiles are merged
+TILE_NMS_CONTAINMENT = 0.8  # Also merge a box lying mostly inside another (a car cut by a tile edge)
 
 # File Paths
-POSITION_FILE = 'CarParkPos'
+POSITION_FILE = 'CarParkPos'  # Legacy layout (pickled list or 'x,y' lines), read if LAYOUT_FILE is missing
+LAYOUT_FILE = 'CarParkPos.layout'  # Versioned binary layout; edits go to LAYOUT_FILE + '.journal'
+LAYOUT_JOURNAL_MAX_RECORDS = 1024  # Journal entries before the layout file is compacted
 DEFAULT_VIDEO_PATH = 'carPark.mp4'
 DEFAULT_IMAGE_PATH = 'carParkImg.png'
 
@@ -28,11 +119,17 @@ MODELS_DIR = 'models'
 # CSV Configuration
 CSV_FILE = 'parking_status.csv'
 CSV_APPEND_MODE = True  # Set to True to keep historical data
+TIMESERIES_FILE = 'occupancy_timeseries.csv'  # Per-frame output of headless video analysis
+SPACE_CSV_FILE = 'space_vehicles.csv'  # Per-space vehicle type, confidence and track during video playback
 
 # UI Configuration
 BORDER_SIZE = 50
 WINDOW_NAME = "Parking Detection"
 
+# Editor Canvas
+CANVAS_TILE_SIZE = 64  # Granularity (px) at which dirty regions of the layout editor are merged
+CANVAS_FULL_REDRAW_FRACTION = 0.5  # Redraw the whole canvas once this fraction of it is dirty
+
 # Zoom Configuration
 MIN_ZOOM = 0.5
 MAX_ZOOM = 3.0
@@ -0,0 +1,144 @@
+"""
+Asynchronous vehicle detection worker for parking space detection
+Runs YOLO in a separate process on the latest frame, handed over through shared memory, at its own cadence
+"""
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import config
+import logging
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _detection_main(shm_name, shape, sequence, frame_lock, wants_frame, frame_ready, stop, results, interval,
+                    rects):
+    """Worker process: detect vehicles on a shared frame at most once per `interval` seconds
+
+    frame_lock is held while the frame is written and for the whole detection, so the
+    parent can never overwrite a frame that is still being read.
+    """
+    from car_detector import CarDetector
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        detector = CarDetector()
+        next_run = time.monotonic()
+        while not stop.is_set():
+            wait = next_run - time.monotonic()
+            if wait > 0:
+                stop.wait(wait)
+                continue
+            wants_frame.set()
+            if not frame_ready.wait(0.2):
+                continue
+            with frame_lock:
+                frame_ready.clear()
+                # A wait that timed out mid-handover may have asked again; the frame is taken now
+                wants_frame.clear()
+                seq = sequence.value
+                next_run = time.monotonic() + interval
+                started = time.perf_counter()
+                boxes, classes, confidences = detector.vehicle_boxes(detector.detect_cars(frame, rects))
+            results.put((seq, boxes, classes, confidences, time.perf_counter() - started))
+    except Exception as e:
+        logger.exception(f"Detection worker failed: {e}")
+    finally:
+        shm.close()
+
+
+class DetectionWorker:
+    def __init__(self, interval=config.ASYNC_DETECTION_INTERVAL, rects=None):
+        """Initialize the worker; it detects on the latest submitted frame every `interval` seconds
+
+        rects (the layout's (N, 4) x, y, width, height) limits tiled detection to the layout region.
+        """
+        self.interval = interval
+        self.rects = None if rects is None else np.asarray(rects)
+        self.shape = None
+        self.detections = 0
+        self.last_latency = None  # Seconds the last detection took in the worker
+        self._ctx = mp.get_context('spawn')  # torch does not survive fork reliably
+        self._process = None
+        self._shm = None
+        self._frame = None
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.is_alive()
+
+    def start(self, shape):
+        """Start the worker process for frames of the given (height, width, 3) shape"""
+        self.stop()
+        self.shape = tuple(shape)
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)))
+        self._frame = np.ndarray(self.shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._sequence = self._ctx.Value('q', 0, lock=False)
+        self._frame_lock = self._ctx.Lock()
+        self._wants_frame = self._ctx.Event()
+        self._frame_ready = self._ctx.Event()
+        self._stop = self._ctx.Event()
+        self._results = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=_detection_main, name='detection-worker', daemon=True,
+            args=(self._shm.name, self.shape, self._sequence, self._frame_lock, self._wants_frame,
+                  self._frame_ready, self._stop, self._results, self.interval, self.rects))
+        self._process.start()
+        logger.info(f"Started detection worker (every {self.interval:g} s)")
+
+    def submit(self, frame):
+        """Offer a frame without ever waiting; returns its sequence number if the worker took it"""
+        if not self.running or not self._wants_frame.is_set() or frame.shape != self.shape:
+            return None
+        # The worker holds the lock while it detects; never wait for it
+        if not self._frame_lock.acquire(block=False):
+            return None
+        try:
+            self._frame[:] = frame
+            self._sequence.value += 1
+            self._wants_frame.clear()
+            self._frame_ready.set()
+            return self._sequence.value
+        finally:
+            self._frame_lock.release()
+
+    def poll(self):
+        """Return the newest (seq, boxes, classes, confidences) result not yet polled, or None"""
+        latest = None
+        while self._process is not None:
+            try:
+                latest = self._results.get_nowait()
+            except queue.Empty:
+                break
+        if latest is None:
+            return None
+        seq, boxes, classes, confidences, latency = latest
+        self.detections += 1
+        self.last_latency = latency
+        return seq, boxes, classes, confidences
+
+    def stop(self):
+        if self._process is None:
+            return
+        self._stop.set()
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._results.close()
+        self._process = None
+        self._frame = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+        logger.info(f"Stopped detection worker after {self.detections} detections")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
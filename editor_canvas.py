@@ -0,0 +1,113 @@
+"""
+Layered canvas for the parking layout editor
+Keeps the static layers rendered in a cached buffer and redraws only the regions whose items changed
+"""
+import cv2
+import numpy as np
+import config
+
+
+class EditorCanvas:
+    def __init__(self, draw_item, tile_size=config.CANVAS_TILE_SIZE,
+                 full_redraw_fraction=config.CANVAS_FULL_REDRAW_FRACTION):
+        """Initialize the canvas with the callback that draws one item
+
+        draw_item(img, item, ox, oy) must draw `item` onto img shifted by (-ox, -oy), touching
+        only pixels inside the item's bounding box. Items are hashable and drawn in list order.
+        """
+        self.draw_item = draw_item
+        self.tile_size = tile_size
+        self.full_redraw_fraction = full_redraw_fraction
+        self.base = None    # Background layer
+        self.layers = None  # Background plus every static item
+        self.frame = None   # Static layers plus the transient overlay
+        self.items = []
+        self.bboxes = np.empty((0, 4), dtype=np.int64)
+        self.version = 0  # Bumped whenever the composited frame changes
+        self._overlay_rect = None
+
+    def set_background(self, background):
+        """Replace the background layer; everything is redrawn on the next update"""
+        self.base = background
+        self.layers = background.copy()
+        self.frame = background.copy()
+        self.items = []
+        self.bboxes = np.empty((0, 4), dtype=np.int64)
+        self._overlay_rect = None
+        self.version += 1
+
+    def update(self, items, bboxes):
+        """Bring the static layers in line with `items`, redrawing only where items changed
+
+        bboxes is an (N, 4) array of x1, y1, x2, y2 (exclusive) per item. Returns the
+        number of regions redrawn.
+        """
+        bboxes = np.asarray(bboxes, dtype=np.int64).reshape(-1, 4)
+        old, new = set(self.items), set(items)
+        dirty = [self.bboxes[i] for i, item in enumerate(self.items) if item not in new]
+        dirty += [bboxes[i] for i, item in enumerate(items) if item not in old]
+        self.items, self.bboxes = list(items), bboxes
+        if not dirty:
+            return 0
+
+        regions = self._dirty_regions(np.asarray(dirty))
+        for region in regions:
+            self._redraw(*region)
+        self.version += 1
+        return len(regions)
+
+    def _dirty_regions(self, boxes):
+        """Merge dirty boxes into the bounding rects of connected groups of touched tiles"""
+        h, w = self.base.shape[:2]
+        ts = self.tile_size
+        x1 = np.clip(boxes[:, 0], 0, w)
+        y1 = np.clip(boxes[:, 1], 0, h)
+        x2 = np.clip(boxes[:, 2], 0, w)
+        y2 = np.clip(boxes[:, 3], 0, h)
+        visible = (x2 > x1) & (y2 > y1)
+
+        tiles = np.zeros((-(-h // ts), -(-w // ts)), dtype=np.uint8)
+        for bx1, by1, bx2, by2 in zip(x1[visible] // ts, y1[visible] // ts,
+                                      (x2[visible] - 1) // ts + 1, (y2[visible] - 1) // ts + 1):
+            tiles[by1:by2, bx1:bx2] = 1
+        if not tiles.any():
+            return []
+        if tiles.mean() >= self.full_redraw_fraction:
+            return [(0, 0, w, h)]
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(tiles, connectivity=8)
+        regions = []
+        for tx, ty, tw, th, _ in stats[1:count]:
+            regions.append((tx * ts, ty * ts, min(w, (tx + tw) * ts), min(h, (ty + th) * ts)))
+        return regions
+
+    def _redraw(self, x1, y1, x2, y2):
+        """Restore a region from the background and redraw every item that intersects it"""
+        view = self.layers[y1:y2, x1:x2]
+        view[...] = self.base[y1:y2, x1:x2]
+        b = self.bboxes
+        hits = np.flatnonzero((b[:, 0] < x2) & (b[:, 2] > x1) & (b[:, 1] < y2) & (b[:, 3] > y1))
+        # Drawing through the view clips every item to the region, so the result is exact
+        for i in hits.tolist():
+            self.draw_item(view, self.items[i], x1, y1)
+        self.frame[y1:y2, x1:x2] = view
+
+    def render(self, overlay_rect=None, draw_overlay=None):
+        """Return the composited frame, optionally with a transient overlay
+
+        draw_overlay(img) draws onto the frame inside overlay_rect (x1, y1, x2, y2); the
+        previous overlay is erased by restoring its rect from the cached layers.
+        """
+        if self._overlay_rect is not None:
+            x1, y1, x2, y2 = self._overlay_rect
+            self.frame[y1:y2, x1:x2] = self.layers[y1:y2, x1:x2]
+            self._overlay_rect = None
+            self.version += 1
+
+        if draw_overlay is not None:
+            h, w = self.frame.shape[:2]
+            x1, y1, x2, y2 = overlay_rect
+            draw_overlay(self.frame)
+            self._overlay_rect = (max(0, x1), max(0, y1), min(w, x2), min(h, y2))
+            self.version += 1
+        return self.frame
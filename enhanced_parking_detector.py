@@ -1,14 +1,29 @@
 import cv2
 import numpy as np
-import pandas as pd
 from datetime import datetime
-import pickle
 import cvzone
 from pathlib import Path
 from car_detector import CarDetector
+from occupancy_engine import create_occupancy_engine
+from preprocess_pipeline import PreprocessPipeline
+from change_gate import ChangeGate
+from escalation import AmbiguityEscalator
+from detection_worker import DetectionWorker
+from vehicle_tracker import VehicleTracker
+from box_ops import rects_to_boxes, best_matches, take_matched
+from tiled_detection import layout_region
+from editor_canvas import EditorCanvas
+from layout_store import LayoutStore
+from layout_file import LayoutFile
+from frame_reader import FrameReader
+from frame_sampler import AdaptiveSampler
+from parallel_analysis import analyze_video_parallel
 import config
 import os
+import time
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from setup_directories import setup_directories
 
 # Setup logging
@@ -23,18 +38,42 @@ class EnhancedParkingDetector:
         self.video_path = video_path
         self.image_path = image_path
         self.width, self.height = config.PARKING_WIDTH, config.PARKING_HEIGHT
-        self.posList = []
+        self.posList = LayoutStore(width=self.width, height=self.height)
         self.drawing = False
         self.start_point = None
         self.end_point = None
         self.temp_rectangles = []
-        self.car_detector = CarDetector()
+        self.car_detector = CarDetector()  # Cheap; the YOLO model loads on first detection
+        self.occupancy = create_occupancy_engine(width=self.width, height=self.height)
+        self.preprocess = PreprocessPipeline()
+        self.change_gate = ChangeGate() if config.CHANGE_GATING else None
+        self.escalator = AmbiguityEscalator() if config.HYBRID_ESCALATION else None
+        self.space_counts = np.zeros(0, dtype=np.int64)  # Cached per-space state from the last frame
+        self.space_occupied = np.zeros(0, dtype=bool)
+        self.engine_occupied = np.zeros(0, dtype=bool)  # The occupancy engine's own decision, before escalation
+        self.shown_occupied = np.zeros(0, dtype=bool)  # Occupancy drawn on the last frame, detections fused
+        self._has_state = False
+        self.skipped_spaces = 0  # Spaces the change gate skipped on the last frame
+        self.state_changes = 0  # Spaces whose occupancy flipped on the last frame
+        self.escalated_spaces = 0  # Spaces sent to YOLO by hybrid escalation on the last frame
+        self.detection_worker = None  # Asynchronous YOLO process while a video is shown
+        self.tracker = None  # Vehicle tracks carried between detections while a video is shown
+        self.frames_since_detection = 0
+        self.detector_calls = 0
+        self.region_detections = 0  # Detector calls limited to the region where spaces changed
+        self.stage_times = defaultdict(float)  # Cumulative seconds spent in each pipeline stage
+        self.layout_version = 0  # Bumped whenever the parking layout changes
+        self.layout_file = LayoutFile()
         self.load_parking_positions()
         self.show_help = True
         self.history = []  # Add history for undo functionality
         self.is_reset = False  # Add reset state flag
         self.original_image = None  # Store original image
         self.current_image = None   # Store current image with markings
+        self.image_version = 0  # Bumped whenever current_image is replaced
+        self._image_results = None  # Memoized (annotated image, available, occupied)
+        self._image_results_key = None
+        self._image_processed = None  # Full-frame preprocessing of the current image
         
         # Add zoom functionality
         self.zoom_scale = 1.0
@@ -45,38 +84,95 @@ class EnhancedParkingDetector:
         self.pan_y = 0
         self.pan_step = 50
         self.is_panning = False
+        self._view_key = None  # Zoom, pan and content the cached view was rendered for
+        self._view_img = None
         self.last_mouse_pos = None
         
+    @property
+    def polygons(self):
+        """Polygon spaces keyed by the top-left corner of their bounding box"""
+        return self.posList.polygons
+
     def load_parking_positions(self):
         """Load previously saved parking positions from file"""
         try:
-            with open(config.POSITION_FILE, 'rb') as f:
-                self.posList = pickle.load(f)
+            positions, polygons = self.layout_file.layout()
+            self.posList = LayoutStore(positions, self.width, self.height, polygons=polygons)
             logger.info(f"Loaded {len(self.posList)} parking positions")
         except FileNotFoundError:
-            logger.warning(f"No saved positions found at '{config.POSITION_FILE}'. Please select parking spaces.")
-            self.posList = []
+            logger.warning(f"No saved positions found at '{config.LAYOUT_FILE}'. Please select parking spaces.")
+            self.posList = LayoutStore(width=self.width, height=self.height)
         except Exception as e:
             logger.error(f"Error loading positions: {e}")
-            self.posList = []
-            
+            self.posList = LayoutStore(width=self.width, height=self.height)
+        self.update_layout()
+
     def save_parking_positions(self):
         """Save current parking positions to file"""
         try:
             # Save current state to history before saving
             self.history.append(self.posList.copy())
-            with open(config.POSITION_FILE, 'wb') as f:
-                pickle.dump(self.posList, f)
+            self.update_layout()
+            # Only the edits since the last save are journaled
+            self.layout_file.save(self.posList, self.width, self.height, self.posList.drain_changes())
             logger.info(f"Saved {len(self.posList)} parking positions")
         except Exception as e:
             logger.error(f"Error saving positions: {e}")
 
-    def add_help_text(self, img):
-        """Add help text overlay to the image showing keyboard shortcuts"""
-        # Get image dimensions
-        height, width = img.shape[:2]
-        
-        # Add numbered help text in the right corner
+    def update_layout(self):
+        """Propagate the current parking layout to the occupancy engine and ROI preprocessing"""
+        self.posList.resize(self.width, self.height)
+        self.occupancy.set_layout(list(self.posList), self.width, self.height, self.space_polygons())
+        self.preprocess.set_regions(self.occupancy.rects())
+        if self.change_gate is not None:
+            self.change_gate.set_layout(self.occupancy.rects())
+        self.space_counts = np.zeros(len(self.posList), dtype=np.int64)
+        self.space_occupied = np.zeros(len(self.posList), dtype=bool)
+        self.engine_occupied = np.zeros(len(self.posList), dtype=bool)
+        self._has_state = False
+        self._reset_detection_state()
+        self.layout_version += 1
+
+    def _reset_detection_state(self):
+        """Forget asynchronous detections; they describe the spaces of a previous layout"""
+        self.space_vehicle_type = np.full(len(self.posList), -1, dtype=np.int64)  # COCO class or -1
+        self.space_confidence = np.zeros(len(self.posList), dtype=np.float32)
+        self.space_track_id = np.full(len(self.posList), -1, dtype=np.int64)  # Vehicle track in each space or -1
+        self.space_track_age = np.zeros(len(self.posList), dtype=np.int64)  # Frames that track has existed
+        self.fused_spaces = 0  # Spaces whose pixel state was overridden by a detection on the last frame
+        self._detection_occupied = None  # Verdict of the last detection per space
+        self._detection_basis = None  # Pixel states of the frame that detection ran on
+        self._submitted = {}  # Frame sequence number -> pixel states when it was submitted
+        self._pending_changes = np.zeros(len(self.posList), dtype=bool)  # Changed spaces not yet re-detected
+        self._frames_since_region_detection = 0
+
+    def space_polygons(self):
+        """Return the polygon of every space in layout order (None for rectangles), or None if there are none"""
+        if not self.polygons:
+            return None
+        return [self.polygons.get(pos) for pos in self.posList]
+
+    def get_image_results(self):
+        """Return (counts, occupied, available_slots, occupied_slots) for the current image
+
+        Results are memoized on the image and layout versions. The still is preprocessed
+        over its full extent once per image, so layout edits only redo the per-space counts.
+        """
+        key = (self.image_version, self.layout_version)
+        if self._image_results_key != key:
+            if self._image_results_key is None or self._image_results_key[0] != self.image_version:
+                still = PreprocessPipeline()
+                still.use_roi = False
+                self._image_processed = still.process(self.current_image)
+            counts, occupied = self.classify_spaces(self._image_processed, self.current_image)
+            occupied_slots = int(np.count_nonzero(occupied))
+            self._image_results = (counts.copy(), occupied.copy(), len(self.posList) - occupied_slots,
+                                   occupied_slots)
+            self._image_results_key = key
+        return self._image_results
+
+    def help_text_items(self, width):
+        """Return the keyboard shortcut overlay as editor canvas text items"""
         help_text = [
             "=== Available Shortcuts ===",
             "1. R: Reset all selections",
@@ -94,50 +190,131 @@ class EnhancedParkingDetector:
         y_offset = 30
         
         # Add text with background for better visibility
+        items = []
         for text in help_text:
-            if text.startswith("==="):
-                # Make section headers more prominent
-                cvzone.putTextRect(img, text, (start_x, y_offset), scale=1.5,
-                                 thickness=2, offset=5, colorR=(0,0,0))
-            else:
-                cvzone.putTextRect(img, text, (start_x, y_offset), scale=1.2,
-                                 thickness=2, offset=5, colorR=(0,0,0))
+            # Make section headers more prominent
+            scale = 1.5 if text.startswith("===") else 1.2
+            items.append(('text', text, start_x, y_offset, scale, 2, 5, (0, 0, 0)))
             y_offset += 25  # Spacing between lines
+        return items
+
+    @staticmethod
+    def _text_bbox(text, x, y, scale, thickness, offset):
+        """Conservative (x1, y1, x2, y2) bounds of a cvzone.putTextRect call"""
+        (tw, th), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_PLAIN, scale, thickness)
+        pad = thickness + 1
+        return (x - offset - pad, y - th - offset - pad, x + tw + offset + pad, y + max(offset, baseline) + pad)
+
+    def _draw_editor_item(self, img, item, ox, oy):
+        """Draw one editor canvas item onto img, shifted by (-ox, -oy)"""
+        kind = item[0]
+        if kind == 'space':
+            _, x, y, count, is_occupied, polygon = item
+            if polygon is not None:
+                polygon = np.asarray(polygon, dtype=np.int32) - (ox, oy)
+            self.draw_space(img, (x - ox, y - oy), count, is_occupied, polygon)
+        elif kind == 'layout':
+            _, x, y, polygon = item
+            if polygon is not None:
+                cv2.polylines(img, [np.asarray(polygon, dtype=np.int32) - (ox, oy)], True, (255, 0, 255), 2)
+            else:
+                cv2.rectangle(img, (x - ox, y - oy), (x - ox + self.width, y - oy + self.height), (255, 0, 255), 2)
+        else:
+            _, text, x, y, scale, thickness, offset, color = item
+            cvzone.putTextRect(img, text, (x - ox, y - oy), scale=scale, thickness=thickness,
+                               offset=offset, colorR=color)
 
-    def apply_zoom_and_pan(self, img):
+    def _editor_items(self, window_width):
+        """Return (items, bboxes) for everything the editor draws over the image, in drawing order"""
+        border_size = config.BORDER_SIZE
+        items, bboxes = [], []
+
+        def add_text(text, x, y, scale, thickness, offset, color):
+            items.append(('text', text, x, y, scale, thickness, offset, color))
+            bboxes.append(self._text_bbox(text, x, y, scale, thickness, offset))
+
+        if not self.is_reset and self.posList:
+            counts, occupied, available_slots, _ = self.get_image_results()
+            positions = [(x + border_size, y + border_size) for x, y in self.posList]
+            rects = (self.occupancy.rects() + [border_size, border_size, 0, 0]).tolist()
+            polygons = [None if polygon is None else tuple(map(tuple, (polygon + border_size).tolist()))
+                        for polygon in (self.space_polygons() or [None] * len(positions))]
+
+            # Occupancy annotations, as check_parking_space draws them
+            for (x, y), (rx, ry, rw, rh), polygon, count, is_occupied in zip(
+                    positions, rects, polygons, counts.tolist(), occupied.tolist()):
+                tx1, ty1, tx2, ty2 = self._text_bbox(str(count), rx, ry + rh - 3, 1, 2, 0)
+                items.append(('space', x, y, count, is_occupied, polygon))
+                bboxes.append((min(rx - 5, tx1), min(ry - 5, ty1),
+                               max(rx + rw + 6, tx2), max(ry + rh + 6, ty2)))
+            add_text(f'Free: {available_slots}/{len(self.posList)}', 100 + border_size, 50 + border_size,
+                     3, 5, 20, (0, 200, 0))
+
+            # Layout outlines
+            for (x, y), (rx, ry, rw, rh), polygon in zip(positions, rects, polygons):
+                items.append(('layout', x, y, polygon))
+                bboxes.append((rx - 2, ry - 2, rx + rw + 3, ry + rh + 3))
+
+            # Display statistics in the top-right corner
+            add_text(f'Total Slots: {len(self.posList)}', window_width - 250, 30, 2, 3, 10, (0, 200, 0))
+            add_text(f'Empty Slots: {available_slots}', window_width - 250, 80, 2, 3, 10, (0, 200, 0))
+
+        if self.show_help:
+            for item in self.help_text_items(window_width):
+                add_text(*item[1:])
+        return items, bboxes
+
+    def apply_zoom_and_pan(self, img, content_key=None):
+        """Return the window-sized view of img at the current zoom and pan
+
+        Only the source region behind the viewport is cropped and resized, so the cost
+        follows the window size rather than the zoomed image size. When content_key is
+        given, the rendered view is reused until it, the zoom or the pan changes.
+        """
         # Get image dimensions
         h, w = img.shape[:2]
-        
+
         # Calculate zoomed dimensions
         zoomed_w = int(w * self.zoom_scale)
         zoomed_h = int(h * self.zoom_scale)
-        
-        # Resize image
-        zoomed_img = cv2.resize(img, (zoomed_w, zoomed_h))
-        
+
         # Calculate pan boundaries
         max_pan_x = max(0, zoomed_w - w)
         max_pan_y = max(0, zoomed_h - h)
-        
+
         # Clamp pan values
         self.pan_x = max(0, min(self.pan_x, max_pan_x))
         self.pan_y = max(0, min(self.pan_y, max_pan_y))
-        
-        # Crop image based on pan
-        if zoomed_w > w or zoomed_h > h:
-            x1 = self.pan_x
-            y1 = self.pan_y
-            x2 = min(x1 + w, zoomed_w)
-            y2 = min(y1 + h, zoomed_h)
-            zoomed_img = zoomed_img[y1:y2, x1:x2]
-            
+
+        key = (content_key, img.shape, self.zoom_scale, self.pan_x, self.pan_y)
+        if content_key is not None and self._view_key == key:
+            return self._view_img
+
+        if zoomed_w <= w and zoomed_h <= h:
+            # Zoomed out: the whole image is visible and smaller than the window
+            view = cv2.resize(img, (zoomed_w, zoomed_h))
+        else:
+            # Source region behind the viewport, with one pixel of margin for interpolation
+            fx, fy = zoomed_w / w, zoomed_h / h
+            x0, y0 = int(self.pan_x / fx), int(self.pan_y / fy)
+            x1 = min(w, int(np.ceil((self.pan_x + w) / fx)) + 1)
+            y1 = min(h, int(np.ceil((self.pan_y + h) / fy)) + 1)
+            zoomed_img = cv2.resize(img[y0:y1, x0:x1], None, fx=fx, fy=fy)
+
+            # Crop image based on pan
+            ox = self.pan_x - int(round(x0 * fx))
+            oy = self.pan_y - int(round(y0 * fy))
+            view = zoomed_img[oy:oy + h, ox:ox + w]
+
             # If the cropped image is smaller than the window, pad it
-            if zoomed_img.shape[0] < h or zoomed_img.shape[1] < w:
-                padded_img = np.zeros((h, w, 3), dtype=np.uint8)
-                padded_img[:zoomed_img.shape[0], :zoomed_img.shape[1]] = zoomed_img
-                zoomed_img = padded_img
-        
-        return zoomed_img
+            if view.shape[0] < h or view.shape[1] < w:
+                padded_img = np.zeros((h, w) + img.shape[2:], dtype=np.uint8)
+                padded_img[:view.shape[0], :view.shape[1]] = view
+                view = padded_img
+
+        self._view_key = key if content_key is not None else None
+        self._view_img = view
+        return view
 
     def mouse_callback(self, event, x, y, flags, param):
         if self.is_panning:
@@ -168,76 +345,251 @@ class EnhancedParkingDetector:
         elif event == cv2.EVENT_LBUTTONUP:
             self.drawing = False
             if self.start_point and self.end_point:
-                # Calculate grid of parking spaces
-                x1, y1 = self.start_point
-                x2, y2 = self.end_point
-                
-                # Ensure x1,y1 is top-left and x2,y2 is bottom-right
-                x1, x2 = min(x1, x2), max(x1, x2)
-                y1, y2 = min(y1, y2), max(y1, y2)
-                
-                # Calculate number of spaces that fit
-                num_spaces_x = (x2 - x1) // self.width
-                num_spaces_y = (y2 - y1) // self.height
-                
-                # Add all spaces in the grid
-                for i in range(num_spaces_x):
-                    for j in range(num_spaces_y):
-                        pos = (x1 + i * self.width, y1 + j * self.height)
-                        if pos not in self.posList:
-                            self.posList.append(pos)
+                # Add the grid of spaces that fits the selection, skipping duplicates
+                self.posList.add_grid(*self.start_point, *self.end_point)
                 
                 self.save_parking_positions()
                 self.start_point = None
                 self.end_point = None
         elif event == cv2.EVENT_RBUTTONDOWN:
             # Remove spaces in the clicked area
-            for pos in self.posList[:]:
-                x1, y1 = pos
-                if x1 < x < x1 + self.width and y1 < y < y1 + self.height:
-                    self.posList.remove(pos)
+            self.posList.remove_at(x, y)
             self.save_parking_positions()
 
+    def draw_grid_preview(self, img, x1, y1, x2, y2):
+        """Draw the drag selection and the grid of spaces it would add"""
+        cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+        num_spaces_x = (x2 - x1) // self.width
+        num_spaces_y = (y2 - y1) // self.height
+
+        for i in range(num_spaces_x):
+            for j in range(num_spaces_y):
+                pos_x = x1 + i * self.width
+                pos_y = y1 + j * self.height
+                cv2.rectangle(img, (pos_x, pos_y),
+                            (pos_x + self.width, pos_y + self.height), (0, 255, 0), 1)
+
     def process_frame(self, frame):
         """Process frame using computer vision techniques for parking space detection"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        # Apply Gaussian blur
-        blur = cv2.GaussianBlur(gray, (3, 3), 1)
-        # Apply adaptive thresholding
-        thresh = cv2.adaptiveThreshold(blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                     cv2.THRESH_BINARY_INV, 25, 16)
-        # Apply median blur to remove noise
-        median = cv2.medianBlur(thresh, 5)
-        # Dilate to connect components
-        kernel = np.ones((3, 3), np.uint8)
-        dilated = cv2.dilate(median, kernel, iterations=1)
-        return dilated
+        # Grayscale, blur, adaptive threshold, median and dilate into reused buffers
+        return self.preprocess.process(frame)
+
+    def classify_spaces(self, img_pro, img):
+        """Return (counts, occupied) arrays for every parking space without drawing anything
+
+        img_pro may be None, in which case the frame is only preprocessed if the
+        change gate finds a space that needs reclassifying.
+        """
+        if self.change_gate is not None:
+            # Reclassify only the spaces whose content moved; the rest keep their cached state
+            start = time.perf_counter()
+            stale = np.flatnonzero(self.change_gate.update(img))
+            self.stage_times['change_gate'] += time.perf_counter() - start
+            if len(stale):
+                if img_pro is None:
+                    start = time.perf_counter()
+                    img_pro = self.process_frame(img)
+                    self.stage_times['preprocess'] += time.perf_counter() - start
+                start = time.perf_counter()
+                counts, occupied = self.occupancy.compute(img_pro, stale)
+                self.stage_times['occupancy'] += time.perf_counter() - start
+                occupied = self._escalate(img, stale, counts, occupied)
+                self.state_changes = int(np.count_nonzero(occupied != self.space_occupied[stale]))
+                self.space_counts[stale], self.space_occupied[stale] = counts, occupied
+            else:
+                self.state_changes = 0
+                self.escalated_spaces = 0
+            self.skipped_spaces = len(self.posList) - len(stale)
+            logger.debug(f"Change gate skipped {self.skipped_spaces}/{len(self.posList)} spaces")
+        else:
+            if img_pro is None:
+                start = time.perf_counter()
+                img_pro = self.process_frame(img)
+                self.stage_times['preprocess'] += time.perf_counter() - start
+            # Count every space in one vectorized pass over the integral image
+            start = time.perf_counter()
+            counts, occupied = self.occupancy.compute(img_pro)
+            self.stage_times['occupancy'] += time.perf_counter() - start
+            occupied = self._escalate(img, slice(None), counts, occupied)
+            self.state_changes = int(np.count_nonzero(occupied != self.space_occupied))
+            self.space_counts, self.space_occupied = counts, occupied
+
+        if not self._has_state:
+            # The first classification after a layout change is not a change of state
+            self.state_changes = 0
+            self._has_state = True
+        if self.tracker is not None and self.detection_worker is None:
+            # With a detection worker the tracker follows its results in _fuse_detections instead
+            self._track_vehicles(img)
+        return self.space_counts, self._fuse_detections(img, self.space_occupied)
+
+    def _track_vehicles(self, img):
+        """Carry vehicle tracks to this frame, rerunning the detector only when it is due
+
+        Full-frame detection reruns every TRACK_REDETECT_FRAMES frames. In between, the spaces
+        whose content the change gate saw move are collected, and at most every
+        TRACK_CHANGE_REDETECT_FRAMES frames only their region is re-detected and only the
+        tracks there are updated. Each space inherits the vehicle type, confidence, id and
+        age of the track overlapping it most.
+        """
+        rects = self.occupancy.rects()
+        if self.change_gate is not None and len(self.change_gate.changed) == len(rects):
+            self._pending_changes |= self.change_gate.changed
+        full = self.detector_calls == 0 or self.frames_since_detection + 1 >= config.TRACK_REDETECT_FRAMES
+        regional = (not full and self._pending_changes.any()
+                    and self._frames_since_region_detection + 1 >= config.TRACK_CHANGE_REDETECT_FRAMES)
+
+        if full or regional:
+            start = time.perf_counter()
+            if full:
+                boxes, classes, confidences = self.car_detector.vehicle_boxes(
+                    self.car_detector.detect_cars(img, rects))
+                self.tracker.update(boxes, classes, confidences)
+                self.frames_since_detection = 0
+            else:
+                x1, y1, x2, y2 = region = layout_region(rects[self._pending_changes], img.shape)
+                boxes, classes, confidences = self.car_detector.vehicle_boxes(
+                    self.car_detector.detect_cars(img[y1:y2, x1:x2]))
+                self.tracker.update(boxes + np.float32([x1, y1, x1, y1]), classes, confidences, region)
+                self.frames_since_detection += 1
+                self.region_detections += 1
+            self.stage_times['detection'] += time.perf_counter() - start
+            self._pending_changes[:] = False
+            self._frames_since_region_detection = 0
+            self.detector_calls += 1
+        else:
+            self.tracker.step()
+            self.frames_since_detection += 1
+            self._frames_since_region_detection += 1
+        self._assign_tracks(rects)
+
+    def _assign_tracks(self, rects):
+        """Give each space the vehicle type, confidence, id and age of the track overlapping it most"""
+        track = self.tracker.assign(rects_to_boxes(rects))
+        # Empty lots and detection rounds without vehicles leave no track to index
+        self.space_track_id = take_matched(self.tracker.ids, track, -1)
+        self.space_track_age = take_matched(self.tracker.ages, track, 0)
+        self.space_vehicle_type = take_matched(self.tracker.classes, track, -1)
+        self.space_confidence = take_matched(self.tracker.confidences, track, 0)
+
+    def _fuse_detections(self, img, occupied):
+        """Hand the frame to the detection worker and merge its latest results without waiting
+
+        A detection overrides the pixel state of the spaces whose pixel state has not changed
+        since the frame it ran on; newer pixel changes win over older detections. With vehicle
+        tracking, each result updates the tracks, which then label the spaces.
+        """
+        worker = self.detection_worker
+        if worker is None or not worker.running:
+            return occupied
+
+        seq = worker.submit(img)
+        if seq is not None:
+            self._submitted[seq] = occupied.copy()
+
+        result = worker.poll()
+        if result is not None:
+            seq, boxes, classes, confidences = result
+            basis = self._submitted.pop(seq, None)
+            self._submitted = {s: states for s, states in self._submitted.items() if s > seq}
+            if basis is not None and len(basis) == len(occupied):
+                best, best_iou = best_matches(rects_to_boxes(self.occupancy.rects()), boxes)
+                matched = best >= 0
+                if self.tracker is None:
+                    # A round without boxes leaves every space unmatched and nothing to index
+                    self.space_vehicle_type = take_matched(classes, best, -1)
+                    self.space_confidence = take_matched(np.asarray(confidences, dtype=np.float32), best, 0)
+                self._detection_occupied = best_iou >= config.ASYNC_DETECTION_MIN_IOU
+                self._detection_basis = basis
+                logger.debug(f"Fused detection of frame {seq}: {int(np.count_nonzero(matched))} spaces "
+                             f"matched, worker latency {worker.last_latency * 1000:.0f} ms")
+            if self.tracker is not None:
+                # Boxes are in frame coordinates, so they stay valid across layout edits
+                self.tracker.update(boxes, classes, confidences)
+                self.frames_since_detection = 0
+                self.detector_calls += 1
+        elif self.tracker is not None:
+            self.tracker.step()
+            self.frames_since_detection += 1
+        if self.tracker is not None:
+            self._assign_tracks(self.occupancy.rects())
+
+        if self._detection_occupied is None:
+            return occupied
+        unchanged = occupied == self._detection_basis
+        fused = occupied.copy()
+        fused[unchanged] = self._detection_occupied[unchanged]
+        self.fused_spaces = int(np.count_nonzero(fused != occupied))
+        return fused
+
+    def _escalate(self, img, indices, counts, occupied):
+        """Let YOLO decide the spaces in `indices` whose occupancy is ambiguous to the engine or just flipped"""
+        if self.escalator is None:
+            return occupied
+        start = time.perf_counter()
+        # Flips are judged on the engine's own decisions; YOLO overturning a clear-cut
+        # count must not look like a flip on every following frame
+        previous = self.engine_occupied[indices].copy() if self._has_state else None
+        self.engine_occupied[indices] = occupied
+        occupied = self.escalator.resolve(img, self.occupancy.rects()[indices], self.occupancy.uncertain(counts),
+                                          occupied, previous)
+        self.escalated_spaces = self.escalator.last_escalated
+        self.stage_times['escalation'] += time.perf_counter() - start
+        return occupied
+
+    def draw_space(self, img, pos, count, is_occupied, polygon=None, label=None):
+        """Draw one parking space outline (rectangle or polygon) and its pixel count, colored by state
+
+        label (e.g. the vehicle in the space) is drawn in its top-left corner.
+        """
+        x, y = pos
+
+        if not is_occupied:
+            color = (0, 255, 0)  # Green for empty
+            thickness = 5
+        else:
+            color = (0, 0, 255)  # Red for occupied
+            thickness = 2
+
+        # Draw outline and count
+        if polygon is not None:
+            polygon = np.asarray(polygon, dtype=np.int32)
+            cv2.polylines(img, [polygon], True, color, thickness)
+            x, y, bottom = int(polygon[:, 0].min()), int(polygon[:, 1].min()), int(polygon[:, 1].max())
+        else:
+            cv2.rectangle(img, pos, (x + self.width, y + self.height), color, thickness)
+            bottom = y + self.height
+        cvzone.putTextRect(img, str(count), (x, bottom - 3), scale=1,
+                         thickness=2, offset=0, colorR=color)
+        if label is not None:
+            cvzone.putTextRect(img, label, (x + 2, y + 14), scale=0.8, thickness=1, offset=2, colorR=color)
+
+    def space_vehicle_labels(self):
+        """Return the label of the vehicle in each space ('car #12', or 'car 0.87' untracked) or None"""
+        labels = [None] * len(self.posList)
+        if len(self.space_vehicle_type) != len(labels):
+            return labels
+        for i in np.flatnonzero(self.space_vehicle_type >= 0).tolist():
+            name = config.VEHICLE_CLASS_NAMES.get(int(self.space_vehicle_type[i]), 'vehicle')
+            track = int(self.space_track_id[i])
+            labels[i] = f"{name} #{track}" if track >= 0 else f"{name} {self.space_confidence[i]:.2f}"
+        return labels
 
     def check_parking_space(self, img_pro, img):
-        """Check each parking space and determine if it's occupied or empty"""
-        space_counter = 0
-        occupied_slots = 0
-
-        for pos in self.posList:
-            x, y = pos
-            img_crop = img_pro[y:y + self.height, x:x + self.width]
-            count = cv2.countNonZero(img_crop)
-
-            # Enhanced threshold for better detection
-            if count < config.OCCUPANCY_THRESHOLD:
-                color = (0, 255, 0)  # Green for empty
-                thickness = 5
-                space_counter += 1
-            else:
-                color = (0, 0, 255)  # Red for occupied
-                thickness = 2
-                occupied_slots += 1
-                
-            # Draw rectangle and count
-            cv2.rectangle(img, pos, (pos[0] + self.width, pos[1] + self.height), color, thickness)
-            cvzone.putTextRect(img, str(count), (x, y + self.height - 3), scale=1,
-                             thickness=2, offset=0, colorR=color)
+        """Check each parking space and determine if it's occupied or empty
+
+        img_pro may be None, in which case the frame is only preprocessed if the
+        change gate finds a space that needs reclassifying.
+        """
+        counts, occupied = self.classify_spaces(img_pro, img)
+        self.shown_occupied = occupied
+        occupied_slots = int(np.count_nonzero(occupied))
+        space_counter = len(self.posList) - occupied_slots
+
+        labels = self.space_vehicle_labels()
+        for pos, count, is_occupied, label in zip(self.posList, counts.tolist(), occupied.tolist(), labels):
+            self.draw_space(img, pos, count, is_occupied, self.polygons.get(pos), label)
             
         # Display statistics
         cvzone.putTextRect(img, f'Free: {space_counter}/{len(self.posList)}', (100, 50), scale=3,
@@ -247,6 +599,8 @@ class EnhancedParkingDetector:
 
     def generate_csv_report(self, total_slots, occupied_slots, available_slots):
         """Generate CSV report with parking statistics"""
+        import pandas as pd
+
         try:
             data = {
                 'Total Slots': [total_slots],
@@ -267,8 +621,36 @@ class EnhancedParkingDetector:
         except Exception as e:
             logger.error(f"Error generating CSV report: {e}")
 
-    def process_video(self):
-        """Process video file for parking detection"""
+    def generate_space_report(self, occupied):
+        """Append one row per space with its occupancy and the vehicle YOLO or the tracker put in it"""
+        import pandas as pd
+
+        try:
+            positions = np.asarray(list(self.posList), dtype=np.int64).reshape(-1, 2)
+            names = [config.VEHICLE_CLASS_NAMES.get(int(c), 'vehicle') if c >= 0 else ''
+                     for c in self.space_vehicle_type.tolist()]
+            df = pd.DataFrame({
+                'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'Space': np.arange(len(positions)),
+                'X': positions[:, 0],
+                'Y': positions[:, 1],
+                'Occupied': occupied,
+                'Vehicle Type': names,
+                'Confidence': self.space_confidence.round(3),
+                'Track ID': self.space_track_id,
+                'Track Age (frames)': self.space_track_age
+            })
+            csv_path = os.path.join(config.DATA_DIR, config.SPACE_CSV_FILE)
+            append = config.CSV_APPEND_MODE and os.path.exists(csv_path)
+            df.to_csv(csv_path, mode='a' if append else 'w', header=not append, index=False)
+        except Exception as e:
+            logger.error(f"Error generating space report: {e}")
+
+    def process_video(self, sampling=config.FRAME_SAMPLING):
+        """Process video file for parking detection
+
+        With sampling, frames are analyzed at an adaptive rate and the rest are skipped undecoded.
+        """
         if not self.video_path:
             raise ValueError("Video path not provided")
 
@@ -277,52 +659,184 @@ class EnhancedParkingDetector:
             raise FileNotFoundError(f"Video file not found: {self.video_path}")
 
         logger.info(f"Processing video: {self.video_path}")
-        cap = cv2.VideoCapture(self.video_path)
+        # Frames are decoded on a background thread while the previous one is analyzed
+        sampler = AdaptiveSampler() if sampling else None
+        reader = FrameReader(self.video_path, loop=True, sampler=sampler)
+        next_report = 29
 
-        if not cap.isOpened():
-            raise IOError(f"Cannot open video file: {self.video_path}")
-        
-        # Get video properties
-        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
         # Create a window that can be resized
         cv2.namedWindow(config.WINDOW_NAME, cv2.WINDOW_NORMAL)
-        cv2.resizeWindow(config.WINDOW_NAME, frame_width, frame_height)
+        cv2.resizeWindow(config.WINDOW_NAME, reader.width, reader.height)
+
+        if config.ASYNC_DETECTION:
+            # YOLO runs in its own process; the loop below only ever polls its results
+            self.detection_worker = DetectionWorker(rects=self.occupancy.rects())
+            self.detection_worker.start((reader.height, reader.width, 3))
+        if config.VEHICLE_TRACKING:
+            # Tracks follow the detection worker's results when there is one, so nothing blocks the loop
+            self.tracker = VehicleTracker()
+            self.frames_since_detection = self.detector_calls = self.region_detections = 0
+        frames_shown = 0
 
         try:
+            reader.start()
             while True:
-                if cap.get(cv2.CAP_PROP_POS_FRAMES) == cap.get(cv2.CAP_PROP_FRAME_COUNT):
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-
-                success, img = cap.read()
+                success, frame_index, img = reader.read()
                 if not success:
                     break
 
-                processed_img = self.process_frame(img)
-                available_slots, occupied_slots = self.check_parking_space(processed_img, img)
-
-                # Generate CSV report every 30 frames
-                if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) % 30 == 0:
+                # Preprocessing runs inside check_parking_space only when a space changed
+                available_slots, occupied_slots = self.check_parking_space(None, img)
+                frames_shown += 1
+                if sampler is not None:
+                    sampler.report(self.state_changes, len(self.posList))
+
+                # Generate CSV report every 30 frames (sampled frames may not land on the 30th)
+                if frame_index < next_report - 30:
+                    next_report = 29  # The video looped
+                if frame_index >= next_report:
+                    next_report = ((frame_index + 1) // 30 + 1) * 30 - 1
                     self.generate_csv_report(
                         total_slots=len(self.posList),
                         occupied_slots=occupied_slots,
                         available_slots=available_slots
                     )
+                    if self.tracker is not None or self.detection_worker is not None:
+                        self.generate_space_report(self.shown_occupied)
 
                 cv2.imshow(config.WINDOW_NAME, img)
                 if cv2.waitKey(10) & 0xFF == ord('q'):
                     break
         finally:
-            cap.release()
+            reader.stop()
+            if self.detection_worker is not None:
+                self.detection_worker.stop()
+                self.detection_worker = None
+            if self.tracker is not None:
+                logger.info(f"Ran vehicle detection on {self.detector_calls} of {frames_shown} frames "
+                            f"({self.region_detections} regional), {len(self.tracker)} vehicles tracked")
+                self.tracker = None
             cv2.destroyAllWindows()
             logger.info("Video processing completed")
 
+    def analyze_video(self, output_path=None, workers=None, sampling=config.FRAME_SAMPLING):
+        """Run the occupancy pipeline over the whole video as fast as possible, without display
+
+        Only the per-frame occupancy time series is written. With workers > 1 (by default
+        PARALLEL_WORKERS, or all cores) the video is split into frame-range chunks analyzed
+        in a process pool; with sampling (sequential only) just the sampled frames are
+        analyzed and written. Every frame is classified in full unless HEADLESS_CHANGE_GATING
+        is set, so the output does not depend on the number of workers. Returns a summary
+        dict with the output path, frame count, workers, achieved fps and cumulative
+        per-stage timings (summed over the workers in parallel runs).
+        """
+        if not self.video_path:
+            raise ValueError("Video path not provided")
+
+        if not os.path.exists(self.video_path):
+            raise FileNotFoundError(f"Video file not found: {self.video_path}")
+
+        if output_path is None:
+            output_path = os.path.join(config.DATA_DIR, config.TIMESERIES_FILE)
+
+        if workers is None:
+            workers = 1 if sampling else config.PARALLEL_WORKERS or os.cpu_count() or 1
+        elif sampling and workers > 1:
+            logger.warning(f"Frame sampling is sequential only; analyzing every frame across {workers} workers")
+        if workers > 1 and (config.HEADLESS_CHANGE_GATING or self.escalator is not None):
+            logger.warning("Parallel chunks neither change-gate nor escalate; results follow the plain classifier")
+
+        logger.info(f"Analyzing video headless: {self.video_path}")
+        sampler = AdaptiveSampler() if sampling and workers == 1 else None
+        reader = FrameReader(self.video_path, policy='block', sampler=sampler)
+        fps = reader.fps if reader.fps > 0 else 0
+        self.stage_times = defaultdict(float)
+        frames, occupied_series = [], []
+
+        started = time.perf_counter()
+        if workers > 1:
+            reader.stop()
+            frames, occupied_series, chunk_times = analyze_video_parallel(
+                self.video_path, self.posList, self.width, self.height, workers=workers,
+                polygons=self.space_polygons())
+            # Stage times summed over the workers; 'parallel' is the wall time of the pool
+            for stage, seconds in chunk_times.items():
+                self.stage_times[stage] += seconds
+            self.stage_times['parallel'] += time.perf_counter() - started
+        else:
+            gate = self.change_gate
+            if not config.HEADLESS_CHANGE_GATING:
+                self.change_gate = None  # Classify every space of every frame, like the parallel chunks
+            try:
+                with reader:
+                    while True:
+                        start = time.perf_counter()
+                        success, frame_index, img = reader.read()
+                        self.stage_times['decode_wait'] += time.perf_counter() - start
+                        if not success:
+                            break
+
+                        _, occupied = self.classify_spaces(None, img)
+                        if sampler is not None:
+                            sampler.report(self.state_changes, len(self.posList))
+                        frames.append(frame_index)
+                        occupied_series.append(int(np.count_nonzero(occupied)))
+            finally:
+                self.change_gate = gate
+        elapsed = time.perf_counter() - started
+
+        start = time.perf_counter()
+        import pandas as pd
+        frames = np.asarray(frames, dtype=np.int64)
+        occupied_series = np.asarray(occupied_series, dtype=np.int64)
+        df = pd.DataFrame({
+            'Frame': frames,
+            'Time (s)': frames / fps if fps else np.full(len(frames), np.nan),
+            'Occupied Slots': occupied_series,
+            'Available Slots': len(self.posList) - occupied_series
+        })
+        df.to_csv(output_path, index=False)
+        self.stage_times['write'] += time.perf_counter() - start
+        logger.info(f"Saved occupancy time series for {len(frames)} frames to {output_path}")
+
+        return {
+            'output_path': output_path,
+            'frames': len(frames),
+            'workers': workers,
+            'elapsed': elapsed,
+            'fps': len(frames) / elapsed if elapsed > 0 else 0.0,
+            'skipped_frames': reader.skipped_frames,
+            'stage_times': dict(self.stage_times),
+            'escalation': self.escalator.stats() if self.escalator is not None else None
+        }
+
+    def _detect_and_report(self, image, positions, rects, available_slots, occupied_slots):
+        """Detect vehicles on an image snapshot and write the visual, text and CSV reports
+
+        Runs on the report thread while the editor window stays responsive.
+        """
+        print("🤖 Running ML-based vehicle detection...")
+        results = self.car_detector.detect_cars(image, rects)
+        detections, space_status = self.car_detector.process_detections(results, positions, image)
+
+        print("📊 Generating visual report...")
+        report_path, text_report_path = self.car_detector.generate_report(image, positions, detections,
+                                                                          space_status)
+
+        print("💾 Saving CSV data...")
+        self.generate_csv_report(
+            total_slots=len(positions),
+            occupied_slots=occupied_slots,
+            available_slots=available_slots
+        )
+        return report_path, text_report_path
+
     def clear_all_markings(self):
         """Clear all markings and reset to original image"""
         if self.original_image is not None:
             self.current_image = self.original_image.copy()
-        self.posList = []
+            self.image_version += 1
+        self.posList.clear()
         self.history = []
         self.is_reset = True
         self.save_parking_positions()
@@ -334,6 +848,7 @@ class EnhancedParkingDetector:
             self.posList = self.history.pop()
             if self.original_image is not None:
                 self.current_image = self.original_image.copy()
+                self.image_version += 1
             self.save_parking_positions()
             logger.info("Undid last selection")
         else:
@@ -350,12 +865,17 @@ class EnhancedParkingDetector:
 
         logger.info(f"Processing image: {self.image_path}")
 
+        # Load the model while the user edits the layout, so 'd' responds at once
+        if config.MODEL_WARMUP:
+            self.car_detector.warm_up(background=True)
+
         # Read image with full resolution
         self.original_image = cv2.imread(self.image_path, cv2.IMREAD_UNCHANGED)
         if self.original_image is None:
             raise IOError(f"Could not load image from {self.image_path}")
         
         self.current_image = self.original_image.copy()
+        self.image_version += 1
         
         # Get image dimensions
         height, width = self.original_image.shape[:2]
@@ -372,68 +892,45 @@ class EnhancedParkingDetector:
         # Set mouse callback
         cv2.setMouseCallback(config.WINDOW_NAME, self.mouse_callback)
 
+        canvas = EditorCanvas(self._draw_editor_item)
+        self._canvas_image_version = None
+        scene_key = None
+        report_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='report')
+        report_job = None  # Future of the running 'd' detection and report
+        notice = None  # (text, color, monotonic expiry or None while the job runs)
+
         try:
             while True:
-                # Create a bordered image
-                bordered_img = np.zeros((window_height, window_width, 3), dtype=np.uint8)
-                bordered_img[border_size:border_size+height, border_size:border_size+width] = self.current_image.copy()
-
-                # Only draw parking spaces if there are any and not in reset state
-                if self.posList and not self.is_reset:
-                    for pos in self.posList:
-                        x, y = pos
-                        # Adjust coordinates for border
-                        x += border_size
-                        y += border_size
-                        cv2.rectangle(bordered_img, (x, y), (x + self.width, y + self.height), (255, 0, 255), 2)
-
-                # Draw selection rectangle if drawing
+                # Static layers are only redrawn where the image, layout or overlay state changed
+                if self._canvas_image_version != self.image_version:
+                    bordered_img = np.zeros((window_height, window_width, 3), dtype=np.uint8)
+                    bordered_img[border_size:border_size+height, border_size:border_size+width] = self.current_image
+                    canvas.set_background(bordered_img)
+                    self._canvas_image_version = self.image_version
+                    scene_key = None
+                if scene_key != (self.layout_version, self.is_reset, self.show_help):
+                    canvas.update(*self._editor_items(window_width))
+                    scene_key = (self.layout_version, self.is_reset, self.show_help)
+
+                # Draw selection rectangle and grid preview as a transient overlay
                 if self.drawing and self.start_point and self.end_point:
                     x1, y1 = self.start_point
                     x2, y2 = self.end_point
                     # Adjust coordinates for border
-                    x1 += border_size
-                    y1 += border_size
-                    x2 += border_size
-                    y2 += border_size
-                    cv2.rectangle(bordered_img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-                    # Draw grid preview
-                    x1, x2 = min(x1, x2), max(x1, x2)
-                    y1, y2 = min(y1, y2), max(y1, y2)
-
-                    num_spaces_x = (x2 - x1) // self.width
-                    num_spaces_y = (y2 - y1) // self.height
-
-                    for i in range(num_spaces_x):
-                        for j in range(num_spaces_y):
-                            pos_x = x1 + i * self.width
-                            pos_y = y1 + j * self.height
-                            cv2.rectangle(bordered_img, (pos_x, pos_y),
-                                        (pos_x + self.width, pos_y + self.height), (0, 255, 0), 1)
-
-                # Add essential information only if not in reset state
-                if not self.is_reset:
-                    total_spaces = len(self.posList)
-
-                    # Only process image and show statistics if there are parking spaces
-                    if total_spaces > 0:
-                        processed_img = self.process_frame(self.current_image)
-                        available_slots, occupied_slots = self.check_parking_space(processed_img, self.current_image)
-                        empty_spaces = available_slots
-
-                        # Display statistics in the top-right corner
-                        cvzone.putTextRect(bordered_img, f'Total Slots: {total_spaces}',
-                                         (window_width - 250, 30), scale=2, thickness=3, offset=10, colorR=(0,200,0))
-                        cvzone.putTextRect(bordered_img, f'Empty Slots: {empty_spaces}',
-                                         (window_width - 250, 80), scale=2, thickness=3, offset=10, colorR=(0,200,0))
-
-                # Show help text if enabled
-                if self.show_help:
-                    self.add_help_text(bordered_img)
-
-                # Apply zoom and pan
-                display_img = self.apply_zoom_and_pan(bordered_img)
+                    x1, x2 = min(x1, x2) + border_size, max(x1, x2) + border_size
+                    y1, y2 = min(y1, y2) + border_size, max(y1, y2) + border_size
+                    bordered_img = canvas.render((x1 - 1, y1 - 1, x2 + 2, y2 + 2),
+                                                 lambda img: self.draw_grid_preview(img, x1, y1, x2, y2))
+                else:
+                    bordered_img = canvas.render()
+                if notice is not None:
+                    # Drawn on a copy; bordered_img is the canvas's own frame buffer
+                    bordered_img = bordered_img.copy()
+                    cvzone.putTextRect(bordered_img, notice[0], (window_width//2 - 150, window_height - 50),
+                                       scale=3, thickness=3, offset=10, colorR=notice[1])
+
+                # Apply zoom and pan; the view is reused while the canvas is unchanged
+                display_img = self.apply_zoom_and_pan(bordered_img, (canvas.version, notice))
 
                 cv2.imshow(config.WINDOW_NAME, display_img)
 
@@ -447,6 +944,7 @@ class EnhancedParkingDetector:
                 elif key == ord('s'):
                     self.save_parking_positions()
                     self.is_reset = False
+                    bordered_img = bordered_img.copy()
                     cvzone.putTextRect(bordered_img, "Layout Saved!",
                                      (window_width//2 - 100, window_height - 50),
                                      scale=2, thickness=2, offset=10, colorR=(0,255,0))
@@ -457,46 +955,40 @@ class EnhancedParkingDetector:
                         logger.warning("Please select parking spaces first!")
                         print("Please select parking spaces first!")
                         continue
+                    if report_job is not None:
+                        print("Detection is already running...")
+                        continue
 
                     logger.info("Starting vehicle detection and report generation...")
                     print("\n🚗 Detecting vehicles...")
 
-                    # Process the image and detect cars
-                    processed_img = self.process_frame(self.current_image)
-                    available_slots, occupied_slots = self.check_parking_space(processed_img, self.current_image)
-
-                    print("🤖 Running ML-based vehicle detection...")
-                    # Run ML-based car detection
-                    results = self.car_detector.detect_cars(self.current_image)
-                    detections, space_status = self.car_detector.process_detections(results, self.posList, self.current_image)
-
-                    print("📊 Generating visual report...")
-                    # Generate comprehensive report
-                    report_path, text_report_path = self.car_detector.generate_report(
-                        self.current_image, self.posList, detections, space_status
-                    )
-
-                    print("💾 Saving CSV data...")
-                    logger.info(f"Report generated successfully!")
-                    print(f"\n✓ Report generated successfully!")
-                    print(f"  Visual report: {report_path}")
-                    print(f"  Text report: {text_report_path}")
-
-                    # Generate CSV report
-                    self.generate_csv_report(
-                        total_slots=len(self.posList),
-                        occupied_slots=occupied_slots,
-                        available_slots=available_slots
-                    )
-
-                    # Show success message
-                    cvzone.putTextRect(bordered_img, "Report Generated!",
-                                     (window_width//2 - 150, window_height - 50),
-                                     scale=3, thickness=3, offset=10, colorR=(0,255,0))
-                    cv2.imshow(config.WINDOW_NAME, bordered_img)
-                    cv2.waitKey(2000)
+                    # Reuse the memoized occupancy results; detection and reports run in the
+                    # background on a snapshot, so the window keeps responding meanwhile
+                    _, _, available_slots, occupied_slots = self.get_image_results()
+                    report_job = report_executor.submit(
+                        self._detect_and_report, self.current_image.copy(), list(self.posList),
+                        self.occupancy.rects(), available_slots, occupied_slots)
+                    notice = ("Detecting vehicles...", (0, 200, 255), None)
+
+                if report_job is not None and report_job.done():
+                    try:
+                        report_path, text_report_path = report_job.result()
+                        logger.info(f"Report generated successfully!")
+                        print(f"\n✓ Report generated successfully!")
+                        print(f"  Visual report: {report_path}")
+                        print(f"  Text report: {text_report_path}")
+                        notice = ("Report Generated!", (0, 255, 0), time.monotonic() + 2)
+                    except Exception as e:
+                        logger.error(f"Error generating report: {e}")
+                        notice = ("Report Failed!", (0, 0, 255), time.monotonic() + 2)
+                    report_job = None
+                if notice is not None and notice[2] is not None and time.monotonic() >= notice[2]:
+                    notice = None
         finally:
             cv2.destroyAllWindows()
+            if report_job is not None:
+                print("Waiting for the report to finish...")
+            report_executor.shutdown(wait=True)
             logger.info("Image processing completed")
 
 if __name__ == "__main__":
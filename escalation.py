@@ -0,0 +1,76 @@
+"""
+Ambiguity-band escalation for parking space detection
+Keeps the occupancy engine's clear-cut decisions and sends only uncertain spaces to batched YOLO on their crops
+"""
+import numpy as np
+import config
+import logging
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class AmbiguityEscalator:
+    def __init__(self, detector=None, escalate_flips=config.ESCALATE_FLIPS):
+        """Initialize the escalator
+
+        Which spaces are uncertain is up to the occupancy engine (its uncertain() mask).
+        detector needs a detect_batch(crops) method; by default a VehicleDetector is loaded
+        on the first escalation.
+        """
+        self._detector = detector
+        self.escalate_flips = escalate_flips
+        self.last_escalated = 0  # Spaces escalated on the last call
+        self.frames = 0
+        self.spaces = 0
+        self.escalated = 0
+        self.overturned = 0  # Escalated spaces where YOLO disagreed with the occupancy engine
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            from vehicle_detection import VehicleDetector
+            self._detector = VehicleDetector()
+        return self._detector
+
+    def uncertain(self, ambiguous, occupied, previous):
+        """Return the mask of spaces to escalate: the ambiguous ones and, optionally, those that flipped
+
+        previous is the last decided state of the same spaces, or None if there is none.
+        """
+        mask = np.asarray(ambiguous, dtype=bool).copy()
+        if self.escalate_flips and previous is not None:
+            mask |= occupied != previous
+        return mask
+
+    def resolve(self, frame, rects, ambiguous, occupied, previous):
+        """Return occupied with the uncertain spaces decided by YOLO on their crops
+
+        rects are the (N, 4) x, y, width, height of the spaces ambiguous and occupied describe.
+        """
+        escalate = np.flatnonzero(self.uncertain(ambiguous, occupied, previous))
+        self.frames += 1
+        self.spaces += len(occupied)
+        self.last_escalated = len(escalate)
+        if len(escalate) == 0:
+            return occupied
+
+        crops = [frame[max(y, 0):y + h, max(x, 0):x + w] for x, y, w, h in rects[escalate].tolist()]
+        detected = np.array([len(detections) > 0 for detections in self.detector.detect_batch(crops)])
+        occupied = occupied.copy()
+        self.escalated += len(escalate)
+        self.overturned += int(np.count_nonzero(occupied[escalate] != detected))
+        occupied[escalate] = detected
+        logger.debug(f"Escalated {len(escalate)}/{len(occupied)} spaces to YOLO")
+        return occupied
+
+    def stats(self):
+        """Return cumulative escalation statistics"""
+        return {
+            'frames': self.frames,
+            'escalated': self.escalated,
+            'overturned': self.overturned,
+            'escalated_per_frame': self.escalated / self.frames if self.frames else 0.0,
+            'escalation_rate': self.escalated / self.spaces if self.spaces else 0.0,
+        }
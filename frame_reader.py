@@ -0,0 +1,154 @@
+"""
+Threaded frame reader for parking space detection
+Decodes frames on a background thread into a bounded queue so decode and analysis overlap
+"""
+import cv2
+import queue
+import threading
+import time
+import logging
+import config
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+POLICIES = ('block', 'drop')
+
+
+class FrameReader:
+    def __init__(self, source, queue_size=config.PREFETCH_QUEUE_SIZE, policy=config.PREFETCH_POLICY,
+                 loop=False, sampler=None):
+        """Open the video source; call start() to begin decoding
+
+        policy 'block' waits for the consumer when the queue is full (every frame is analyzed),
+        'drop' discards the oldest queued frame so live streams never fall behind.
+        With a sampler, frames it does not select are skipped with grab() and never retrieved.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown prefetch policy '{policy}', expected one of {POLICIES}")
+
+        self.source = source
+        self.policy = policy
+        self.loop = loop
+        self.sampler = sampler
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open video file: {source}")
+
+        # Stream properties are read once instead of on every frame
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        self.frames = queue.Queue(maxsize=max(1, queue_size))
+        self.dropped_frames = 0
+        self.skipped_frames = 0  # Frames grabbed but not retrieved because of sampling
+        self.ended = False  # Set once the end of the stream has been read
+        self.last_timestamp = None  # time.monotonic() at which the last read frame was decoded
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the decode thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._decode, name=f"FrameReader-{self.source}",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def _put(self, item):
+        """Queue an item according to the policy; returns False once the reader is stopped"""
+        if self.policy == 'drop' and item is not None:
+            while not self._stop.is_set():
+                try:
+                    self.frames.put_nowait(item)
+                    return True
+                except queue.Full:
+                    try:
+                        self.frames.get_nowait()
+                        self.dropped_frames += 1
+                    except queue.Empty:
+                        pass
+            return False
+
+        while not self._stop.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decode(self):
+        """Decode thread: read frames until the stream ends or the reader is stopped"""
+        index = 0
+        try:
+            while not self._stop.is_set():
+                success = self.cap.grab()
+                if not success and self.loop and index > 0:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    success = self.cap.grab()
+                    index = 0
+                if not success:
+                    break
+
+                # Skipped frames are only grabbed, never retrieved or color-converted
+                if self.sampler is not None and not self.sampler.should_sample(index, self.fps):
+                    self.skipped_frames += 1
+                    index += 1
+                    continue
+
+                success, frame = self.cap.retrieve()
+                if not success:
+                    break
+                if not self._put((index, frame, time.monotonic())):
+                    break
+                index += 1
+        except Exception as e:
+            logger.error(f"Error decoding frames from {self.source}: {e}")
+        finally:
+            self._put(None)
+
+    def read(self, block=True):
+        """Return (success, frame_index, frame) for the next decoded frame
+
+        With block=False an empty queue returns (False, None, None) immediately;
+        check `ended` to tell that apart from the end of the stream.
+        """
+        if self._thread is None:
+            self.start()
+        try:
+            item = self.frames.get(block=block)
+        except queue.Empty:
+            return False, None, None
+        if item is None:
+            # Leave the end marker for any other consumer
+            self.ended = True
+            self.frames.put(None)
+            return False, None, None
+        index, frame, self.last_timestamp = item
+        return True, index, frame
+
+    def stop(self):
+        """Stop the decode thread and release the capture"""
+        self._stop.set()
+        if self._thread is not None:
+            # Drain so a blocked producer can observe the stop flag
+            while self._thread.is_alive():
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
+                self._thread.join(timeout=0.05)
+            self._thread = None
+        self.cap.release()
+        if self.dropped_frames:
+            logger.info(f"Dropped {self.dropped_frames} stale frames from {self.source}")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
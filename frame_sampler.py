@@ -0,0 +1,51 @@
+"""
+Adaptive frame sampling for parking space detection
+Decides which frames to analyze so the analysis rate follows how busy the lot is
+"""
+import time
+import config
+
+
+class AdaptiveSampler:
+    def __init__(self, base_rate=config.SAMPLING_BASE_RATE_HZ, max_rate=config.SAMPLING_MAX_RATE_HZ,
+                 full_activity=config.SAMPLING_FULL_ACTIVITY, smoothing=config.SAMPLING_SMOOTHING):
+        """Initialize the sampler with its quiet-lot rate, busy-lot rate and activity response
+
+        full_activity is the fraction of spaces changing state per analyzed frame at which
+        the maximum rate is reached; smoothing is the weight of the newest observation.
+        """
+        if base_rate <= 0 or max_rate < base_rate:
+            raise ValueError("Sampling rates must satisfy 0 < base_rate <= max_rate")
+        self.base_rate = base_rate
+        self.max_rate = max_rate
+        self.full_activity = full_activity
+        self.smoothing = smoothing
+        self.rate = base_rate
+        self.activity = 0.0
+        self._last_index = None
+        self._last_time = None
+
+    def should_sample(self, index, fps):
+        """Return True if frame `index` should be decoded and analyzed
+
+        With a known frame rate the decision follows stream time, otherwise wall-clock time.
+        """
+        if self._last_index is None or index < self._last_index:
+            # First frame, or the stream looped back to the start
+            due = True
+        elif fps and fps > 0:
+            due = index - self._last_index >= max(1, round(fps / self.rate))
+        else:
+            due = time.monotonic() - self._last_time >= 1.0 / self.rate
+
+        if due:
+            self._last_index = index
+            self._last_time = time.monotonic()
+        return due
+
+    def report(self, changed, total):
+        """Feed back how many of `total` spaces changed state on the last analyzed frame"""
+        fraction = changed / total if total else 0.0
+        self.activity = self.smoothing * fraction + (1 - self.smoothing) * self.activity
+        level = min(1.0, self.activity / self.full_activity) if self.full_activity > 0 else 1.0
+        self.rate = self.base_rate + (self.max_rate - self.base_rate) * level
@@ -36,10 +36,7 @@ class ImageLabel(QLabel):
                 y = int(y / self.height() * self.parent.detector.current_image.shape[0])
                 
                 # Remove spaces in the clicked area
-                for pos in self.parent.detector.posList[:]:
-                    x1, y1 = pos
-                    if x1 < x < x1 + self.parent.detector.width and y1 < y < y1 + self.parent.detector.height:
-                        self.parent.detector.posList.remove(pos)
+                self.parent.detector.posList.remove_at(x, y)
                 self.parent.detector.save_parking_positions()
                 self.parent.update_frame()
 
@@ -58,20 +55,8 @@ class ImageLabel(QLabel):
                 x2 = int(self.end_point.x() / self.width() * self.parent.detector.current_image.shape[1])
                 y2 = int(self.end_point.y() / self.height() * self.parent.detector.current_image.shape[0])
                 
-                # Calculate grid of parking spaces
-                x1, x2 = min(x1, x2), max(x1, x2)
-                y1, y2 = min(y1, y2), max(y1, y2)
-                
-                # Calculate number of spaces that fit
-                num_spaces_x = (x2 - x1) // self.parent.detector.width
-                num_spaces_y = (y2 - y1) // self.parent.detector.height
-                
-                # Add all spaces in the grid
-                for i in range(num_spaces_x):
-                    for j in range(num_spaces_y):
-                        pos = (x1 + i * self.parent.detector.width, y1 + j * self.parent.detector.height)
-                        if pos not in self.parent.detector.posList:
-                            self.parent.detector.posList.append(pos)
+                # Add the grid of spaces that fits the selection, skipping duplicates
+                self.parent.detector.posList.add_grid(x1, y1, x2, y2)
                 
                 self.parent.detector.save_parking_positions()
                 self.parent.update_frame()
@@ -315,6 +300,7 @@ class ParkingDetectionGUI(QMainWindow):
         if self.detector:
             self.detector.width = self.width_spin.value()
             self.detector.height = self.height_spin.value()
+            self.detector.update_layout()
             # Update other settings as needed
 
     def zoom_in(self):
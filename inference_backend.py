@@ -0,0 +1,242 @@
+"""
+Exported CPU inference backends for the YOLO vehicle detector
+Exports the PyTorch model once to ONNX or OpenVINO IR in MODELS_DIR (optionally int8-quantized
+on our own lot frames) and loads it behind the same ultralytics interface
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import time
+import cv2
+import numpy as np
+import config
+import logging
+from box_ops import best_matches, to_numpy
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+
+def file_checksum(path, length=12):
+    """Return a short SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:length]
+
+
+def resolve_weights(model_path):
+    """Return a local path to model_path, letting ultralytics download official weights that are missing"""
+    if os.path.exists(model_path):
+        return model_path
+    from ultralytics import YOLO
+    return str(YOLO(model_path).ckpt_path)
+
+
+def export_path(model_path, backend, int8=False, imgsz=config.INFERENCE_IMGSZ, models_dir=config.MODELS_DIR):
+    """Return where the export of model_path for this backend lives; the name embeds its checksum"""
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    key = f"{stem}-{file_checksum(model_path)}-{imgsz}{'-int8' if int8 else ''}"
+    if backend == 'onnx':
+        return os.path.join(models_dir, f"{key}.onnx")
+    # ultralytics recognizes OpenVINO models by this directory suffix
+    return os.path.join(models_dir, f"{key}_openvino_model")
+
+
+def calibration_frames(source=None, count=config.INT8_CALIBRATION_FRAMES):
+    """Return up to `count` BGR frames spread evenly over a video, an image or a directory of images"""
+    source = source or config.INT8_CALIBRATION_SOURCE or config.DEFAULT_VIDEO_PATH
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source)
+                       if name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))
+        step = max(1, len(names) // count)
+        frames = [cv2.imread(os.path.join(source, name)) for name in names[::step][:count]]
+        return [frame for frame in frames if frame is not None]
+
+    image = cv2.imread(source)
+    if image is not None:
+        return [image]
+
+    cap = cv2.VideoCapture(source)
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total <= 0:
+            raise IOError(f"Could not read calibration frames from {source}")
+        frames = []
+        for index in np.linspace(0, total - 1, min(count, total)).astype(int).tolist():
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            success, frame = cap.read()
+            if success:
+                frames.append(frame)
+        return frames
+    finally:
+        cap.release()
+
+
+def _write_calibration_dataset(frames, names, directory):
+    """Write frames as an unlabeled YOLO dataset and return its yaml path"""
+    images_dir = os.path.join(directory, 'images')
+    os.makedirs(images_dir, exist_ok=True)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(images_dir, f"{i:05d}.jpg"), frame)
+    yaml_path = os.path.join(directory, 'calibration.yaml')
+    with open(yaml_path, 'w') as f:
+        f.write(f"path: {os.path.abspath(directory)}\ntrain: images\nval: images\nnames:\n")
+        for class_id, name in names.items():
+            f.write(f"  {class_id}: {name}\n")
+    return yaml_path
+
+
+def _quantize_onnx(fp32_path, int8_path, frames, imgsz):
+    """Statically quantize an ONNX model to int8, calibrating on letterboxed lot frames"""
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from vehicle_detection import letterbox
+
+    input_name = onnxruntime.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class LotFrames(CalibrationDataReader):
+        def __init__(self):
+            self.frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            if frame is None:
+                return None
+            canvas, _, _ = letterbox(frame, (imgsz, imgsz))
+            tensor = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)[None].astype(np.float32) / 255
+            return {input_name: tensor}
+
+    quantize_static(fp32_path, int8_path, LotFrames(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+
+
+def export_model(model_path=config.MODEL_PATH, backend=config.INFERENCE_BACKEND, int8=config.INFERENCE_INT8,
+                 imgsz=config.INFERENCE_IMGSZ, calibration_source=None, force=False):
+    """Export model_path for backend into MODELS_DIR unless an export with the same checksum exists
+
+    Returns the path of the exported model.
+    """
+    from ultralytics import YOLO
+
+    # The export is named after the weights' checksum, so they must exist locally first
+    model_path = resolve_weights(model_path)
+    target = export_path(model_path, backend, int8, imgsz)
+    if os.path.exists(target) and not force:
+        return target
+    os.makedirs(config.MODELS_DIR, exist_ok=True)
+
+    logger.info(f"Exporting {model_path} to {backend}{' int8' if int8 else ''} at {target}...")
+    started = time.perf_counter()
+    model = YOLO(model_path)
+    frames = calibration_frames(calibration_source) if int8 else None
+
+    if backend == 'onnx':
+        exported = model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            _quantize_onnx(exported, target, frames, imgsz)
+            os.remove(exported)
+        else:
+            shutil.move(exported, target)
+    elif backend == 'openvino':
+        calibration_dir = os.path.join(config.MODELS_DIR, 'calibration')
+        data = _write_calibration_dataset(frames, model.names, calibration_dir) if int8 else None
+        try:
+            exported = model.export(format='openvino', imgsz=imgsz, dynamic=True, int8=int8, data=data)
+        finally:
+            shutil.rmtree(calibration_dir, ignore_errors=True)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        shutil.move(exported, target)
+    else:
+        raise ValueError(f"Unknown export backend: {backend!r}")
+
+    logger.info(f"Exported {backend} model in {time.perf_counter() - started:.1f} s")
+    return target
+
+
+def load_model(backend=config.INFERENCE_BACKEND, model_path=config.MODEL_PATH, int8=config.INFERENCE_INT8):
+    """Return an ultralytics model running on backend; its results expose the usual .boxes"""
+    from ultralytics import YOLO
+
+    if backend == 'torch':
+        return YOLO(model_path)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend!r}")
+    return YOLO(export_model(model_path, backend, int8), task='detect')
+
+
+def compare_backends(frames, backends, model_path=config.MODEL_PATH, int8=config.INFERENCE_INT8,
+                     iou_threshold=0.5, warmup=3):
+    """Return latency and agreement with the PyTorch detections for each backend
+
+    Accuracy is measured against the 'torch' backend as reference: recall and precision of
+    vehicle boxes matched at iou_threshold, and the mean IoU of the matched boxes.
+    """
+    models = {'torch': load_model('torch', model_path)}
+    for backend in backends:
+        if backend != 'torch':
+            models[backend] = load_model(backend, model_path, int8)
+
+    detections, report = {}, {}
+    for backend, model in models.items():
+        kwargs = dict(imgsz=config.INFERENCE_IMGSZ, conf=config.CONFIDENCE_THRESHOLD,
+                      classes=config.CAR_CLASSES, verbose=False)
+        for frame in frames[:warmup]:
+            model(frame, **kwargs)
+        latencies, boxes = [], []
+        for frame in frames:
+            started = time.perf_counter()
+            result = model(frame, **kwargs)[0]
+            latencies.append(time.perf_counter() - started)
+            boxes.append(to_numpy(result.boxes.xyxy))
+        detections[backend] = boxes
+        latencies = np.array(latencies) * 1000
+        report[backend] = {'mean_ms': float(latencies.mean()), 'p50_ms': float(np.percentile(latencies, 50)),
+                           'p95_ms': float(np.percentile(latencies, 95))}
+
+    for backend in report:
+        matched = total_reference = total_detected = 0
+        ious = []
+        for reference, predicted in zip(detections['torch'], detections[backend]):
+            best, best_iou = best_matches(reference, predicted)
+            hits = best_iou >= iou_threshold
+            matched += int(hits.sum())
+            total_reference += len(reference)
+            total_detected += len(predicted)
+            ious.extend(best_iou[hits].tolist())
+        report[backend].update({
+            'recall': matched / total_reference if total_reference else 1.0,
+            'precision': matched / total_detected if total_detected else 1.0,
+            'mean_iou': float(np.mean(ious)) if ious else 0.0,
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the vehicle detector and compare inference backends')
+    parser.add_argument('--source', default=config.DEFAULT_VIDEO_PATH,
+                        help='Video, image or image directory with lot frames to benchmark on')
+    parser.add_argument('--frames', type=int, default=50, help='Frames to benchmark on')
+    parser.add_argument('--backends', nargs='+', default=['onnx', 'openvino'], choices=BACKENDS)
+    parser.add_argument('--int8', action='store_true', default=config.INFERENCE_INT8,
+                        help='Compare int8-quantized exports')
+    args = parser.parse_args()
+
+    frames = calibration_frames(args.source, args.frames)
+    report = compare_backends(frames, args.backends, int8=args.int8)
+
+    print(f"\n{'Backend':<10} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7} {'precision':>9} {'IoU':>6}")
+    for backend, row in report.items():
+        print(f"{backend:<10} {row['mean_ms']:8.1f} {row['p50_ms']:8.1f} {row['p95_ms']:8.1f} "
+              f"{row['recall']:7.3f} {row['precision']:9.3f} {row['mean_iou']:6.3f}")
+    print(f"\nAccuracy is agreement with the torch backend on {len(frames)} frames from {args.source}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Versioned binary parking layout file
+Stores spaces as a structured NumPy array that is memory-mapped on load, with edits
+appended to a journal that is periodically compacted into the base file
+"""
+import os
+import pickle
+import struct
+import logging
+import numpy as np
+import config
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LAYOUT_MAGIC = b'PKLAYOUT'
+JOURNAL_MAGIC = b'PKJOURNL'
+LAYOUT_VERSION = 2
+HEADER = struct.Struct('<8sHHI')  # magic, format version, record size, reserved
+
+SPACE_REGULAR = 0
+SPACE_SPECIAL = 1
+MAX_POLYGON_VERTICES = 8
+
+_V1_FIELDS = [
+    ('id', '<u4'),
+    ('x', '<i4'),
+    ('y', '<i4'),
+    ('width', '<u2'),
+    ('height', '<u2'),
+    ('type', 'u1'),
+    ('zone', '<u2'),
+]
+# Version 2 adds polygon spaces; x, y, width and height hold their bounding box
+_V2_FIELDS = _V1_FIELDS + [
+    ('vertices', 'u1'),  # 0 for width x height rectangles
+    ('polygon', '<i4', (MAX_POLYGON_VERTICES, 2)),
+]
+LAYOUT_DTYPES = {1: np.dtype(_V1_FIELDS), 2: np.dtype(_V2_FIELDS)}
+JOURNAL_DTYPES = {version: np.dtype([('op', 'u1')] + [(name, dtype.fields[name][0]) for name in dtype.names])
+                  for version, dtype in LAYOUT_DTYPES.items()}
+LAYOUT_DTYPE = LAYOUT_DTYPES[LAYOUT_VERSION]
+JOURNAL_DTYPE = JOURNAL_DTYPES[LAYOUT_VERSION]
+NO_POLYGON = [[0, 0]] * MAX_POLYGON_VERTICES
+
+OP_ADD = 1
+OP_REMOVE = 2
+
+
+def _read_header(f, magic, dtypes, path):
+    """Validate a file header and return (offset of the first record, format version)"""
+    raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise ValueError(f"Truncated layout header in {path}")
+    file_magic, version, record_size, _ = HEADER.unpack(raw)
+    if file_magic != magic:
+        raise ValueError(f"{path} is not a parking layout file")
+    if version not in dtypes:
+        raise ValueError(f"{path} uses layout format version {version}; "
+                         f"this version reads up to {LAYOUT_VERSION}")
+    if record_size != dtypes[version].itemsize:
+        raise ValueError(f"Unexpected record size {record_size} in {path}")
+    return HEADER.size, version
+
+
+def _upgrade(records, dtype):
+    """Convert records of an older format version to `dtype`, defaulting the new fields"""
+    if records.dtype == dtype:
+        return records
+    upgraded = np.zeros(len(records), dtype=dtype)
+    for name in records.dtype.names:
+        upgraded[name] = records[name]
+    return upgraded
+
+
+def is_layout_file(path):
+    """Return True if path exists and starts with the binary layout header"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(LAYOUT_MAGIC)) == LAYOUT_MAGIC
+    except OSError:
+        return False
+
+
+def read_legacy_spaces(path):
+    """Read a legacy position file: a pickled list or lines of comma-separated integers
+
+    Each entry is a top-left (x, y) of a regular space, or a polygon given as a
+    sequence of (x, y) vertices (on a text line: x1,y1,x2,y2,x3,y3,...).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:1] == b'\x80':
+        entries = pickle.loads(data)
+    else:
+        entries = []
+        for line in data.decode('utf-8').splitlines():
+            if line.strip():
+                values = [int(v) for v in line.split(',')]
+                entries.append(tuple(values) if len(values) == 2 else list(zip(values[::2], values[1::2])))
+
+    spaces = []
+    for entry in entries:
+        if len(entry) == 2 and np.isscalar(entry[0]):
+            spaces.append((int(entry[0]), int(entry[1])))
+        else:
+            spaces.append([(int(x), int(y)) for x, y in entry])
+    return spaces
+
+
+def polygon_record(space_id, vertices, space_type=SPACE_REGULAR, zone=0):
+    """Build a record tuple for a polygon space"""
+    vertices = np.asarray(vertices, dtype=np.int64).reshape(-1, 2)
+    if not 3 <= len(vertices) <= MAX_POLYGON_VERTICES:
+        raise ValueError(f"Polygon spaces need 3 to {MAX_POLYGON_VERTICES} vertices, got {len(vertices)}")
+    lo, hi = vertices.min(axis=0), vertices.max(axis=0)
+    padded = vertices.tolist() + [[0, 0]] * (MAX_POLYGON_VERTICES - len(vertices))
+    return (space_id, int(lo[0]), int(lo[1]), int(hi[0] - lo[0] + 1), int(hi[1] - lo[1] + 1),
+            space_type, zone, len(vertices), padded)
+
+
+def spaces_to_records(spaces, width=config.PARKING_WIDTH, height=config.PARKING_HEIGHT):
+    """Build a layout array from (x, y) positions of width x height spaces and polygon vertex lists"""
+    records = []
+    for space_id, space in enumerate(spaces):
+        if len(space) == 2 and np.isscalar(space[0]):
+            records.append((space_id, int(space[0]), int(space[1]), width, height,
+                            SPACE_REGULAR, 0, 0, NO_POLYGON))
+        else:
+            records.append(polygon_record(space_id, space))
+    return np.array(records, dtype=LAYOUT_DTYPE) if records else np.zeros(0, dtype=LAYOUT_DTYPE)
+
+
+def records_to_layout(records):
+    """Split records into (positions, polygons); polygons is None for all-rectangle layouts"""
+    positions = list(zip(records['x'].tolist(), records['y'].tolist()))
+    counts = records['vertices']
+    if not counts.any():
+        return positions, None
+    polygons = [records['polygon'][i, :n].copy() if n else None for i, n in enumerate(counts.tolist())]
+    return positions, polygons
+
+
+def write_layout(path, records):
+    """Atomically write a complete layout file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(LAYOUT_MAGIC, LAYOUT_VERSION, LAYOUT_DTYPE.itemsize, 0))
+        f.write(np.ascontiguousarray(records, dtype=LAYOUT_DTYPE).tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_layout(path):
+    """Memory-map a layout file as a read-only structured array; returns (records, version)
+
+    Files written by an older format version are converted in memory.
+    """
+    with open(path, 'rb') as f:
+        offset, version = _read_header(f, LAYOUT_MAGIC, LAYOUT_DTYPES, path)
+    if os.path.getsize(path) == offset:
+        return np.zeros(0, dtype=LAYOUT_DTYPE), version
+    records = np.memmap(path, dtype=LAYOUT_DTYPES[version], mode='r', offset=offset)
+    return _upgrade(records, LAYOUT_DTYPE), version
+
+
+def read_journal(path):
+    """Read the journaled edits, ignoring a partially written trailing record; returns (entries, version)"""
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=JOURNAL_DTYPE), LAYOUT_VERSION
+    with open(path, 'rb') as f:
+        _, version = _read_header(f, JOURNAL_MAGIC, JOURNAL_DTYPES, path)
+        data = f.read()
+    dtype = JOURNAL_DTYPES[version]
+    usable = len(data) - len(data) % dtype.itemsize
+    return _upgrade(np.frombuffer(data[:usable], dtype=dtype), JOURNAL_DTYPE), version
+
+
+def load_layout(path):
+    """Return (positions, polygons) of a layout stored in any supported format"""
+    if is_layout_file(path):
+        return LayoutFile(path, legacy_path=None).layout()
+    return records_to_layout(spaces_to_records(read_legacy_spaces(path)))
+
+
+class LayoutFile:
+    def __init__(self, path=config.LAYOUT_FILE, legacy_path=config.POSITION_FILE,
+                 max_journal_records=config.LAYOUT_JOURNAL_MAX_RECORDS):
+        """Bind to a binary layout file and its journal
+
+        If the binary file does not exist yet, the layout is read from legacy_path and
+        written in the binary format on the first save.
+        """
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.legacy_path = legacy_path
+        self.max_journal_records = max_journal_records
+        self.journal_records = 0
+        self._records = None  # Array from the last load, until the diff state is built
+        self._state = None  # (x, y) -> record tuple of the layout as last loaded or saved
+        self._next_id = 0
+        self._outdated = False  # Base file or journal written by an older format version
+
+    def load(self):
+        """Return the layout as a structured array
+
+        Without pending journal entries this is a read-only memory map of the file,
+        so even very large layouts load without parsing.
+        """
+        if os.path.exists(self.path):
+            records, version = read_layout(self.path)
+            journal, journal_version = read_journal(self.journal_path)
+            self._outdated = version != LAYOUT_VERSION or journal_version != LAYOUT_VERSION
+            self.journal_records = len(journal)
+            if len(journal):
+                records = self._replay(records, journal)
+            logger.info(f"Loaded {len(records)} parking spaces from {self.path}")
+        elif self.legacy_path is not None and os.path.exists(self.legacy_path):
+            records = spaces_to_records(read_legacy_spaces(self.legacy_path))
+            self.journal_records = 0
+            logger.info(f"Loaded {len(records)} parking positions from legacy file {self.legacy_path}")
+        else:
+            raise FileNotFoundError(f"No parking layout found at '{self.path}'")
+        self._state = None
+        self._records = records
+        return records
+
+    def positions(self):
+        """Return the layout as a list of (x, y) tuples (bounding box corners for polygons)"""
+        return self.layout()[0]
+
+    def layout(self):
+        """Return (positions, polygons); polygons is None unless the layout has polygon spaces"""
+        return records_to_layout(self.load())
+
+    @staticmethod
+    def _replay(records, journal):
+        """Apply journaled adds and removes, in order, on top of the base records"""
+        state = {(r[1], r[2]): r for r in records.tolist()}
+        for entry in journal.tolist():
+            op, record = entry[0], entry[1:]
+            key = (record[1], record[2])
+            if op == OP_ADD:
+                state[key] = record
+            elif op == OP_REMOVE:
+                state.pop(key, None)
+        return np.array(list(state.values()), dtype=LAYOUT_DTYPE)
+
+    def _current_state(self):
+        if self._state is None:
+            records = self._records
+            if records is None:
+                try:
+                    records = self.load()
+                except FileNotFoundError:
+                    records = np.zeros(0, dtype=LAYOUT_DTYPE)
+            self._state = {(r[1], r[2]): r for r in records.tolist()}
+            self._next_id = int(records['id'].max()) + 1 if len(records) else 0
+            self._records = None  # Drop the memory map so compaction can replace the file
+        return self._state
+
+    def save(self, positions, width=config.PARKING_WIDTH, height=config.PARKING_HEIGHT, changes=None):
+        """Persist the layout, appending only the differences to the journal
+
+        changes is an optional list of ('add' | 'remove', (x, y)) edits made since the last
+        load or save; without it the whole layout is diffed against the saved state.
+        """
+        state = self._current_state()
+        if changes is None or not os.path.exists(self.path):
+            wanted = dict.fromkeys((int(x), int(y)) for x, y in positions)
+            changes = [('remove', key) for key in state if key not in wanted]
+            changes += [('add', key) for key in wanted]
+
+        entries = []
+        for op, key in changes:
+            key = (int(key[0]), int(key[1]))
+            record = state.get(key)
+            if op == 'remove':
+                if record is not None:
+                    entries.append((OP_REMOVE,) + state.pop(key))
+                continue
+            if record is not None:
+                # Polygon spaces keep their own shape
+                if record[7] or (record[3], record[4]) == (width, height):
+                    continue
+                # Resized space: keep its id and attributes
+                entries.append((OP_REMOVE,) + state.pop(key))
+                record = (record[0],) + key + (width, height) + record[5:]
+            else:
+                record = (self._next_id,) + key + (width, height, SPACE_REGULAR, 0, 0, NO_POLYGON)
+                self._next_id += 1
+            state[key] = record
+            entries.append((OP_ADD,) + record)
+        self._append(entries)
+
+    def add_polygons(self, polygons, space_type=SPACE_REGULAR, zone=0):
+        """Add polygon spaces given as vertex lists; returns their (x, y) bounding box corners"""
+        state = self._current_state()
+        entries, keys = [], []
+        for vertices in polygons:
+            record = polygon_record(self._next_id, vertices, space_type, zone)
+            key = (record[1], record[2])
+            if key in state:
+                entries.append((OP_REMOVE,) + state.pop(key))
+            self._next_id += 1
+            state[key] = record
+            entries.append((OP_ADD,) + record)
+            keys.append(key)
+        self._append(entries)
+        return keys
+
+    def _append(self, entries):
+        """Journal the entries, or rewrite the base file when it is missing, outdated or the journal is full"""
+        if not os.path.exists(self.path) or self._outdated:
+            self.compact()
+            return
+        if not entries:
+            return
+        if self.journal_records + len(entries) > self.max_journal_records:
+            self.compact()
+            return
+
+        new_journal = not os.path.exists(self.journal_path)
+        with open(self.journal_path, 'ab') as f:
+            if new_journal:
+                f.write(HEADER.pack(JOURNAL_MAGIC, LAYOUT_VERSION, JOURNAL_DTYPE.itemsize, 0))
+            f.write(np.array(entries, dtype=JOURNAL_DTYPE).tobytes())
+        self.journal_records += len(entries)
+
+    def compact(self):
+        """Rewrite the base file from the current state and empty the journal"""
+        state = self._current_state()
+        records = np.array(list(state.values()), dtype=LAYOUT_DTYPE)
+        write_layout(self.path, records)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_records = 0
+        self._outdated = False
+        logger.info(f"Compacted {len(records)} parking spaces into {self.path}")
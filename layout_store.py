@@ -0,0 +1,210 @@
+"""
+Indexed parking layout store
+Keeps parking positions in insertion order with O(1) exact lookups and a uniform grid index for hit-tests
+"""
+import logging
+from collections import defaultdict
+import cv2
+import numpy as np
+import config
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class LayoutStore:
+    def __init__(self, positions=(), width=config.PARKING_WIDTH, height=config.PARKING_HEIGHT,
+                 cell_size=None, polygons=None):
+        """Initialize the store with top-left positions of width x height spaces
+
+        cell_size is the (w, h) of the grid index cells; by default one space per cell.
+        polygons optionally gives, per position, a (k, 2) vertex array that replaces its
+        rectangle (None for rectangles); positions are then the polygons' bounding box corners.
+        """
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self._positions = {}  # Position -> insertion sequence number; dict order is layout order
+        self._sequence = 0
+        self._cells = defaultdict(set)
+        self.polygons = {}  # Position -> int32 vertex array of the polygon spaces
+        self._list = None
+        self.changes = None
+        positions = list(positions)
+        for pos, polygon in zip(positions, polygons if polygons is not None else [None] * len(positions)):
+            self.add(pos, polygon=polygon)
+        # Edits since construction or the last drain_changes(); None once they are unknown
+        self.changes = []
+
+    def _cell_dims(self):
+        return self.cell_size or (max(1, self.width), max(1, self.height))
+
+    def _cell_range(self, x1, y1, x2, y2):
+        """Yield the grid cells overlapping the half-open rectangle [x1, x2) x [y1, y2)"""
+        cw, ch = self._cell_dims()
+        for cx in range(x1 // cw, (x2 - 1) // cw + 1):
+            for cy in range(y1 // ch, (y2 - 1) // ch + 1):
+                yield cx, cy
+
+    def extent(self, pos):
+        """Return the half-open (x1, y1, x2, y2) a stored space covers (the bounding box of a polygon)"""
+        polygon = self.polygons.get(pos)
+        if polygon is None:
+            return pos[0], pos[1], pos[0] + self.width, pos[1] + self.height
+        (x1, y1), (x2, y2) = polygon.min(axis=0).tolist(), polygon.max(axis=0).tolist()
+        return x1, y1, x2 + 1, y2 + 1
+
+    def _space_cells(self, pos):
+        return self._cell_range(*self.extent(pos))
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __contains__(self, pos):
+        return tuple(pos) in self._positions
+
+    def __getitem__(self, index):
+        if self._list is None:
+            self._list = list(self._positions)
+        return self._list[index]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"LayoutStore({list(self)!r}, width={self.width}, height={self.height})"
+
+    def copy(self):
+        """Return an independent copy; its edits are untracked relative to any saved file"""
+        store = LayoutStore(self, self.width, self.height, self.cell_size, [self.polygons.get(pos) for pos in self])
+        store.changes = None
+        return store
+
+    def drain_changes(self):
+        """Return the ('add' | 'remove', pos) edits since the last call, or None if unknown"""
+        changes, self.changes = self.changes, []
+        return changes
+
+    def overlapping(self, pos):
+        """Return the stored positions whose space overlaps a space placed at pos"""
+        x, y = pos
+        return self.query(x, y, x + self.width, y + self.height)
+
+    def add(self, pos, allow_overlap=True, polygon=None):
+        """Add a space; returns False for duplicates and, unless allowed, overlapping spaces
+
+        A polygon space is added at the top-left corner of its vertices' bounding box.
+        """
+        pos = (int(pos[0]), int(pos[1]))
+        if pos in self._positions:
+            return False
+        if not allow_overlap and self.overlapping(pos):
+            return False
+        if polygon is not None:
+            self.polygons[pos] = np.asarray(polygon, dtype=np.int32).reshape(-1, 2)
+        self._positions[pos] = self._sequence
+        self._sequence += 1
+        for cell in self._space_cells(pos):
+            self._cells[cell].add(pos)
+        self._list = None
+        self._record('add', pos)
+        return True
+
+    def add_grid(self, x1, y1, x2, y2, allow_overlap=config.LAYOUT_ALLOW_OVERLAP):
+        """Fill the rectangle from (x1, y1) to (x2, y2) with whole spaces; returns how many were added"""
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+
+        # Calculate number of spaces that fit
+        num_spaces_x = (x2 - x1) // self.width
+        num_spaces_y = (y2 - y1) // self.height
+
+        added = 0
+        for i in range(num_spaces_x):
+            for j in range(num_spaces_y):
+                added += self.add((x1 + i * self.width, y1 + j * self.height), allow_overlap)
+        rejected = num_spaces_x * num_spaces_y - added
+        if rejected:
+            logger.info(f"Skipped {rejected} duplicate or overlapping spaces")
+        return added
+
+    def remove(self, pos):
+        """Remove a space by its position; raises KeyError if it is not stored"""
+        pos = tuple(pos)
+        del self._positions[pos]
+        for cell in self._space_cells(pos):
+            bucket = self._cells[cell]
+            bucket.discard(pos)
+            if not bucket:
+                del self._cells[cell]
+        self.polygons.pop(pos, None)
+        self._list = None
+        self._record('remove', pos)
+
+    def _record(self, op, pos):
+        if self.changes is not None:
+            self.changes.append((op, pos))
+
+    def _contains(self, pos, x, y):
+        polygon = self.polygons.get(pos)
+        if polygon is None:
+            return pos[0] < x < pos[0] + self.width and pos[1] < y < pos[1] + self.height
+        return cv2.pointPolygonTest(polygon, (float(x), float(y)), False) > 0
+
+    def hit_test(self, x, y):
+        """Return the spaces strictly containing the point (x, y), in insertion order"""
+        cw, ch = self._cell_dims()
+        hits = [pos for pos in self._cells.get((x // cw, y // ch), ()) if self._contains(pos, x, y)]
+        return sorted(hits, key=self._positions.get)
+
+    def remove_at(self, x, y):
+        """Remove every space containing the point (x, y); returns the removed positions"""
+        hits = self.hit_test(x, y)
+        for pos in hits:
+            self.remove(pos)
+        return hits
+
+    def query(self, x1, y1, x2, y2):
+        """Return the spaces overlapping the half-open rectangle [x1, x2) x [y1, y2), in insertion order
+
+        Polygon spaces are matched by their bounding boxes.
+        """
+        if x2 <= x1 or y2 <= y1:
+            return []
+        found = set()
+        for cell in self._cell_range(x1, y1, x2, y2):
+            found.update(self._cells.get(cell, ()))
+        hits = []
+        for pos in found:
+            sx1, sy1, sx2, sy2 = self.extent(pos)
+            if sx1 < x2 and sx2 > x1 and sy1 < y2 and sy2 > y1:
+                hits.append(pos)
+        return sorted(hits, key=self._positions.get)
+
+    def resize(self, width, height):
+        """Change the space size and rebuild the grid index"""
+        if (width, height) == (self.width, self.height):
+            return
+        positions = list(self._positions)
+        polygons = self.polygons
+        self.width, self.height = width, height
+        self._positions.clear()
+        self._cells.clear()
+        self.polygons = {}
+        for pos in positions:
+            # Polygon spaces keep their own shape
+            self.add(pos, polygon=polygons.get(pos))
+        # Every stored space changed size
+        self.changes = None
+
+    def clear(self):
+        if self.changes is not None:
+            self.changes.extend(('remove', pos) for pos in self._positions)
+        self._positions.clear()
+        self._cells.clear()
+        self.polygons = {}
+        self._list = None
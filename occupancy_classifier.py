@@ -0,0 +1,108 @@
+"""
+Learned occupancy classifier for parking space detection
+A logistic regression over fill-grid features of every perspective-rectified space patch,
+evaluated for all spaces in one batched call
+"""
+import os
+import cv2
+import numpy as np
+import config
+from patch_extractor import PatchOccupancyEngine
+
+
+def patch_features(patches, grid=config.CLASSIFIER_GRID):
+    """Return an (N, F) float32 feature matrix for (N, H, W) binary patches
+
+    Features are the set fraction of each cell of a rows x cols grid, the overall fill
+    and the horizontal and vertical edge densities (how fragmented the set pixels are).
+    """
+    patches = np.asarray(patches)
+    n, h, w = patches.shape
+    rows, cols = grid
+    binary = (patches > 0).astype(np.float32)
+    cells = binary[:, :h - h % rows, :w - w % cols].reshape(n, rows, h // rows, cols, w // cols).mean(axis=(2, 4))
+    horizontal = (binary[:, :, 1:] != binary[:, :, :-1]).mean(axis=(1, 2))
+    vertical = (binary[:, 1:, :] != binary[:, :-1, :]).mean(axis=(1, 2))
+    return np.column_stack([cells.reshape(n, -1), binary.mean(axis=(1, 2)), horizontal, vertical])
+
+
+class OccupancyClassifier:
+    def __init__(self, weights=None, bias=0.0, mean=None, scale=None, grid=config.CLASSIFIER_GRID,
+                 patch_size=config.PATCH_SIZE):
+        """Initialize the classifier; unfitted until weights are given or fit() is called"""
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float32)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float32)
+        self.grid = tuple(grid)
+        self.patch_size = tuple(patch_size)
+
+    def fit(self, features, labels, l2=1e-3, iterations=25):
+        """Fit L2-regularized logistic regression with Newton's method"""
+        features = np.asarray(features, dtype=np.float64)
+        labels = np.asarray(labels, dtype=np.float64)
+        self.mean = features.mean(axis=0).astype(np.float32)
+        self.scale = np.maximum(features.std(axis=0), 1e-6).astype(np.float32)
+        x = np.column_stack([(features - self.mean) / self.scale, np.ones(len(features))])
+        theta = np.zeros(x.shape[1])
+        penalty = np.full(x.shape[1], l2 * len(x))
+        penalty[-1] = 0  # The bias is not regularized
+
+        for _ in range(iterations):
+            p = 1 / (1 + np.exp(-(x @ theta)))
+            gradient = x.T @ (p - labels) + penalty * theta
+            hessian = (x * (p * (1 - p))[:, None]).T @ x + np.diag(penalty)
+            step = np.linalg.solve(hessian, gradient)
+            theta -= step
+            if np.abs(step).max() < 1e-6:
+                break
+
+        self.weights = theta[:-1].astype(np.float32)
+        self.bias = float(theta[-1])
+        return self
+
+    def predict_proba(self, features):
+        """Return the probability that each space is occupied"""
+        z = ((np.asarray(features, dtype=np.float32) - self.mean) / self.scale) @ self.weights + self.bias
+        return 1 / (1 + np.exp(-np.clip(z, -50, 50)))
+
+    def save(self, path=config.OCCUPANCY_CLASSIFIER_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(path, weights=self.weights, bias=self.bias, mean=self.mean, scale=self.scale,
+                 grid=self.grid, patch_size=self.patch_size)
+
+    @classmethod
+    def load(cls, path=config.OCCUPANCY_CLASSIFIER_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No occupancy classifier at {path}; train one with "
+                                    f"python train_occupancy_classifier.py")
+        with np.load(path) as data:
+            return cls(data['weights'], data['bias'], data['mean'], data['scale'],
+                       data['grid'].tolist(), data['patch_size'].tolist())
+
+
+class ClassifierOccupancyEngine(PatchOccupancyEngine):
+    def __init__(self, positions=None, width=config.PARKING_WIDTH, height=config.PARKING_HEIGHT,
+                 classifier=None, threshold=config.CLASSIFIER_PROBABILITY):
+        """Initialize the engine with a trained classifier (by default loaded from OCCUPANCY_CLASSIFIER_PATH)
+
+        threshold is the predicted probability at and above which a space is occupied.
+        """
+        self.classifier = classifier or OccupancyClassifier.load()
+        super().__init__(positions, width, height, size=self.classifier.patch_size)
+        self.probability = threshold
+        self.last_probabilities = np.zeros(0, dtype=np.float32)
+
+    def compute(self, img_pro, indices=None):
+        """Return (counts, occupied); counts stay rectified-patch pixel counts for display"""
+        patches = self.extractor.extract(img_pro, cv2.INTER_NEAREST)
+        if indices is not None:
+            patches = patches[indices]
+        counts = np.count_nonzero(patches.reshape(len(patches), -1), axis=1).astype(np.int64)
+        self.last_probabilities = self.classifier.predict_proba(patch_features(patches, self.classifier.grid))
+        return counts, self.last_probabilities >= self.probability
+
+    def uncertain(self, counts, band=config.CLASSIFIER_ESCALATION_BAND):
+        """Return the mask of the spaces of the last compute() whose probability lies within band of the threshold"""
+        return np.abs(self.last_probabilities - self.probability) <= band
+
@@ -0,0 +1,184 @@
+"""
+Vectorized occupancy engine for parking space detection
+Counts the nonzero pixels of every parking space in one pass, using an integral image
+for rectangular layouts and a rasterized label map for polygon layouts
+"""
+import cv2
+import numpy as np
+import config
+
+
+class OccupancyEngine:
+    def __init__(self, positions=None, width=config.PARKING_WIDTH, height=config.PARKING_HEIGHT,
+                 threshold=config.OCCUPANCY_THRESHOLD):
+        """Initialize the engine with an array-backed copy of the parking layout"""
+        self.threshold = threshold
+        self.width = width
+        self.height = height
+        self.x = np.empty(0, dtype=np.int64)
+        self.y = np.empty(0, dtype=np.int64)
+        self.polygons = None  # Per-space vertex arrays when the layout has polygon spaces
+        self._binary = None
+        self._integral = None
+        self._labels = None
+        self.set_layout(positions or [], width, height)
+
+    def set_layout(self, positions, width=None, height=None, polygons=None):
+        """Replace the layout; call whenever spaces are added, removed or resized
+
+        polygons optionally gives, per space, a (k, 2) array of vertices that replaces its
+        width x height rectangle; entries that are None stay rectangles.
+        """
+        if width is not None:
+            self.width = width
+        if height is not None:
+            self.height = height
+        coords = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        self.x = coords[:, 0].copy()
+        self.y = coords[:, 1].copy()
+
+        self.polygons = None
+        self._labels = None
+        if polygons is not None and any(polygon is not None for polygon in polygons):
+            self.polygons = []
+            for x, y, polygon in zip(self.x.tolist(), self.y.tolist(), polygons):
+                if polygon is None:
+                    # Same pixels as the rectangle: fillPoly includes the far edges
+                    polygon = [(x, y), (x + self.width - 1, y), (x + self.width - 1, y + self.height - 1),
+                               (x, y + self.height - 1)]
+                self.polygons.append(np.asarray(polygon, dtype=np.int32).reshape(-1, 2))
+
+    def rects(self):
+        """Return the layout as an (N, 4) array of x, y, width, height (bounding boxes for polygons)"""
+        if self.polygons is not None:
+            lo = np.array([polygon.min(axis=0) for polygon in self.polygons], dtype=np.int64).reshape(-1, 2)
+            hi = np.array([polygon.max(axis=0) for polygon in self.polygons], dtype=np.int64).reshape(-1, 2)
+            return np.column_stack([lo, hi - lo + 1])
+        sizes = np.broadcast_to([self.width, self.height], (len(self.x), 2))
+        return np.column_stack([self.x, self.y, sizes])
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def count_threshold(self):
+        """The count at and above which compute() reports a space as occupied"""
+        return self.threshold
+
+    def _ensure_buffers(self, shape):
+        """Allocate the binary mask and integral image once per frame size"""
+        h, w = shape[:2]
+        if self._binary is None or self._binary.shape != (h, w):
+            self._binary = np.empty((h, w), dtype=np.uint8)
+            self._integral = np.empty((h + 1, w + 1), dtype=np.int32)
+
+    def _build_labels(self, shape):
+        """Rasterize the polygons into int32 label images (space index + 1, 0 = background)
+
+        Overlapping spaces go to separate label layers so every space keeps all its pixels;
+        a layout without overlaps needs a single layer. Layers cover only the bounding
+        region of the layout.
+        """
+        h, w = shape[:2]
+        rects = self.rects()
+        x1 = np.clip(rects[:, 0], 0, w)
+        y1 = np.clip(rects[:, 1], 0, h)
+        x2 = np.clip(rects[:, 0] + rects[:, 2], 0, w)
+        y2 = np.clip(rects[:, 1] + rects[:, 3], 0, h)
+        visible = (x2 > x1) & (y2 > y1)
+        if visible.any():
+            crop = (int(x1[visible].min()), int(y1[visible].min()), int(x2[visible].max()), int(y2[visible].max()))
+        else:
+            crop = (0, 0, 0, 0)
+        cx, cy = crop[0], crop[1]
+        crop_shape = (crop[3] - cy, crop[2] - cx)
+
+        layers = []
+        for i in np.flatnonzero(visible).tolist():
+            bx1, by1, bx2, by2 = int(x1[i]) - cx, int(y1[i]) - cy, int(x2[i]) - cx, int(y2[i]) - cy
+            mask = np.zeros((by2 - by1, bx2 - bx1), dtype=np.uint8)
+            cv2.fillPoly(mask, [self.polygons[i] - (cx + bx1, cy + by1)], 1)
+            inside = mask.astype(bool)
+            for layer in layers:
+                if not layer[by1:by2, bx1:bx2][inside].any():
+                    break
+            else:
+                layer = np.zeros(crop_shape, dtype=np.int32)
+                layers.append(layer)
+            layer[by1:by2, bx1:bx2][inside] = i + 1
+
+        self._labels = {
+            'shape': (h, w),
+            'crop': crop,
+            'layers': layers,
+            'binary': np.empty(crop_shape, dtype=np.uint8),
+            'product': np.empty(crop_shape, dtype=np.int32),
+        }
+
+    def _count_labels(self, img_pro):
+        """Count nonzero pixels per polygon with one bincount per label layer"""
+        if self._labels is None or self._labels['shape'] != img_pro.shape[:2]:
+            self._build_labels(img_pro.shape)
+        labels = self._labels
+        x1, y1, x2, y2 = labels['crop']
+        n = len(self.polygons)
+        counts = np.zeros(n + 1, dtype=np.int64)
+        if not labels['layers']:
+            return counts[1:]
+
+        # Label of every set pixel, 0 elsewhere, then one histogram over the whole region
+        cv2.threshold(img_pro[y1:y2, x1:x2], 0, 1, cv2.THRESH_BINARY, dst=labels['binary'])
+        for layer in labels['layers']:
+            np.multiply(layer, labels['binary'], out=labels['product'])
+            counts += np.bincount(labels['product'].ravel(), minlength=n + 1)
+        return counts[1:]
+
+    def count_nonzero(self, img_pro, indices=None):
+        """Return the nonzero pixel count of every space (or only `indices`) as an int array"""
+        if self.polygons is not None:
+            counts = self._count_labels(img_pro)
+            return counts if indices is None else counts[indices]
+
+        xs, ys = (self.x, self.y) if indices is None else (self.x[indices], self.y[indices])
+        if len(xs) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        self._ensure_buffers(img_pro.shape)
+        h, w = img_pro.shape[:2]
+
+        # Map the mask to 0/1 so the summed-area table holds pixel counts
+        cv2.threshold(img_pro, 0, 1, cv2.THRESH_BINARY, dst=self._binary)
+        cv2.integral(self._binary, self._integral, cv2.CV_32S)
+
+        # Clip each rectangle to the frame the same way array slicing would
+        x1 = np.clip(xs, 0, w)
+        y1 = np.clip(ys, 0, h)
+        x2 = np.clip(xs + self.width, 0, w)
+        y2 = np.clip(ys + self.height, 0, h)
+
+        ii = self._integral
+        counts = ii[y2, x2] - ii[y1, x2] - ii[y2, x1] + ii[y1, x1]
+        return counts.astype(np.int64)
+
+    def compute(self, img_pro, indices=None):
+        """Return (counts, occupied) arrays for every space (or only `indices`) in layout order"""
+        counts = self.count_nonzero(img_pro, indices)
+        occupied = counts >= self.threshold
+        return counts, occupied
+
+    def uncertain(self, counts, band=config.ESCALATION_BAND):
+        """Return the mask of the spaces of the last compute() whose counts lie within band * threshold of it"""
+        return np.abs(counts - self.count_threshold) <= band * self.count_threshold
+
+
+def create_occupancy_engine(backend=config.OCCUPANCY_BACKEND, **kwargs):
+    """Return the occupancy engine selected by backend: 'count', 'patch' or 'classifier'"""
+    if backend == 'patch':
+        from patch_extractor import PatchOccupancyEngine
+        return PatchOccupancyEngine(**kwargs)
+    if backend == 'classifier':
+        from occupancy_classifier import ClassifierOccupancyEngine
+        return ClassifierOccupancyEngine(**kwargs)
+    if backend != 'count':
+        raise ValueError(f"Unknown occupancy backend: {backend!r}")
+    return OccupancyEngine(**kwargs)
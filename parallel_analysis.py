@@ -0,0 +1,135 @@
+"""
+Parallel chunked analysis of long video files
+Splits a video into frame ranges and analyzes each range in its own worker process
+"""
+import cv2
+import os
+import time
+import logging
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import config
+from occupancy_engine import create_occupancy_engine
+from preprocess_pipeline import PreprocessPipeline
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _open_at(video_path, start):
+    """Open the video positioned at frame `start`, falling back to grabbing when seeking is inexact"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video file: {video_path}")
+    if start == 0:
+        return cap
+
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == start:
+        return cap
+
+    # Some containers only seek to keyframes; decode forward from the start instead
+    logger.warning(f"Inexact seek in {video_path}, grabbing forward to frame {start}")
+    cap.release()
+    cap = cv2.VideoCapture(video_path)
+    for _ in range(start):
+        if not cap.grab():
+            break
+    return cap
+
+
+def analyze_chunk(video_path, start, stop, positions, width, height, polygons=None):
+    """Analyze frames [start, stop) of a video and return (start, occupied count per frame, stage times)
+
+    stop may be None to read until the end of the stream. Every frame is classified
+    independently, so results do not depend on where the chunk boundaries fall. Stage
+    times are the seconds this chunk spent decoding, preprocessing and counting.
+    """
+    # Each worker owns one core; let the pool provide the parallelism
+    cv2.setNumThreads(1)
+
+    occupancy = create_occupancy_engine(width=width, height=height)
+    occupancy.set_layout(positions, polygons=polygons)
+    preprocess = PreprocessPipeline()
+    preprocess.set_regions(occupancy.rects())
+
+    stage_times = defaultdict(float)
+    started = time.perf_counter()
+    cap = _open_at(video_path, start)
+    stage_times['decode'] += time.perf_counter() - started
+    occupied_series = []
+    try:
+        index = start
+        while stop is None or index < stop:
+            started = time.perf_counter()
+            success, frame = cap.read()
+            stage_times['decode'] += time.perf_counter() - started
+            if not success:
+                break
+            started = time.perf_counter()
+            img_pro = preprocess.process(frame)
+            stage_times['preprocess'] += time.perf_counter() - started
+            started = time.perf_counter()
+            _, occupied = occupancy.compute(img_pro)
+            stage_times['occupancy'] += time.perf_counter() - started
+            occupied_series.append(int(np.count_nonzero(occupied)))
+            index += 1
+    finally:
+        cap.release()
+
+    return start, np.asarray(occupied_series, dtype=np.int64), dict(stage_times)
+
+
+def split_frames(frame_count, workers, chunk_frames=None):
+    """Split [0, frame_count) into (start, stop) ranges; the last range reads to the end"""
+    if chunk_frames is None:
+        # A few chunks per worker keeps the pool busy when chunks decode at different speeds
+        chunk_frames = max(config.PARALLEL_MIN_CHUNK_FRAMES, -(-frame_count // (workers * 4)))
+    starts = list(range(0, max(frame_count, 1), chunk_frames))
+    return [(start, starts[i + 1] if i + 1 < len(starts) else None) for i, start in enumerate(starts)]
+
+
+def analyze_video_parallel(video_path, positions, width=config.PARKING_WIDTH, height=config.PARKING_HEIGHT,
+                           workers=None, chunk_frames=None, polygons=None):
+    """Analyze a whole video across a process pool
+
+    Returns (frames, occupied_series) arrays in frame order, identical to a sequential
+    headless run, which also classifies every frame unless HEADLESS_CHANGE_GATING is set,
+    and the per-stage seconds summed over all chunks (worker time, not wall time).
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video file: {video_path}")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    workers = workers or config.PARALLEL_WORKERS or os.cpu_count() or 1
+    chunks = split_frames(frame_count, workers, chunk_frames)
+    positions = [tuple(pos) for pos in positions]
+    logger.info(f"Analyzing {frame_count} frames of {video_path} in {len(chunks)} chunks "
+                f"across {workers} workers")
+
+    series = []
+    stage_times = defaultdict(float)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(analyze_chunk, video_path, start, stop, positions, width, height, polygons)
+                   for start, stop in chunks]
+        for future in futures:
+            start, occupied_series, chunk_times = future.result()
+            series.append((start, occupied_series))
+            for stage, seconds in chunk_times.items():
+                stage_times[stage] += seconds
+
+    # A chunk may only come up short if the stream really ended there (over-reported frame count)
+    for (start, s), (next_start, _) in zip(series, series[1:]):
+        later = [t for t_start, t in series if t_start > start]
+        if start + len(s) != next_start and any(len(t) for t in later):
+            raise IOError(f"Chunk starting at frame {start} ended early after {len(s)} frames; "
+                          f"the video may be corrupt")
+
+    # Chunks are contiguous, so concatenating in submission order restores frame order
+    occupied_series = np.concatenate([s for _, s in series]) if series else np.zeros(0, dtype=np.int64)
+    frames = np.arange(len(occupied_series), dtype=np.int64)
+    return frames, occupied_series, dict(stage_times)
@@ -1,23 +1,30 @@
 import cv2
-import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
 from vehicle_detection import VehicleDetector
+from occupancy_engine import OccupancyEngine
+from preprocess_pipeline import PreprocessPipeline
+from layout_store import LayoutStore
+from layout_file import LayoutFile
 
 class ParkingDetectionCore:
     def __init__(self, video_path=None, image_path=None, model_path='yolov8n.pt'):
         self.video_path = video_path
         self.image_path = image_path
         self.cap = None
-        self.posList = []
         self.width = 120
         self.height = 43
+        self.posList = LayoutStore(width=self.width, height=self.height)
+        self.layout_file = LayoutFile()
         self.history = []
         self.occupancy_history = []
         self.last_available_slots = 0
         self.last_vehicle_types = {}
         self.last_confidences = []
+        self.last_space_detections = {}  # Detections of each occupied space, keyed by position
+        self.occupancy = OccupancyEngine(width=self.width, height=self.height)
+        self.preprocess = PreprocessPipeline()
         
         # Initialize vehicle detector
         self.vehicle_detector = VehicleDetector(model_path=model_path)
@@ -36,26 +43,35 @@ class ParkingDetectionCore:
         # Load existing parking positions if available
         self.load_parking_positions()
 
+    @property
+    def polygons(self):
+        """Polygon spaces keyed by their bounding box corner"""
+        return self.posList.polygons
+
     def load_parking_positions(self):
         try:
-            if os.path.exists('CarParkPos'):
-                with open('CarParkPos', 'r') as f:
-                    for line in f:
-                        x, y = map(int, line.strip().split(','))
-                        self.posList.append((x, y))
+            if os.path.exists(self.layout_file.path) or os.path.exists(self.layout_file.legacy_path):
+                positions, polygons = self.layout_file.layout()
+                self.posList = LayoutStore(positions, self.width, self.height, polygons=polygons)
         except Exception as e:
             print(f"Error loading parking positions: {e}")
+        self.update_layout()
+
+    def update_layout(self):
+        self.posList.resize(self.width, self.height)
+        polygons = [self.polygons.get(pos) for pos in self.posList] if self.polygons else None
+        self.occupancy.set_layout(list(self.posList), self.width, self.height, polygons)
+        self.preprocess.set_regions(self.occupancy.rects())
 
     def save_parking_positions(self):
+        self.update_layout()
         try:
-            with open('CarParkPos', 'w') as f:
-                for pos in self.posList:
-                    f.write(f"{pos[0]},{pos[1]}\n")
+            self.layout_file.save(self.posList, self.width, self.height, self.posList.drain_changes())
         except Exception as e:
             print(f"Error saving parking positions: {e}")
 
     def clear_all_markings(self):
-        self.posList = []
+        self.posList.clear()
         self.history = []
         self.current_image = self.original_image.copy() if hasattr(self, 'original_image') else None
         self.save_parking_positions()
@@ -66,15 +82,7 @@ class ParkingDetectionCore:
             self.save_parking_positions()
 
     def process_frame(self, frame):
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (3, 3), 1)
-        thresh = cv2.adaptiveThreshold(blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                     cv2.THRESH_BINARY_INV, 25, 16)
-        median = cv2.medianBlur(thresh, 5)
-        kernel = np.ones((3, 3), np.uint8)
-        dilate = cv2.dilate(median, kernel, iterations=1)
-        return dilate
+        return self.preprocess.process(frame)
 
     def check_parking_space(self, processed_img, frame):
         available_slots = 0
@@ -82,23 +90,26 @@ class ParkingDetectionCore:
         vehicle_types = {}
         confidences = []
         
-        for pos in self.posList:
+        counts, occupied = self.occupancy.compute(processed_img)
+        occupied = occupied.tolist()
+
+        # Classify every occupied space in a few batched calls, before anything is drawn on the frame
+        rects = self.occupancy.rects().tolist()
+        occupied_spaces = [i for i, is_occupied in enumerate(occupied) if is_occupied]
+        crops = [frame[max(y, 0):y + h, max(x, 0):x + w] for x, y, w, h in (rects[i] for i in occupied_spaces)]
+        space_detections = dict(zip(occupied_spaces, self.vehicle_detector.detect_batch(crops)))
+
+        for i, (pos, is_occupied) in enumerate(zip(self.posList, occupied)):
             x, y = pos
-            space_crop = processed_img[y:y + self.height, x:x + self.width]
-            count = cv2.countNonZero(space_crop)
             
-            if count < 900:
+            if not is_occupied:
                 color = (0, 255, 0)  # Green for available
                 available_slots += 1
             else:
                 color = (0, 0, 255)  # Red for occupied
                 occupied_slots += 1
                 
-                # Detect vehicle type in occupied space
-                space_img = frame[y:y + self.height, x:x + self.width]
-                detections = self.vehicle_detector.detect(space_img)
-                
-                for detection in detections:
+                for detection in space_detections[i]:
                     vehicle_type = detection['class_name']
                     confidence = detection['confidence']
                     
@@ -107,12 +118,16 @@ class ParkingDetectionCore:
                     vehicle_types[vehicle_type] += 1
                     confidences.append(confidence)
             
-            cv2.rectangle(frame, (x, y), (x + self.width, y + self.height), color, 2)
+            if pos in self.polygons:
+                cv2.polylines(frame, [self.polygons[pos]], True, color, 2)
+            else:
+                cv2.rectangle(frame, (x, y), (x + self.width, y + self.height), color, 2)
         
         # Update statistics
         self.last_available_slots = available_slots
         self.last_vehicle_types = vehicle_types
         self.last_confidences = confidences
+        self.last_space_detections = {self.posList[i]: detections for i, detections in space_detections.items()}
         self.occupancy_history.append(occupied_slots)
         
         return available_slots, occupied_slots
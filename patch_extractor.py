@@ -0,0 +1,126 @@
+"""
+Perspective-rectified patch extraction for parking space detection
+Warps every space onto a canonical grid with one precomputed remap, producing an (N, H, W) tensor
+"""
+import cv2
+import numpy as np
+import config
+from occupancy_engine import OccupancyEngine
+
+MAX_MAP_ROWS = 32766  # cv2.remap rejects maps with SHRT_MAX or more rows
+
+
+def order_quad(points):
+    """Return four corners ordered top-left, top-right, bottom-right, bottom-left
+
+    Polygons that are not quadrilaterals are replaced by their minimum-area rectangle.
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    if len(points) != 4:
+        points = cv2.boxPoints(cv2.minAreaRect(points))
+    # Clockwise on screen (y points down) means a positive shoelace sum
+    x, y = points[:, 0], points[:, 1]
+    if np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)) < 0:
+        points = points[::-1]
+    start = int(np.argmin(points.sum(axis=1)))
+    return np.roll(points, -start, axis=0)
+
+
+class PatchExtractor:
+    def __init__(self, size=config.PATCH_SIZE):
+        """Initialize the extractor with the canonical (width, height) of every patch"""
+        self.size = tuple(size)
+        self.quads = np.empty((0, 4, 2), dtype=np.float32)
+        self._maps = []  # (first row, map1, map2, nearest map) per block of spaces remapped in one call
+        self._patches = None
+
+    def __len__(self):
+        return len(self.quads)
+
+    def set_layout(self, quads):
+        """Precompute the remap tables for (N, 4, 2) space corners in TL, TR, BR, BL order"""
+        self.quads = np.asarray(quads, dtype=np.float32).reshape(-1, 4, 2)
+        n = len(self.quads)
+        w, h = self.size
+        self._maps = []
+        if n == 0:
+            self._patches = np.empty((0, h, w), dtype=np.uint8)
+            return
+
+        # Homography from the canonical patch to each space, applied to every patch pixel at once
+        canonical = np.float32([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]])
+        homographies = np.stack([cv2.getPerspectiveTransform(canonical, quad) for quad in self.quads])
+        u, v = np.meshgrid(np.arange(w, dtype=np.float64), np.arange(h, dtype=np.float64))
+        grid = np.stack([u.ravel(), v.ravel(), np.ones(h * w)])
+        mapped = homographies @ grid  # (N, 3, H*W)
+        map_x = (mapped[:, 0] / mapped[:, 2]).reshape(n * h, w).astype(np.float32)
+        map_y = (mapped[:, 1] / mapped[:, 2]).reshape(n * h, w).astype(np.float32)
+
+        # Fixed-point maps make the per-frame remap considerably cheaper; nearest-neighbour
+        # lookups get their own rounded map, since not every OpenCV build ignores map2 for
+        # them. Large layouts are split into blocks of whole patches under MAX_MAP_ROWS.
+        rows = max(1, MAX_MAP_ROWS // h) * h
+        for start in range(0, n * h, rows):
+            block_x, block_y = map_x[start:start + rows], map_y[start:start + rows]
+            map1, map2 = cv2.convertMaps(block_x, block_y, cv2.CV_16SC2)
+            nearest, _ = cv2.convertMaps(block_x, block_y, cv2.CV_16SC2, nninterpolation=True)
+            self._maps.append((start, map1, map2, nearest))
+        self._patches = np.empty((n * h, w), dtype=np.uint8)
+
+    def extract(self, img, interpolation=cv2.INTER_LINEAR):
+        """Return an (N, H, W) uint8 view of every space rectified from a single-channel image
+
+        The returned array is reused on the next call; copy it to keep it.
+        """
+        w, h = self.size
+        if not self._maps:
+            return self._patches
+        for start, map1, map2, nearest in self._maps:
+            if interpolation == cv2.INTER_NEAREST:
+                map1, map2 = nearest, None
+            cv2.remap(img, map1, map2, interpolation, dst=self._patches[start:start + len(map1)],
+                      borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        return self._patches.reshape(len(self.quads), h, w)
+
+
+class PatchOccupancyEngine(OccupancyEngine):
+    def __init__(self, positions=None, width=config.PARKING_WIDTH, height=config.PARKING_HEIGHT,
+                 threshold=config.PATCH_OCCUPANCY_FRACTION, size=config.PATCH_SIZE):
+        """Initialize the engine; threshold is the occupied fraction of a rectified patch
+
+        Every space is warped to the same canonical size, so one fractional threshold
+        applies equally to near and far spaces.
+        """
+        self.extractor = PatchExtractor(size)
+        super().__init__(positions, width, height)
+        self.fraction = threshold
+
+    def quads(self):
+        """Return the (N, 4, 2) corners of every space"""
+        if self.polygons is not None:
+            return np.array([order_quad(polygon) for polygon in self.polygons], dtype=np.float32).reshape(-1, 4, 2)
+        x, y = self.x, self.y
+        x2, y2 = x + self.width - 1, y + self.height - 1
+        return np.stack([np.column_stack(corner) for corner in ((x, y), (x2, y), (x2, y2), (x, y2))],
+                        axis=1).astype(np.float32)
+
+    def set_layout(self, positions, width=None, height=None, polygons=None):
+        super().set_layout(positions, width, height, polygons)
+        self.extractor.set_layout(self.quads())
+
+    def count_nonzero(self, img_pro, indices=None):
+        """Return the nonzero pixel count of every rectified patch (or only `indices`)"""
+        patches = self.extractor.extract(img_pro, cv2.INTER_NEAREST)
+        counts = np.count_nonzero(patches.reshape(len(patches), -1), axis=1).astype(np.int64)
+        return counts if indices is None else counts[indices]
+
+    @property
+    def count_threshold(self):
+        w, h = self.extractor.size
+        return self.fraction * w * h
+
+    def compute(self, img_pro, indices=None):
+        """Return (counts, occupied) with counts in canonical patch pixels"""
+        counts = self.count_nonzero(img_pro, indices)
+        occupied = counts >= self.count_threshold
+        return counts, occupied
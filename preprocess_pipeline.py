@@ -0,0 +1,160 @@
+"""
+Reusable preprocessing pipeline for parking space detection
+Owns preallocated buffers so frames are processed without per-frame allocations,
+and can restrict processing to padded tiles around the parking layout
+"""
+import cv2
+import numpy as np
+import config
+
+DEFAULT_STEPS = ('gray', 'blur', 'threshold', 'median', 'dilate')
+
+
+class PreprocessPipeline:
+    def __init__(self, steps=DEFAULT_STEPS):
+        """Initialize the pipeline with the stages to run, in order"""
+        unknown = [step for step in steps if not hasattr(self, f'_{step}')]
+        if unknown:
+            raise ValueError(f"Unknown preprocessing steps: {unknown}")
+        if not steps or steps[0] != 'gray':
+            raise ValueError("The first preprocessing step must be 'gray'")
+
+        self.steps = tuple(steps)
+        self._stages = [(step, getattr(self, f'_{step}')) for step in self.steps]
+        self.blur_ksize = config.BLUR_KERNEL_SIZE
+        self.blur_sigma = config.BLUR_SIGMA
+        self.threshold_block_size = config.THRESHOLD_BLOCK_SIZE
+        self.threshold_c = config.THRESHOLD_C
+        self.median_ksize = config.MEDIAN_KERNEL_SIZE
+        self.dilate_iterations = config.DILATE_ITERATIONS
+        self.kernel = np.ones(config.DILATE_KERNEL_SIZE, np.uint8)
+
+        # One output buffer per stage, allocated for the current stream resolution
+        self.buffers = {}
+        self.shape = None
+
+        # ROI tiles around the layout; None means the whole frame is processed
+        self.use_roi = config.ROI_PREPROCESSING
+        self.regions = np.empty((0, 4), dtype=np.int64)
+        self.tiles = None
+        self.output = None
+        self._tiles_dirty = True
+
+    def support_radius(self):
+        """Number of pixels an output pixel depends on in each direction, over all stages"""
+        radii = {
+            'gray': 0,
+            'blur': self.blur_ksize[0] // 2,
+            'threshold': self.threshold_block_size // 2,
+            'median': self.median_ksize // 2,
+            'dilate': (self.kernel.shape[0] // 2) * self.dilate_iterations,
+        }
+        return sum(radii[step] for step in self.steps)
+
+    def set_regions(self, rects):
+        """Set the (x, y, w, h) regions whose output is needed; tiles are rebuilt lazily"""
+        self.regions = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+        self._tiles_dirty = True
+
+    def _ensure_buffers(self, shape):
+        """(Re)allocate stage buffers when the frame resolution or layout changes"""
+        h, w = shape[:2]
+        if self.shape != (h, w):
+            self.shape = (h, w)
+            self._tiles_dirty = True
+        if self._tiles_dirty:
+            self._build_tiles()
+            if self.tiles is None:
+                self.buffers = {step: np.empty((h, w), dtype=np.uint8) for step in self.steps}
+            else:
+                self.buffers = {}
+            self._tiles_dirty = False
+
+    def _build_tiles(self):
+        """Split the padded union of the regions into tiles with their own stage buffers"""
+        self.tiles = None
+        self.output = None
+        if not self.use_roi or len(self.regions) == 0:
+            return
+
+        h, w = self.shape
+        pad = self.support_radius()
+
+        # Rasterize the padded regions and take each connected blob's bounding box as a tile
+        mask = np.zeros((h, w), dtype=np.uint8)
+        for x, y, rw, rh in self.regions.tolist():
+            x1, y1 = max(0, x - pad), max(0, y - pad)
+            x2, y2 = min(w, x + rw + pad), min(h, y + rh + pad)
+            if x1 < x2 and y1 < y2:
+                mask[y1:y2, x1:x2] = 1
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+        tiles = []
+        for px, py, pw, ph, _ in stats[1:].tolist():
+            px2, py2 = px + pw, py + ph
+            # Only pixels at least `pad` away from an inner tile edge match a full-frame run
+            valid = (px + pad if px > 0 else 0, py + pad if py > 0 else 0,
+                     px2 - pad if px2 < w else w, py2 - pad if py2 < h else h)
+            buffers = {step: np.empty((ph, pw), dtype=np.uint8) for step in self.steps}
+            tiles.append({'padded': (px, py, px2, py2), 'valid': valid, 'buffers': buffers})
+
+        # Fall back to the full frame when tiling would not save any work
+        if sum(t['buffers'][self.steps[0]].size for t in tiles) >= h * w:
+            return
+
+        self.tiles = tiles
+        self.output = np.zeros((h, w), dtype=np.uint8)
+
+    def _gray(self, src, dst):
+        if src.ndim == 2:
+            np.copyto(dst, src)
+        else:
+            code = cv2.COLOR_BGRA2GRAY if src.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            cv2.cvtColor(src, code, dst=dst)
+
+    def _blur(self, src, dst):
+        cv2.GaussianBlur(src, self.blur_ksize, self.blur_sigma, dst=dst)
+
+    def _threshold(self, src, dst):
+        cv2.adaptiveThreshold(src, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV,
+                              self.threshold_block_size, self.threshold_c, dst=dst)
+
+    def _median(self, src, dst):
+        cv2.medianBlur(src, self.median_ksize, dst=dst)
+
+    def _dilate(self, src, dst):
+        cv2.dilate(src, self.kernel, dst=dst, iterations=self.dilate_iterations)
+
+    def _run(self, src, buffers):
+        for step, stage in self._stages:
+            dst = buffers[step]
+            stage(src, dst)
+            src = dst
+        return src
+
+    def process(self, frame):
+        """Run every stage on the frame and return the final stage's buffer
+
+        With ROI tiles active, only the layout regions are processed; they match a
+        full-frame run exactly and everything outside them is zero.
+        The returned array is reused on the next call; copy it if it must outlive the frame.
+        """
+        self._ensure_buffers(frame.shape)
+        if self.tiles is None:
+            return self._run(frame, self.buffers)
+
+        for tile in self.tiles:
+            px1, py1, px2, py2 = tile['padded']
+            vx1, vy1, vx2, vy2 = tile['valid']
+            result = self._run(frame[py1:py2, px1:px2], tile['buffers'])
+            self.output[vy1:vy2, vx1:vx2] = result[vy1 - py1:vy2 - py1, vx1 - px1:vx2 - px1]
+        return self.output
+
+    def stage(self, step):
+        """Return the most recent full-frame output buffer of a stage (e.g. for debug views)
+
+        Intermediate stages are only filled when the whole frame is processed.
+        """
+        if self.tiles is not None and step == self.steps[-1]:
+            return self.output
+        return self.buffers.get(step)
@@ -4,6 +4,10 @@ Car Parking Detection System - Main Entry Point
 Run this script to start the parking detection system
 """
 
+import time
+
+STARTED = time.perf_counter()  # Before the imports below, so startup time includes them
+
 import argparse
 import sys
 import os
@@ -38,6 +42,19 @@ def print_banner():
     print(banner)
 
 
+def startup_summary():
+    """Return a one-line summary of the time (and, where available, peak memory) since launch"""
+    summary = f"{time.perf_counter() - STARTED:.2f} s"
+    try:
+        import resource
+    except ImportError:
+        return summary
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    peak_mb = peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+    return f"{summary}, peak RSS {peak_mb:.0f} MB"
+
+
 def validate_file(file_path, file_type="file"):
     """Validate file exists and is accessible"""
     if not file_path:
@@ -58,6 +75,61 @@ def validate_file(file_path, file_type="file"):
     return True
 
 
+def print_headless_summary(summary):
+    """Print throughput and per-stage timings of a headless analysis run"""
+    print("\n" + "="*60)
+    print("HEADLESS ANALYSIS SUMMARY:")
+    print("="*60)
+    print(f"  Frames analyzed: {summary['frames']} ({summary['workers']} worker{'s' if summary['workers'] > 1 else ''})")
+    print(f"  Elapsed time:    {summary['elapsed']:.2f} s")
+    print(f"  Achieved fps:    {summary['fps']:.1f}")
+    if summary['skipped_frames']:
+        print(f"  Frames skipped by sampling: {summary['skipped_frames']}")
+    if summary.get('escalation'):
+        escalation = summary['escalation']
+        print(f"  Spaces escalated to YOLO: {escalation['escalated']} "
+              f"({escalation['escalated_per_frame']:.1f}/frame, {escalation['escalation_rate']:.1%} of decisions, "
+              f"{escalation['overturned']} overturned)")
+    print("  Per-stage timings:")
+    frames = max(summary['frames'], 1)
+    for stage, seconds in summary['stage_times'].items():
+        print(f"    {stage:<12} {seconds:8.2f} s total  {seconds / frames * 1000:8.3f} ms/frame")
+    print(f"  Time series: {summary['output_path']}")
+    print("="*60)
+
+
+def run_streams(streams_path, workers=None):
+    """Supervise all camera streams defined in a JSON file until they end or Ctrl+C"""
+    if not validate_file(streams_path, "streams file"):
+        return 1
+
+    from stream_supervisor import StreamSupervisor, load_streams
+
+    try:
+        supervisor = StreamSupervisor(load_streams(streams_path), workers=workers)
+        print(f"\n📡 Supervising {len(supervisor.streams)} camera streams (Ctrl+C to stop)\n")
+        try:
+            stats = supervisor.run()
+        except KeyboardInterrupt:
+            supervisor.stop()
+            stats = supervisor.stats()
+
+        print("\n" + "="*60)
+        print("STREAM SUMMARY:")
+        print("="*60)
+        for name, s in stats.items():
+            vehicles = f", vehicles {s['vehicles']} ({s['detections']} detections)" if s['detections'] else ""
+            print(f"  {name}: {s['frames']} frames, {s['fps']:.1f} fps, lag {s['lag_ms']:.0f} ms, "
+                  f"dropped {s['dropped']}, free {s['available']}/{s['available'] + s['occupied']}{vehicles}")
+        print("="*60)
+        return 0
+
+    except Exception as e:
+        logger.exception(f"Error supervising streams: {e}")
+        print(f"\n❌ Error: {e}")
+        return 1
+
+
 def main():
     """Main entry point for the application"""
 
@@ -79,6 +151,15 @@ Examples:
   # Process both (image for setup, video for detection)
   python run.py --image carParkImg.png --video carPark.mp4
 
+  # Analyze a video as fast as possible without display (writes only the time series)
+  python run.py --video carPark.mp4 --headless
+
+  # Same, on one process instead of all cores
+  python run.py --video carPark.mp4 --headless --workers 1
+
+  # Supervise several cameras in one process
+  python run.py --streams streams.json
+
 Keyboard Shortcuts (during execution):
   D - Detect vehicles and generate reports
   S - Save parking space layout
@@ -112,6 +193,34 @@ For more information, visit: https://github.com/8harath/Car-Parking-Detection
         help='Processing mode: image, video, or both'
     )
 
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help='Analyze the video without display or drawing and write only the occupancy time series'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Worker processes for --headless (default PARALLEL_WORKERS, or all cores; 1 with --sample), '
+             'or worker threads for --streams (default one per stream)'
+    )
+
+    parser.add_argument(
+        '--sample',
+        action='store_true',
+        default=config.FRAME_SAMPLING,
+        help='Analyze video frames at an adaptive rate (2-10 Hz by default) and skip the rest undecoded'
+    )
+
+    parser.add_argument(
+        '--streams',
+        type=str,
+        default=None,
+        help='JSON file of camera streams to supervise concurrently in this process'
+    )
+
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -135,8 +244,13 @@ For more information, visit: https://github.com/8harath/Car-Parking-Detection
     logger.info("Starting Car Parking Detection System...")
     print("\n🚀 Starting application...")
 
+    if args.streams:
+        return run_streams(args.streams, args.workers)
+
     # Determine mode
-    if args.video and not args.image:
+    if args.headless:
+        mode = 'headless'
+    elif args.video and not args.image:
         mode = 'video'
     elif args.image and not args.video:
         mode = 'image'
@@ -151,7 +265,7 @@ For more information, visit: https://github.com/8harath/Car-Parking-Detection
             sys.exit(1)
         print(f"✓ Image file found: {args.image}")
 
-    if mode in ['video', 'both']:
+    if mode in ['video', 'both', 'headless']:
         if not args.video:
             logger.error("Video mode requires --video argument")
             print("❌ Error: Video mode requires a video file path")
@@ -168,10 +282,12 @@ For more information, visit: https://github.com/8harath/Car-Parking-Detection
 
         detector = EnhancedParkingDetector(
             image_path=args.image if mode in ['image', 'both'] else None,
-            video_path=args.video if mode in ['video', 'both'] else None
+            video_path=args.video if mode in ['video', 'both', 'headless'] else None
         )
 
-        print("✓ Detector initialized successfully")
+        startup = startup_summary()
+        logger.info(f"Startup completed in {startup}")
+        print(f"✓ Detector initialized successfully ({startup})")
 
         # Process based on mode
         if mode == 'image' or mode == 'both':
@@ -194,7 +310,14 @@ For more information, visit: https://github.com/8harath/Car-Parking-Detection
             print(f"\n🎥 Processing video: {args.video}")
             print("\nPress 'Q' to quit\n")
 
-            detector.process_video()
+            detector.process_video(sampling=args.sample)
+
+        if mode == 'headless':
+            logger.info(f"Analyzing video headless: {args.video}")
+            print(f"\n🎥 Analyzing video headless: {args.video}")
+
+            summary = detector.analyze_video(workers=args.workers, sampling=args.sample)
+            print_headless_summary(summary)
 
         # Success message
         logger.info("Processing completed successfully")
@@ -0,0 +1,295 @@
+"""
+Multi-camera stream supervisor for parking space detection
+Runs many camera streams concurrently in one process, each with its own layout and thresholds
+"""
+import cv2
+import json
+import time
+import threading
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import config
+from occupancy_engine import create_occupancy_engine
+from preprocess_pipeline import PreprocessPipeline
+from change_gate import ChangeGate
+from box_ops import rects_to_boxes, best_matches, take_matched
+from frame_reader import FrameReader
+from frame_sampler import AdaptiveSampler
+from layout_file import load_layout
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class CameraStream:
+    def __init__(self, name, source, positions, width=config.PARKING_WIDTH, height=config.PARKING_HEIGHT,
+                 occupancy_threshold=None, policy='drop', loop=False, sampling=config.FRAME_SAMPLING,
+                 polygons=None, detection_interval=config.SUPERVISOR_DETECTION_INTERVAL):
+        """Initialize one camera stream with its own layout, thresholds and pipeline state
+
+        occupancy_threshold overrides the threshold of the OCCUPANCY_BACKEND engine, in its
+        units. polygons optionally gives a vertex array per space (None for rectangles).
+        detection_interval is the seconds between shared-YOLO detections (None = never).
+        """
+        self.name = name
+        self.source = source
+        self.posList = [tuple(pos) for pos in positions]
+        self.width, self.height = width, height
+        self.policy = policy
+        self.loop = loop
+        self.sampler = AdaptiveSampler() if sampling else None
+        self.reader = None
+        self.error = None  # Why the stream could not be opened
+
+        thresholds = {} if occupancy_threshold is None else {'threshold': occupancy_threshold}
+        self.occupancy = create_occupancy_engine(width=width, height=height, **thresholds)
+        self.occupancy.set_layout(self.posList, polygons=polygons)
+        self.preprocess = PreprocessPipeline()
+        self.preprocess.set_regions(self.occupancy.rects())
+        self.change_gate = ChangeGate() if config.CHANGE_GATING else None
+        if self.change_gate is not None:
+            self.change_gate.set_layout(self.occupancy.rects())
+
+        self.space_counts = np.zeros(len(self.posList), dtype=np.int64)
+        self.space_occupied = np.zeros(len(self.posList), dtype=bool)
+        self.last_frame = None
+
+        # Vehicle detection on the supervisor's shared model
+        self.detection_interval = detection_interval
+        self.vehicle_detected = np.zeros(len(self.posList), dtype=bool)
+        self.space_vehicle_type = np.full(len(self.posList), -1, dtype=np.int64)  # COCO class or -1
+        self.space_confidence = np.zeros(len(self.posList), dtype=np.float32)
+        self.detections = 0
+        self.last_detection = None  # time.monotonic() of the last detection request
+
+        # Throughput and lag statistics
+        self.frames_processed = 0
+        self.fps = 0.0
+        self.lag = 0.0
+        self._window_start = None
+        self._window_frames = 0
+
+    def open(self):
+        """Open the capture and start decoding"""
+        self.reader = FrameReader(self.source, policy=self.policy, loop=self.loop,
+                                  sampler=self.sampler).start()
+        self._window_start = time.monotonic()
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.stop()
+
+    @property
+    def ended(self):
+        return self.error is not None or (self.reader is not None and self.reader.ended)
+
+    def detection_due(self, now):
+        """Whether the stream has a frame and its next vehicle detection is due"""
+        if self.detection_interval is None or self.last_frame is None:
+            return False
+        return self.last_detection is None or now - self.last_detection >= self.detection_interval
+
+    def has_frame(self):
+        return self.reader is not None and not self.reader.ended and not self.reader.frames.empty()
+
+    def step(self):
+        """Classify the next queued frame; returns False if no frame was available"""
+        success, _, frame = self.reader.read(block=False)
+        if not success:
+            return False
+
+        changes = 0
+        if self.change_gate is not None:
+            stale = np.flatnonzero(self.change_gate.update(frame))
+            if len(stale):
+                counts, occupied = self.occupancy.compute(self.preprocess.process(frame), stale)
+                changes = int(np.count_nonzero(occupied != self.space_occupied[stale]))
+                self.space_counts[stale], self.space_occupied[stale] = counts, occupied
+        else:
+            counts, occupied = self.occupancy.compute(self.preprocess.process(frame))
+            changes = int(np.count_nonzero(occupied != self.space_occupied))
+            self.space_counts, self.space_occupied = counts, occupied
+        if self.sampler is not None and self.frames_processed:
+            self.sampler.report(changes, len(self.posList))
+        self.last_frame = frame
+
+        now = time.monotonic()
+        self.lag = now - self.reader.last_timestamp
+        self.frames_processed += 1
+        self._window_frames += 1
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_frames / elapsed
+            self._window_start = now
+            self._window_frames = 0
+        return True
+
+    def stats(self):
+        """Return the current throughput, lag and occupancy of this stream"""
+        occupied = int(np.count_nonzero(self.space_occupied))
+        return {
+            'fps': self.fps,
+            'lag_ms': self.lag * 1000,
+            'frames': self.frames_processed,
+            'dropped': self.reader.dropped_frames if self.reader is not None else 0,
+            'skipped': self.reader.skipped_frames if self.reader is not None else 0,
+            'occupied': occupied,
+            'available': len(self.posList) - occupied,
+            'detections': self.detections,
+            'vehicles': int(np.count_nonzero(self.vehicle_detected))
+        }
+
+
+class StreamSupervisor:
+    def __init__(self, streams, workers=config.SUPERVISOR_WORKERS, opencv_threads=config.SUPERVISOR_OPENCV_THREADS):
+        """Initialize the supervisor with its streams, worker pool size and OpenCV thread budget"""
+        self.streams = {stream.name: stream for stream in streams}
+        self.workers = workers or len(self.streams) or 1
+        # Worker threads already run streams in parallel; keep OpenCV from spawning more per call
+        cv2.setNumThreads(opencv_threads)
+        self._car_detector = None
+        self._detector_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def car_detector(self):
+        """One YOLO model shared by all streams, loaded on first use"""
+        with self._detector_lock:
+            if self._car_detector is None:
+                from car_detector import CarDetector
+                self._car_detector = CarDetector()
+            return self._car_detector
+
+    def detect_vehicles(self, name):
+        """Run YOLO on a stream's latest frame and match detections to its spaces
+
+        Each space, with the stream's own size and polygons, takes the vehicle box it
+        overlaps most. Updates the stream's per-space vehicle_detected, space_vehicle_type
+        and space_confidence arrays and returns vehicle_detected.
+        """
+        stream = self.streams[name]
+        frame = stream.last_frame
+        if frame is None:
+            return stream.vehicle_detected
+        detector = self.car_detector
+        rects = stream.occupancy.rects()
+        # The model is shared, so inference is serialized across streams
+        with self._detector_lock:
+            boxes, classes, confidences = detector.vehicle_boxes(detector.detect_cars(frame, rects))
+        best, best_iou = best_matches(rects_to_boxes(rects), boxes)
+        stream.vehicle_detected = best_iou >= config.ASYNC_DETECTION_MIN_IOU
+        stream.space_vehicle_type = take_matched(classes, best, -1)
+        stream.space_confidence = take_matched(np.asarray(confidences, dtype=np.float32), best, 0)
+        stream.detections += 1
+        return stream.vehicle_detected
+
+    def stats(self):
+        """Return per-stream statistics keyed by stream name"""
+        return {name: stream.stats() for name, stream in self.streams.items()}
+
+    def log_stats(self):
+        for name, stats in self.stats().items():
+            vehicles = f", vehicles {stats['vehicles']}" if stats['detections'] else ""
+            logger.info(f"[{name}] {stats['fps']:.1f} fps, lag {stats['lag_ms']:.0f} ms, "
+                        f"dropped {stats['dropped']}, free {stats['available']}/"
+                        f"{stats['available'] + stats['occupied']}{vehicles}")
+
+    def stop(self):
+        self._stop.set()
+
+    def _open_streams(self):
+        """Open every stream; one that fails is logged and left out while the others run"""
+        for stream in self.streams.values():
+            try:
+                stream.open()
+            except Exception as e:
+                stream.error = str(e)
+                logger.error(f"[{stream.name}] Could not open {stream.source}: {e}")
+        if all(stream.error is not None for stream in self.streams.values()):
+            raise IOError("No camera stream could be opened")
+
+    def _schedule_detections(self, executor, detecting, now):
+        """Queue due vehicle detections on the shared model and collect finished ones"""
+        for name in [n for n, f in detecting.items() if f.done()]:
+            try:
+                detecting.pop(name).result()
+            except Exception as e:
+                logger.error(f"[{name}] Vehicle detection failed: {e}")
+        for stream in self.streams.values():
+            if stream.name not in detecting and stream.detection_due(now):
+                stream.last_detection = now
+                detecting[stream.name] = executor.submit(self.detect_vehicles, stream.name)
+
+    def run(self, duration=None, report_interval=config.SUPERVISOR_REPORT_INTERVAL):
+        """Process all streams until they end, stop() is called or `duration` seconds pass
+
+        Streams with a detection_interval also get vehicle detections on the shared YOLO
+        model, one at a time on their own thread so classification never waits for them.
+        """
+        started = last_report = time.monotonic()
+        in_flight = {}
+        detecting = {}
+        try:
+            self._open_streams()
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='stream') as executor, \
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix='detect') as detector:
+                while not self._stop.is_set():
+                    # Each stream has at most one frame in flight so its frames stay in order
+                    for stream in self.streams.values():
+                        if stream.name not in in_flight and stream.has_frame():
+                            in_flight[stream.name] = executor.submit(stream.step)
+
+                    if in_flight:
+                        done, _ = wait(in_flight.values(), timeout=0.05, return_when=FIRST_COMPLETED)
+                        for name in [n for n, f in in_flight.items() if f in done]:
+                            in_flight.pop(name).result()
+                    elif all(stream.ended for stream in self.streams.values()):
+                        break
+                    else:
+                        time.sleep(0.005)
+
+                    now = time.monotonic()
+                    self._schedule_detections(detector, detecting, now)
+                    if report_interval and now - last_report >= report_interval:
+                        self.log_stats()
+                        last_report = now
+                    if duration is not None and now - started >= duration:
+                        break
+                wait(in_flight.values())
+                wait(detecting.values())
+        finally:
+            for stream in self.streams.values():
+                stream.close()
+        self.log_stats()
+        return self.stats()
+
+
+def load_streams(path):
+    """Load stream definitions from a JSON list of {name, source, layout, ...} objects
+
+    `layout` is a binary layout file or a legacy CarParkPos-style position file; width, height,
+    occupancy_threshold, policy, loop, sampling and detection_interval are optional per stream.
+    """
+    with open(path, 'r') as f:
+        definitions = json.load(f)
+
+    streams = []
+    for definition in definitions:
+        positions, polygons = load_layout(definition['layout'])
+        streams.append(CameraStream(
+            name=definition['name'],
+            source=definition['source'],
+            positions=positions,
+            width=definition.get('width', config.PARKING_WIDTH),
+            height=definition.get('height', config.PARKING_HEIGHT),
+            occupancy_threshold=definition.get('occupancy_threshold'),
+            policy=definition.get('policy', 'drop'),
+            loop=definition.get('loop', False),
+            sampling=definition.get('sampling', config.FRAME_SAMPLING),
+            polygons=polygons,
+            detection_interval=definition.get('detection_interval', config.SUPERVISOR_DETECTION_INTERVAL)
+        ))
+    logger.info(f"Loaded {len(streams)} camera streams from {path}")
+    return streams
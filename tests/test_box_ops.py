@@ -0,0 +1,33 @@
+import numpy as np
+from box_ops import best_matches, iou_matrix, rects_to_boxes, take_matched
+
+SPACES = rects_to_boxes([(0, 0, 100, 50), (200, 0, 100, 50), (400, 0, 100, 50)])
+
+
+def test_each_space_takes_its_best_overlap_not_the_first():
+    boxes = np.array([
+        [80, 0, 180, 50],   # Grazes the first space
+        [10, 5, 105, 50],   # Sits in the first space
+        [190, 0, 290, 50],  # Sits in the second space
+    ], dtype=np.float32)
+
+    best, best_iou = best_matches(SPACES, boxes)
+
+    assert best.tolist() == [1, 2, -1]
+    np.testing.assert_allclose(best_iou[:2], iou_matrix(SPACES, boxes)[[0, 1], [1, 2]])
+    assert best_iou[2] == 0
+
+
+def test_matching_without_boxes():
+    best, best_iou = best_matches(SPACES, np.empty((0, 4)))
+
+    assert best.tolist() == [-1, -1, -1] and best_iou.tolist() == [0, 0, 0]
+    assert take_matched(np.empty(0, dtype=np.int64), best, -1).tolist() == [-1, -1, -1]
+
+
+def test_take_matched_fills_unmatched_spaces():
+    best = np.array([2, -1, 0])
+
+    assert take_matched([7, 3, 2], best, -1).tolist() == [2, -1, 7]
+    values = take_matched(np.array([0.5, 0.6, 0.9], dtype=np.float32), best, 0)
+    assert values.dtype == np.float32 and values.tolist() == [np.float32(0.9), 0, np.float32(0.5)]
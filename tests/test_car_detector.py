@@ -0,0 +1,17 @@
+import numpy as np
+from car_detector import CarDetector
+from tiled_detection import DetectionBoxes, Detections
+
+
+def test_spaces_report_their_best_overlapping_vehicle():
+    results = Detections(DetectionBoxes(
+        [[80, 0, 180, 48], [5, 2, 100, 48], [200, 0, 300, 48], [400, 0, 500, 48]],
+        cls=[2, 7, 0, 3], conf=[0.9, 0.6, 0.95, 0.8]), names={})
+    image = np.zeros((100, 600, 3), np.uint8)
+
+    _, space_status = CarDetector().process_detections(results, [(0, 0), (200, 0), (400, 0)], image)
+
+    # The grazing car loses to the truck inside the space; the person (class 0) is no vehicle
+    assert [s['vehicle_detected'] for s in space_status] == [True, False, True]
+    assert [s['vehicle_type'] for s in space_status] == [7, None, 3]
+    assert space_status[0]['confidence'] == np.float32(0.6)
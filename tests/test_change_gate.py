@@ -0,0 +1,27 @@
+import numpy as np
+from change_gate import ChangeGate
+
+RECTS = [(0, 0, 100, 48), (100, 0, 100, 48)]
+
+
+def test_sensor_noise_does_not_trigger_reclassification():
+    rng = np.random.default_rng(0)
+    gate = ChangeGate(scale=4, threshold=4.0, refresh_interval=1000)
+    gate.set_layout(RECTS)
+    base = np.full((48, 200, 3), 120, np.uint8)
+    gate.update(base)
+
+    noisy = np.clip(base + rng.normal(0, 18, base.shape), 0, 255).astype(np.uint8)
+    assert not gate.update(noisy).any()
+
+
+def test_content_change_marks_only_its_space():
+    gate = ChangeGate(scale=4, threshold=4.0, refresh_interval=1000)
+    gate.set_layout(RECTS)
+    frame = np.full((48, 200, 3), 120, np.uint8)
+    assert gate.update(frame).all()
+
+    frame[8:40, 110:190] = 30  # A car parks in the second space
+    assert gate.update(frame).tolist() == [False, True]
+    assert gate.changed.tolist() == [False, True]
+    assert not gate.update(frame).any()
@@ -0,0 +1,233 @@
+import cv2
+import numpy as np
+import pytest
+import config
+from enhanced_parking_detector import EnhancedParkingDetector
+from layout_store import LayoutStore
+from vehicle_tracker import VehicleTracker
+
+
+class FakeCarDetector:
+    """Stands in for CarDetector; returns the given (boxes, classes, confidences) every round"""
+
+    reports = 0
+
+    def __init__(self, boxes=()):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.calls = []
+        self.shapes = []
+
+    def detect_cars(self, image, rects=None):
+        self.calls.append(None if rects is None else np.asarray(rects))
+        self.shapes.append(image.shape)
+        return None
+
+    def vehicle_boxes(self, results):
+        n = len(self.boxes)
+        return self.boxes, np.full(n, 2, dtype=np.int64), np.full(n, 0.9, dtype=np.float32)
+
+    def process_detections(self, results, parking_spaces, image):
+        return [], [{'vehicle_detected': False} for _ in parking_spaces]
+
+    def generate_report(self, image, parking_spaces, detections, space_status):
+        self.reports += 1
+        return 'report.png', 'report.txt'
+
+
+@pytest.fixture
+def detector(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    detector = EnhancedParkingDetector()
+    detector.posList = LayoutStore([(0, 0), (200, 0), (0, 100)], detector.width, detector.height)
+    detector.update_layout()
+    return detector
+
+
+def test_tracking_without_any_detections(detector):
+    detector.car_detector = FakeCarDetector()
+    detector.tracker = VehicleTracker()
+    frame = np.zeros((300, 400, 3), np.uint8)
+
+    for _ in range(3):
+        detector.classify_spaces(None, frame)
+
+    np.testing.assert_array_equal(detector.space_track_id, [-1, -1, -1])
+    np.testing.assert_array_equal(detector.space_vehicle_type, [-1, -1, -1])
+    np.testing.assert_array_equal(detector.space_confidence, [0, 0, 0])
+
+
+def test_tracking_assigns_tracks_to_spaces(detector):
+    detector.car_detector = FakeCarDetector([[5, 5, 100, 45]])
+    detector.tracker = VehicleTracker()
+    frame = np.zeros((300, 400, 3), np.uint8)
+
+    detector.classify_spaces(None, frame)
+    detector.classify_spaces(None, frame)
+
+    assert detector.space_track_id[0] == 1 and detector.space_track_id[1:].tolist() == [-1, -1]
+    assert detector.space_vehicle_type[0] == 2
+    assert detector.space_track_age[0] == 1
+
+
+class FakeWorker:
+    """Stands in for DetectionWorker; takes every frame and returns one canned result"""
+
+    running = True
+    last_latency = 0.1
+
+    def __init__(self, boxes):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.seq = 0
+
+    def submit(self, frame):
+        self.seq += 1
+        return self.seq
+
+    def poll(self):
+        n = len(self.boxes)
+        return self.seq, self.boxes, np.full(n, 2, dtype=np.int64), np.full(n, 0.9, dtype=np.float32)
+
+
+def test_fusing_a_detection_without_boxes(detector):
+    detector.detection_worker = FakeWorker([])
+    occupied = np.array([True, False, True])
+
+    fused = detector._fuse_detections(np.zeros((300, 400, 3), np.uint8), occupied)
+
+    np.testing.assert_array_equal(fused, [False, False, False])
+    np.testing.assert_array_equal(detector.space_vehicle_type, [-1, -1, -1])
+    assert detector.fused_spaces == 2
+
+
+def test_changes_re_detect_only_their_region(detector, monkeypatch):
+    monkeypatch.setattr(config, 'TRACK_CHANGE_REDETECT_FRAMES', 3)
+    detector.car_detector = FakeCarDetector()
+    detector.tracker = VehicleTracker()
+    frame = np.zeros((300, 400, 3), np.uint8)
+
+    detector.classify_spaces(None, frame)
+    moved = frame.copy()
+    moved[100:148, 0:107] = 255  # A car arrives in the third space
+    for _ in range(4):
+        detector.classify_spaces(None, moved)
+
+    assert detector.detector_calls == 2 and detector.region_detections == 1
+    assert detector.car_detector.shapes[0] == frame.shape
+    height, width = detector.car_detector.shapes[1][:2]
+    assert height < 300 and width < 400
+
+
+def test_vehicle_labels(detector):
+    detector.space_vehicle_type = np.array([2, -1, 7])
+    detector.space_track_id = np.array([12, -1, -1])
+    detector.space_confidence = np.array([0.9, 0, 0.75], dtype=np.float32)
+
+    assert detector.space_vehicle_labels() == ['car #12', None, 'truck 0.75']
+
+
+def test_detect_and_report_uses_the_snapshot(detector, tmp_path):
+    detector.car_detector = FakeCarDetector()
+    positions = list(detector.posList)
+    detector.posList.clear()  # Edits made while the report runs must not leak into it
+
+    paths = detector._detect_and_report(np.zeros((300, 400, 3), np.uint8), positions,
+                                        np.array([[0, 0, 107, 48]] * 3), 2, 1)
+
+    assert paths == ('report.png', 'report.txt')
+    assert detector.car_detector.calls[0].shape == (3, 4)
+    assert (tmp_path / 'data' / 'parking_status.csv').exists()
+
+
+def test_resized_spaces_reach_every_stage(detector):
+    detector.width, detector.height = 60, 30
+    detector.update_layout()
+
+    assert detector.occupancy.rects()[:, 2:].tolist() == [[60, 30]] * 3
+    assert detector.change_gate.rects[:, 2:].tolist() == [[60, 30]] * 3
+
+
+def test_space_report_lists_tracked_vehicles(detector, tmp_path):
+    import pandas as pd
+
+    detector.space_vehicle_type = np.array([2, -1, -1])
+    detector.space_track_id = np.array([4, -1, -1])
+    detector.space_track_age = np.array([90, 0, 0])
+    detector.generate_space_report(np.array([True, False, False]))
+
+    df = pd.read_csv(tmp_path / 'data' / config.SPACE_CSV_FILE)
+    assert df['Track ID'].tolist() == [4, -1, -1]
+    assert df['Vehicle Type'].fillna('').tolist() == ['car', '', '']
+    assert df['Track Age (frames)'].tolist() == [90, 0, 0]
+
+
+def test_escalation_asks_the_occupancy_engine(detector):
+    from escalation import AmbiguityEscalator
+
+    class Detector:
+        def detect_batch(self, crops):
+            return [['vehicle']] * len(crops)
+
+    detector.change_gate = None
+    detector.escalator = AmbiguityEscalator(detector=Detector(), escalate_flips=False)
+    frame = np.zeros((300, 400, 3), np.uint8)
+    detector.occupancy.uncertain = lambda counts: np.array([False, True, False])
+
+    _, occupied = detector.classify_spaces(None, frame)
+
+    assert occupied.tolist() == [False, True, False]
+    assert detector.escalated_spaces == 1
+
+
+def test_overturned_spaces_are_not_escalated_again(detector):
+    from escalation import AmbiguityEscalator
+
+    class Detector:
+        def detect_batch(self, crops):
+            return [[]] * len(crops)
+
+    detector.change_gate = None
+    detector.escalator = AmbiguityEscalator(detector=Detector())
+    frame = np.zeros((300, 400, 3), np.uint8)
+    counts = np.array([0, 0, 0])
+    detector.occupancy.count_nonzero = lambda img_pro, indices=None: counts.copy()
+    detector.classify_spaces(None, frame)
+    counts[0] = 2000  # Far outside the ambiguity band, but YOLO sees no vehicle
+
+    _, occupied = detector.classify_spaces(None, frame)
+    assert detector.escalated_spaces == 1 and occupied.tolist() == [False, False, False]
+    for _ in range(5):
+        # No longer a flip, so the clear-cut count stands without asking YOLO again
+        detector.classify_spaces(None, frame)
+        assert detector.escalated_spaces == 0
+    assert detector.escalator.stats()['overturned'] == 1
+
+
+def test_removing_a_polygon_space_updates_the_engine(detector):
+    triangle = [(300, 100), (400, 100), (300, 200)]
+    detector.posList = LayoutStore([(0, 0), (300, 100)], detector.width, detector.height,
+                                   polygons=[None, triangle])
+    detector.update_layout()
+    assert detector.occupancy.polygons is not None
+
+    detector.mouse_callback(cv2.EVENT_RBUTTONDOWN, 390 + 50, 140 + 50, None, None)
+    assert len(detector.posList) == 2
+    detector.mouse_callback(cv2.EVENT_RBUTTONDOWN, 310 + 50, 180 + 50, None, None)
+
+    assert list(detector.posList) == [(0, 0)] and detector.space_polygons() is None
+    assert detector.occupancy.polygons is None
+
+
+def test_tracking_follows_the_detection_worker(detector):
+    detector.car_detector = FakeCarDetector([[5, 5, 100, 45]])
+    detector.detection_worker = FakeWorker([[5, 5, 100, 45]])
+    detector.tracker = VehicleTracker()
+    frame = np.zeros((300, 400, 3), np.uint8)
+
+    for _ in range(3):
+        detector.classify_spaces(None, frame)
+
+    assert detector.car_detector.calls == []  # Nothing ran on the display loop
+    assert detector.detector_calls == 3
+    assert detector.space_track_id.tolist() == [1, -1, -1]
+    assert detector.space_track_age[0] == 2
+    assert detector.space_vehicle_type.tolist() == [2, -1, -1]
@@ -0,0 +1,131 @@
+import os
+import pickle
+import numpy as np
+import pytest
+from layout_file import (HEADER, LAYOUT_DTYPES, LAYOUT_MAGIC, LayoutFile, is_layout_file, load_layout,
+                         read_journal, read_layout)
+
+POSITIONS = [(10, 20), (130, 20), (10, 80)]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'CarParkPos.layout'), str(tmp_path / 'CarParkPos')
+
+
+def test_round_trip(paths):
+    path, legacy = paths
+    LayoutFile(path, legacy).save(POSITIONS, 107, 48)
+
+    records, version = read_layout(path)
+
+    assert is_layout_file(path) and version == 2
+    assert LayoutFile(path, legacy).positions() == POSITIONS
+    assert records['width'].tolist() == [107] * 3 and records['id'].tolist() == [0, 1, 2]
+    assert not os.path.exists(path + '.journal')
+
+
+def test_edits_are_journaled_and_replayed(paths):
+    path, legacy = paths
+    layout = LayoutFile(path, legacy)
+    layout.save(POSITIONS, 107, 48)
+    base = open(path, 'rb').read()
+
+    layout.save(POSITIONS[1:] + [(250, 20)], 107, 48, changes=[('remove', (10, 20)), ('add', (250, 20))])
+
+    assert open(path, 'rb').read() == base
+    journal, _ = read_journal(path + '.journal')
+    assert journal['op'].tolist() == [2, 1]
+    reloaded = LayoutFile(path, legacy)
+    assert sorted(reloaded.positions()) == sorted(POSITIONS[1:] + [(250, 20)])
+    assert reloaded.journal_records == 2
+
+
+def test_resized_spaces_keep_their_ids(paths):
+    path, legacy = paths
+    layout = LayoutFile(path, legacy)
+    layout.save(POSITIONS, 107, 48)
+    layout.save(POSITIONS, 60, 30)
+
+    records = LayoutFile(path, legacy).load()
+
+    assert sorted(records['id'].tolist()) == [0, 1, 2]
+    assert set(records['width'].tolist()) == {60} and set(records['height'].tolist()) == {30}
+
+
+def test_a_torn_journal_record_is_ignored(paths):
+    path, legacy = paths
+    layout = LayoutFile(path, legacy)
+    layout.save(POSITIONS, 107, 48)
+    layout.save(POSITIONS + [(250, 20)], 107, 48, changes=[('add', (250, 20))])
+    with open(path + '.journal', 'ab') as f:
+        f.write(b'\x01\x00\x00')
+
+    assert LayoutFile(path, legacy).positions() == POSITIONS + [(250, 20)]
+
+
+def test_a_full_journal_is_compacted(paths):
+    path, legacy = paths
+    layout = LayoutFile(path, legacy, max_journal_records=3)
+    layout.save(POSITIONS, 107, 48)
+    positions = list(POSITIONS)
+    for x in (250, 370, 490, 610):
+        positions.append((x, 20))
+        layout.save(positions, 107, 48, changes=[('add', (x, 20))])
+
+    # Three adds fit the journal; the fourth rewrote the base file and emptied it
+    assert not os.path.exists(path + '.journal') and layout.journal_records == 0
+    records, _ = read_layout(path)
+    assert sorted(zip(records['x'].tolist(), records['y'].tolist())) == sorted(positions)
+    assert LayoutFile(path, legacy).positions() == positions
+
+
+def test_polygons_round_trip(paths):
+    path, legacy = paths
+    layout = LayoutFile(path, legacy)
+    layout.save(POSITIONS, 107, 48)
+    keys = layout.add_polygons([[(300, 100), (360, 110), (350, 160), (295, 150)]])
+
+    positions, polygons = LayoutFile(path, legacy).layout()
+
+    assert keys == [(295, 100)] and positions[-1] == (295, 100)
+    assert polygons[:3] == [None] * 3
+    np.testing.assert_array_equal(polygons[3], [[300, 100], [360, 110], [350, 160], [295, 150]])
+
+
+def test_pickled_legacy_layout_is_migrated(paths):
+    path, legacy = paths
+    with open(legacy, 'wb') as f:
+        pickle.dump(POSITIONS, f)
+    layout = LayoutFile(path, legacy)
+
+    assert layout.positions() == POSITIONS
+    assert not os.path.exists(path)
+    layout.save(POSITIONS, 107, 48)
+    assert is_layout_file(path)
+    assert LayoutFile(path, legacy_path=None).positions() == POSITIONS
+
+
+def test_text_legacy_layout_with_a_polygon(paths):
+    _, legacy = paths
+    with open(legacy, 'w') as f:
+        f.write("10,20\n300,100,360,110,350,160\n")
+
+    positions, polygons = load_layout(legacy)
+
+    assert positions == [(10, 20), (300, 100)]
+    assert polygons[0] is None and polygons[1].tolist() == [[300, 100], [360, 110], [350, 160]]
+
+
+def test_version_1_files_are_upgraded_on_save(paths):
+    path, legacy = paths
+    v1 = np.array([(0, 10, 20, 107, 48, 0, 0), (1, 130, 20, 107, 48, 0, 0)], dtype=LAYOUT_DTYPES[1])
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(LAYOUT_MAGIC, 1, v1.dtype.itemsize, 0) + v1.tobytes())
+    layout = LayoutFile(path, legacy)
+
+    assert layout.positions() == POSITIONS[:2]
+    layout.save(POSITIONS, 107, 48, changes=[('add', (10, 80))])
+
+    records, version = read_layout(path)
+    assert version == 2 and len(records) == 3 and not records['vertices'].any()
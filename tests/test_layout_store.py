@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from layout_store import LayoutStore
+
+TRIANGLE = [(300, 100), (400, 100), (300, 200)]
+
+
+def brute_force_hits(positions, width, height, x, y):
+    return [pos for pos in positions if pos[0] < x < pos[0] + width and pos[1] < y < pos[1] + height]
+
+
+@pytest.mark.parametrize('cell_size', [None, (16, 16), (250, 90)])
+def test_grid_index_matches_a_linear_scan(cell_size):
+    rng = np.random.default_rng(0)
+    positions = list(dict.fromkeys(map(tuple, rng.integers(-50, 600, (200, 2)).tolist())))
+    store = LayoutStore(positions, 107, 48, cell_size=cell_size)
+
+    for x, y in rng.integers(-60, 720, (300, 2)).tolist():
+        assert store.hit_test(x, y) == brute_force_hits(positions, 107, 48, x, y)
+    for x1, y1, w, h in rng.integers(-60, 600, (100, 4)).tolist():
+        x2, y2 = x1 + w % 150, y1 + h % 150
+        expected = [pos for pos in positions
+                    if pos[0] < x2 and pos[0] + 107 > x1 and pos[1] < y2 and pos[1] + 48 > y1]
+        assert store.query(x1, y1, x2, y2) == (expected if x2 > x1 and y2 > y1 else [])
+
+
+def test_edits_keep_the_index_current():
+    store = LayoutStore([(0, 0), (107, 0)], 107, 48)
+    store.remove((0, 0))
+    store.add((50, 20))
+
+    assert store.hit_test(60, 30) == [(50, 20)]
+    assert store.hit_test(110, 10) == [(107, 0)]
+    store.resize(30, 30)
+    assert store.hit_test(110, 10) == [(107, 0)] and store.hit_test(60, 30) == [(50, 20)]
+    assert store.hit_test(140, 10) == []
+
+
+def test_overlapping_spaces_are_rejected_on_request():
+    store = LayoutStore([(0, 0)], 107, 48)
+
+    assert not store.add((50, 20), allow_overlap=False)
+    assert store.add((107, 0), allow_overlap=False)
+    assert store.add_grid(0, 0, 214, 48, allow_overlap=False) == 0
+
+
+def test_polygons_are_hit_tested_by_their_outline():
+    store = LayoutStore([(0, 0), (300, 100)], 107, 48, polygons=[None, TRIANGLE])
+
+    assert store.hit_test(320, 120) == [(300, 100)]
+    # Inside the bounding box and the 107 x 48 rectangle, but beyond the hypotenuse
+    assert store.hit_test(390, 140) == []
+    # Inside the triangle but outside the rectangle its corner would have
+    assert store.hit_test(310, 180) == [(300, 100)]
+
+
+def test_removing_a_polygon_space():
+    store = LayoutStore([(0, 0), (300, 100)], 107, 48, polygons=[None, TRIANGLE])
+
+    assert store.remove_at(390, 140) == []
+    assert store.remove_at(310, 180) == [(300, 100)]
+    assert list(store) == [(0, 0)] and store.polygons == {}
+    assert store.drain_changes() == [('remove', (300, 100))]
+
+
+def test_polygons_survive_copies_and_resizes():
+    store = LayoutStore([(300, 100)], 107, 48, polygons=[TRIANGLE])
+    copy = store.copy()
+    store.resize(20, 20)
+
+    for layout in (store, copy):
+        np.testing.assert_array_equal(layout.polygons[(300, 100)], TRIANGLE)
+        assert layout.query(390, 190, 400, 200) == [(300, 100)]
+        assert layout.hit_test(310, 180) == [(300, 100)]
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from escalation import AmbiguityEscalator
+from occupancy_classifier import ClassifierOccupancyEngine, OccupancyClassifier, patch_features
+
+
+def synthetic_patches(count, rng, size=(64, 32)):
+    """Binary patches: occupied ones hold a filled car-sized blob, empty ones sparse line noise"""
+    w, h = size
+    labels = rng.random(count) < 0.5
+    patches = (rng.random((count, h, w)) < 0.05).astype(np.uint8) * 255
+    for patch, occupied in zip(patches, labels):
+        if occupied:
+            x, y = rng.integers(0, w // 4), rng.integers(0, h // 4)
+            patch[y:y + h // 2 + rng.integers(0, h // 4), x:x + w // 2 + rng.integers(0, w // 4)] = 255
+    return patches, labels
+
+
+def test_fit_save_load_predict(tmp_path):
+    rng = np.random.default_rng(0)
+    patches, labels = synthetic_patches(400, rng)
+    classifier = OccupancyClassifier().fit(patch_features(patches[:300]), labels[:300])
+
+    path = str(tmp_path / 'classifier.npz')
+    classifier.save(path)
+    loaded = OccupancyClassifier.load(path)
+
+    features = patch_features(patches[300:])
+    np.testing.assert_allclose(loaded.predict_proba(features), classifier.predict_proba(features), rtol=1e-6)
+    assert np.mean((loaded.predict_proba(features) >= 0.5) == labels[300:]) >= 0.95
+    assert loaded.grid == classifier.grid and loaded.patch_size == classifier.patch_size
+
+
+def test_loading_a_missing_model_explains_how_to_train(tmp_path):
+    with pytest.raises(FileNotFoundError, match='train_occupancy_classifier'):
+        OccupancyClassifier.load(str(tmp_path / 'missing.npz'))
+
+
+def test_engine_classifies_and_reports_uncertain_spaces():
+    rng = np.random.default_rng(1)
+    patches, labels = synthetic_patches(200, rng)
+    classifier = OccupancyClassifier().fit(patch_features(patches), labels)
+    engine = ClassifierOccupancyEngine([(0, 0), (64, 0)], 64, 32, classifier=classifier, threshold=0.5)
+
+    img = np.zeros((32, 128), np.uint8)
+    img[4:28, 4:56] = 255
+    counts, occupied = engine.compute(img)
+
+    assert occupied.tolist() == [True, False]
+    assert counts[0] > counts[1]
+    assert engine.uncertain(counts, band=0.5).all()
+    assert not engine.uncertain(counts, band=0.0).any()
+
+
+def test_escalator_takes_the_engine_uncertainty():
+    class Detector:
+        def detect_batch(self, crops):
+            return [['vehicle']] * len(crops)
+
+    escalator = AmbiguityEscalator(detector=Detector(), escalate_flips=False)
+    rects = np.array([[0, 0, 10, 10]] * 3)
+    occupied = escalator.resolve(np.zeros((10, 10, 3), np.uint8), rects, np.array([False, True, False]),
+                                 np.array([False, False, False]), None)
+
+    assert occupied.tolist() == [False, True, False]
+    assert escalator.stats()['escalated'] == 1
+
+
+def test_held_out_samples_are_whole_frame_blocks():
+    from train_occupancy_classifier import split_samples
+
+    train, held_out = split_samples(100, 7, 0.2, block_frames=10)
+
+    assert len(held_out) == 20 * 7 and len(train) == 80 * 7
+    assert np.intersect1d(train // 7, held_out // 7).size == 0
+    held_blocks = np.unique(held_out // 7 // 10)
+    assert len(held_blocks) == 2 and np.unique(held_out // 7).size == 20
+
+
+def test_a_single_block_is_never_held_out_entirely():
+    from train_occupancy_classifier import split_samples
+
+    train, held_out = split_samples(5, 3, 0.5, block_frames=10)
+
+    assert len(train) == 15 and len(held_out) == 0
@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+from occupancy_engine import OccupancyEngine
+
+POSITIONS = [(0, 0), (150, 40), (300, 0), (560, 200), (-30, 300)]
+
+
+def brute_force_counts(img_pro, engine):
+    """Count every space with its own full-frame mask"""
+    counts = []
+    for i, polygon in enumerate(engine.polygons):
+        mask = np.zeros(img_pro.shape, np.uint8)
+        cv2.fillPoly(mask, [polygon], 1)
+        counts.append(int(np.count_nonzero(img_pro[mask.astype(bool)])))
+    return counts
+
+
+def random_mask(seed, shape=(360, 640)):
+    return np.random.default_rng(seed).integers(0, 2, shape, dtype=np.uint8) * 255
+
+
+def test_rectangles_match_array_slicing():
+    img_pro = random_mask(0)
+    engine = OccupancyEngine(POSITIONS, 107, 48)
+
+    expected = [int(np.count_nonzero(img_pro[max(y, 0):y + 48, max(x, 0):x + 107])) for x, y in POSITIONS]
+
+    np.testing.assert_array_equal(engine.count_nonzero(img_pro), expected)
+    np.testing.assert_array_equal(engine.count_nonzero(img_pro, [3, 1]), [expected[3], expected[1]])
+
+
+def test_polygon_counts_match_per_space_masks():
+    img_pro = random_mask(1)
+    engine = OccupancyEngine()
+    polygons = [None, [(150, 40), (260, 60), (250, 120), (140, 100)], None,
+                [(560, 200), (700, 220), (600, 400)], [(-30, 300), (60, 290), (40, 380)]]
+    engine.set_layout(POSITIONS, 107, 48, polygons)
+
+    np.testing.assert_array_equal(engine.count_nonzero(img_pro), brute_force_counts(img_pro, engine))
+    assert len(engine._labels['layers']) == 1
+    # Rectangles in a polygon layout count the same pixels as without polygons
+    rectangles = OccupancyEngine(POSITIONS, 107, 48).count_nonzero(img_pro)
+    assert engine.count_nonzero(img_pro)[[0, 2]].tolist() == rectangles[[0, 2]].tolist()
+
+
+def test_overlapping_polygons_keep_all_their_pixels():
+    img_pro = random_mask(2)
+    engine = OccupancyEngine()
+    square = [(100, 100), (200, 100), (200, 200), (100, 200)]
+    shifted = [(150, 150), (250, 150), (250, 250), (150, 250)]
+    engine.set_layout([(100, 100), (150, 150), (120, 120)], 107, 48, [square, shifted, square])
+
+    counts = engine.count_nonzero(img_pro)
+
+    np.testing.assert_array_equal(counts, brute_force_counts(img_pro, engine))
+    assert counts[0] == counts[2]
+    # Every polygon overlaps both others, so each needs its own label layer
+    assert len(engine._labels['layers']) == 3
+
+
+def test_polygon_labels_follow_the_frame_size():
+    engine = OccupancyEngine()
+    engine.set_layout([(0, 0)], 107, 48, [[(0, 0), (50, 0), (50, 50), (0, 50)]])
+
+    assert engine.count_nonzero(np.full((30, 30), 255, np.uint8)).tolist() == [900]
+    assert engine.count_nonzero(np.full((100, 100), 255, np.uint8)).tolist() == [51 * 51]
@@ -0,0 +1,36 @@
+import cv2
+import numpy as np
+from parallel_analysis import analyze_chunk, analyze_video_parallel
+
+
+def write_video(path, frames=12, size=(320, 160)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 25, size)
+    rng = np.random.default_rng(0)
+    for _ in range(frames):
+        writer.write(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8))
+    writer.release()
+
+
+def test_chunks_report_their_stage_times(tmp_path):
+    video = tmp_path / 'clip.avi'
+    write_video(video)
+
+    start, series, stage_times = analyze_chunk(str(video), 4, 10, [(0, 0), (150, 80)], 107, 48)
+
+    assert start == 4 and len(series) == 6
+    assert set(stage_times) == {'decode', 'preprocess', 'occupancy'}
+    assert all(seconds > 0 for seconds in stage_times.values())
+
+
+def test_parallel_run_matches_one_chunk(tmp_path):
+    video = tmp_path / 'clip.avi'
+    write_video(video)
+    positions = [(0, 0), (150, 80)]
+
+    _, expected, _ = analyze_chunk(str(video), 0, None, positions, 107, 48)
+    frames, series, stage_times = analyze_video_parallel(str(video), positions, 107, 48, workers=2,
+                                                         chunk_frames=5)
+
+    np.testing.assert_array_equal(frames, np.arange(12))
+    np.testing.assert_array_equal(series, expected)
+    assert set(stage_times) == {'decode', 'preprocess', 'occupancy'}
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from patch_extractor import MAX_MAP_ROWS, PatchExtractor, PatchOccupancyEngine
+
+
+def grid_positions(count, width, height, columns=50):
+    return [((i % columns) * width, (i // columns) * height) for i in range(count)]
+
+
+@pytest.mark.parametrize('count', [1, 500, 1500])
+def test_extract_matches_source_rectangles(count):
+    width, height = 20, 10
+    positions = grid_positions(count, width, height)
+    rng = np.random.default_rng(count)
+    img = rng.integers(0, 256, (height * (count // 50 + 1), width * 50), dtype=np.uint8)
+
+    engine = PatchOccupancyEngine(positions, width, height, size=(width, height))
+    patches = engine.extractor.extract(img, interpolation=0)
+
+    assert patches.shape == (count, height, width)
+    for i in (0, count // 2, count - 1):
+        x, y = positions[i]
+        np.testing.assert_array_equal(patches[i], img[y:y + height, x:x + width])
+
+
+def test_large_layout_is_split_into_remap_blocks():
+    extractor = PatchExtractor(size=(64, 32))
+    quads = np.tile(np.float32([[0, 0], [63, 0], [63, 31], [0, 31]]), (1500, 1, 1))
+    extractor.set_layout(quads)
+
+    assert len(extractor._maps) > 1
+    assert all(len(map1) <= MAX_MAP_ROWS and len(map1) % 32 == 0 for _, map1, _, _ in extractor._maps)
+    assert extractor.extract(np.full((32, 64), 255, np.uint8)).min() == 255
+
+
+def test_counts_use_canonical_patch_pixels():
+    engine = PatchOccupancyEngine([(0, 0), (40, 0)], 40, 20, threshold=0.5, size=(8, 4))
+    img = np.zeros((20, 80), np.uint8)
+    img[:, :40] = 255
+
+    counts, occupied = engine.compute(img)
+    np.testing.assert_array_equal(counts, [32, 0])
+    np.testing.assert_array_equal(occupied, [True, False])
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from occupancy_engine import OccupancyEngine
+from preprocess_pipeline import PreprocessPipeline
+
+# Spaces touching every frame edge, one hanging off it, and a few in the interior
+POSITIONS = [(0, 0), (533, 0), (0, 432), (533, 432), (-20, 200), (600, 300), (200, 150), (320, 150), (260, 300)]
+
+
+def full_frame_pipeline():
+    pipeline = PreprocessPipeline()
+    pipeline.use_roi = False
+    return pipeline
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_roi_tiles_match_a_full_frame_run(seed):
+    frame = np.random.default_rng(seed).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    engine = OccupancyEngine(POSITIONS, 107, 48)
+    tiled = PreprocessPipeline()
+    tiled.use_roi = True
+    tiled.set_regions(engine.rects())
+
+    counts = engine.count_nonzero(tiled.process(frame))
+
+    assert tiled.tiles is not None
+    np.testing.assert_array_equal(counts, engine.count_nonzero(full_frame_pipeline().process(frame)))
+
+
+def test_roi_pixels_match_inside_every_space():
+    frame = np.random.default_rng(3).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    engine = OccupancyEngine(POSITIONS, 107, 48)
+    tiled = PreprocessPipeline()
+    tiled.use_roi = True
+    tiled.set_regions(engine.rects())
+
+    roi = tiled.process(frame).copy()
+    full = full_frame_pipeline().process(frame)
+
+    for x, y, w, h in engine.rects().tolist():
+        x1, y1 = max(x, 0), max(y, 0)
+        np.testing.assert_array_equal(roi[y1:y + h, x1:x + w], full[y1:y + h, x1:x + w])
@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+import pytest
+from stream_supervisor import CameraStream, StreamSupervisor
+
+POSITIONS = [(0, 0), (120, 0), (0, 60), (120, 60)]
+
+
+class FakeCarDetector:
+    """Stands in for CarDetector; returns the given vehicle boxes every round"""
+
+    def __init__(self, boxes=((0, 0, 107, 48), (0, 60, 107, 108))):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+    def detect_cars(self, image, rects=None):
+        return None
+
+    def vehicle_boxes(self, results):
+        n = len(self.boxes)
+        return self.boxes, np.full(n, 2, dtype=np.int64), np.full(n, 0.9, dtype=np.float32)
+
+
+@pytest.fixture
+def clip(tmp_path):
+    path = str(tmp_path / 'clip.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (240, 120))
+    for _ in range(10):
+        writer.write(np.zeros((120, 240, 3), np.uint8))
+    writer.release()
+    return path
+
+
+def test_detections_run_on_the_shared_model(clip):
+    stream = CameraStream('lot', clip, POSITIONS, policy='block', sampling=False, detection_interval=0)
+    supervisor = StreamSupervisor([stream])
+    supervisor._car_detector = FakeCarDetector()
+
+    stats = supervisor.run(duration=5, report_interval=None)
+
+    assert stats['lot']['frames'] == 10
+    assert stats['lot']['detections'] >= 1
+    np.testing.assert_array_equal(stream.vehicle_detected, [True, False, True, False])
+
+
+def test_detections_match_the_stream_layout():
+    polygon = np.array([[120, 0], [150, 0], [150, 30], [120, 30]])
+    stream = CameraStream('lot', 'unused.avi', POSITIONS, width=60, height=30,
+                          polygons=[None, polygon, None, None])
+    stream.last_frame = np.zeros((120, 240, 3), np.uint8)
+    supervisor = StreamSupervisor([stream])
+    # The first box only fits the stream's 60x30 spaces; the second covers the polygon
+    supervisor._car_detector = FakeCarDetector([(0, 0, 60, 30), (120, 0, 151, 31)])
+
+    detected = supervisor.detect_vehicles('lot')
+
+    np.testing.assert_array_equal(detected, [True, True, False, False])
+    np.testing.assert_array_equal(stream.space_vehicle_type, [2, 2, -1, -1])
+
+
+def test_a_stream_that_cannot_open_does_not_stop_the_others(clip):
+    good = CameraStream('good', clip, POSITIONS, policy='block', sampling=False)
+    bad = CameraStream('bad', 'missing.avi', POSITIONS)
+
+    stats = StreamSupervisor([good, bad]).run(duration=5, report_interval=None)
+
+    assert stats['good']['frames'] == 10
+    assert stats['bad']['frames'] == 0 and bad.error is not None
+
+
+def test_no_stream_opens():
+    with pytest.raises(IOError):
+        StreamSupervisor([CameraStream('bad', 'missing.avi', POSITIONS)]).run(duration=1)
@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+from box_ops import merge_nms, nms
+from tiled_detection import DetectionBoxes, TiledDetector, tile_grid
+
+
+class BlobModel:
+    """Stands in for YOLO: reports every white blob in a tile, cut off at the tile edge
+
+    The confidence is the fraction of the blob visible, so a car cut by a seam scores lower.
+    """
+
+    names = {2: 'car'}
+
+    def __init__(self, areas):
+        self.areas = areas  # Full area of each blob, keyed by its class
+        self.calls = 0
+
+    def __call__(self, crops, **kwargs):
+        self.calls += 1
+        outputs = []
+        for crop in crops:
+            count, _, stats, _ = cv2.connectedComponentsWithStats(crop[:, :, 0])
+            boxes = [(x, y, x + w, y + h) for x, y, w, h, _ in stats[1:count].tolist()]
+            classes = [int(crop[y1, x1, 1]) for x1, y1, _, _ in boxes]
+            conf = [w * h / self.areas[c] for (x1, y1, x2, y2), c in zip(boxes, classes)
+                    for w, h in [(x2 - x1, y2 - y1)]]
+
+            class Output:
+                pass
+            output = Output()
+            output.boxes = DetectionBoxes(boxes, classes, conf)
+            outputs.append(output)
+        return outputs
+
+
+def draw_car(image, box, class_id=2):
+    x1, y1, x2, y2 = box
+    image[y1:y2, x1:x2] = (255, class_id, 0)
+
+
+def test_tiles_cover_the_region_with_the_overlap():
+    tiles = tile_grid((100, 50, 1500, 700), 640, 128)
+
+    xs = sorted({x for x, _, _, _ in tiles})
+    assert xs[0] == 100 and xs[-1] + 640 == 1500
+    assert all(b - a <= 640 - 128 for a, b in zip(xs, xs[1:]))
+    assert all(w == 640 and h == 640 for _, _, w, h in tiles)
+
+
+def test_a_car_on_a_tile_seam_is_reported_once():
+    image = np.zeros((600, 1100, 3), np.uint8)
+    car = (480, 200, 620, 260)  # Inside the overlap of the two tiles (x 460 to 640)
+    draw_car(image, car)
+    model = BlobModel({2: 140 * 60})
+
+    results = TiledDetector(model, tile_size=640, overlap=128).detect(image)
+
+    assert results.stats['tiles'] == 2 and results.stats['raw_detections'] == 2
+    np.testing.assert_array_equal(results.boxes.xyxy, [car])
+
+
+def test_a_car_cut_by_a_tile_edge_merges_with_its_full_detection():
+    image = np.zeros((600, 1100, 3), np.uint8)
+    car = (600, 300, 900, 360)  # Fully inside the right tile, cut by the left tile's edge at x 640
+    draw_car(image, car)
+    model = BlobModel({2: 300 * 60})
+
+    results = TiledDetector(model, tile_size=640, overlap=128).detect(image)
+
+    assert results.stats['raw_detections'] == 2
+    np.testing.assert_array_equal(results.boxes.xyxy, [car])
+    assert results.boxes.conf.tolist() == [1.0]
+
+
+def test_neighbouring_cars_are_kept_apart():
+    image = np.zeros((600, 1100, 3), np.uint8)
+    draw_car(image, (100, 100, 220, 160))
+    draw_car(image, (100, 161, 220, 221), class_id=7)
+    draw_car(image, (900, 100, 1020, 160))
+    model = BlobModel({2: 120 * 60, 7: 120 * 60})
+
+    results = TiledDetector(model, tile_size=640, overlap=128).detect(image)
+
+    assert len(results.boxes) == 3 and sorted(results.boxes.cls.tolist()) == [2, 2, 7]
+
+
+def test_nms_keeps_the_best_box_of_each_class():
+    boxes = [[0, 0, 100, 50], [5, 0, 105, 50], [0, 0, 100, 50], [300, 0, 400, 50]]
+
+    assert nms(boxes, [0.6, 0.9, 0.8, 0.5], 0.5).tolist() == [1, 3]
+    assert nms(boxes, [0.6, 0.9, 0.8, 0.5], 0.5, classes=[2, 2, 7, 2]).tolist() == [1, 2, 3]
+    keep, merged = merge_nms(boxes, [0.6, 0.9, 0.8, 0.5], 0.5, containment_threshold=0.8)
+    assert keep.tolist() == [1, 3] and merged[0].tolist() == [0, 0, 105, 50]
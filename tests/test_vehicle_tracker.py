@@ -0,0 +1,67 @@
+import numpy as np
+from vehicle_tracker import VehicleTracker
+
+CAR = [0, 0, 100, 50]
+OTHER = [300, 0, 400, 50]
+
+
+def update(tracker, boxes, region=None):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    tracker.update(boxes, np.full(len(boxes), 2), np.full(len(boxes), 0.9), region)
+
+
+def test_detections_continue_overlapping_tracks():
+    tracker = VehicleTracker(iou_threshold=0.3, max_misses=2)
+    update(tracker, [CAR, OTHER])
+    update(tracker, [[310, 0, 410, 50], [5, 0, 105, 50]])
+
+    assert tracker.ids.tolist() == [1, 2]
+    assert tracker.boxes[0].tolist() == [5, 0, 105, 50]
+    assert tracker.ages.tolist() == [1, 1]
+
+
+def test_each_detection_continues_at_most_one_track():
+    tracker = VehicleTracker(iou_threshold=0.3)
+    update(tracker, [CAR])
+    update(tracker, [[2, 0, 102, 50], [0, 0, 100, 50]])
+
+    # The better match continues track 1, the other detection starts track 2
+    assert tracker.ids.tolist() == [1, 2]
+    assert tracker.boxes[0].tolist() == CAR
+
+
+def test_unmatched_tracks_expire_after_max_misses():
+    tracker = VehicleTracker(max_misses=2)
+    update(tracker, [CAR])
+    update(tracker, [])
+    update(tracker, [])
+    assert tracker.ids.tolist() == [1]
+    update(tracker, [])
+    assert len(tracker) == 0
+
+
+def test_ids_stay_stable_across_steps_and_are_never_reused():
+    tracker = VehicleTracker(max_misses=0)
+    update(tracker, [CAR, OTHER])
+    for _ in range(5):
+        tracker.step()
+    update(tracker, [OTHER])
+    update(tracker, [CAR, OTHER])
+
+    assert tracker.ids.tolist() == [2, 3]
+    assert tracker.ages.tolist() == [7, 0]
+
+
+def test_regional_update_leaves_tracks_outside_the_region_alone():
+    tracker = VehicleTracker(max_misses=0)
+    update(tracker, [CAR, OTHER])
+    update(tracker, [], region=(250, 0, 450, 60))
+
+    assert tracker.ids.tolist() == [1]
+
+
+def test_assign_maps_spaces_to_tracks():
+    tracker = VehicleTracker()
+    assert tracker.assign(np.float32([CAR])).tolist() == [-1]
+    update(tracker, [CAR])
+    assert tracker.assign(np.float32([[0, 0, 107, 48], [200, 0, 307, 48]])).tolist() == [0, -1]
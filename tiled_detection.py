@@ -0,0 +1,130 @@
+"""
+Tiled YOLO inference for high-resolution parking lot cameras
+Runs the model on overlapping native-resolution tiles of the layout region and merges them with cross-tile NMS
+"""
+import time
+import numpy as np
+import config
+import logging
+from box_ops import merge_nms, to_numpy
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class DetectionBoxes:
+    """NumPy detections exposing the xyxy, cls and conf fields of ultralytics Results.boxes"""
+
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.cls = np.asarray(cls, dtype=np.float32)
+        self.conf = np.asarray(conf, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+class Detections:
+    """Detections of one image, usable wherever a single ultralytics Results is expected"""
+
+    def __init__(self, boxes, names, stats=None):
+        self.boxes = boxes
+        self.names = names
+        self.stats = stats or {}
+
+
+def layout_region(rects, shape, margin=config.TILE_REGION_MARGIN):
+    """Return the (x1, y1, x2, y2) bounding region of (N, 4) layout rectangles, padded and clipped"""
+    h, w = shape[:2]
+    rects = np.asarray(rects).reshape(-1, 4)
+    if len(rects) == 0:
+        return 0, 0, w, h
+    x1 = max(int(rects[:, 0].min()) - margin, 0)
+    y1 = max(int(rects[:, 1].min()) - margin, 0)
+    x2 = min(int((rects[:, 0] + rects[:, 2]).max()) + margin, w)
+    y2 = min(int((rects[:, 1] + rects[:, 3]).max()) + margin, h)
+    if x2 <= x1 or y2 <= y1:
+        return 0, 0, w, h
+    return x1, y1, x2, y2
+
+
+def tile_starts(length, tile_size, overlap):
+    """Return evenly spaced tile offsets covering [0, length), overlapping by at least `overlap`"""
+    if length <= tile_size:
+        return [0]
+    count = -(-(length - overlap) // max(1, tile_size - overlap))
+    return np.linspace(0, length - tile_size, max(count, 2)).round().astype(int).tolist()
+
+
+def tile_grid(region, tile_size, overlap):
+    """Return the (x, y, width, height) tiles covering an (x1, y1, x2, y2) region"""
+    x1, y1, x2, y2 = region
+    return [(x1 + tx, y1 + ty, min(tile_size, x2 - x1), min(tile_size, y2 - y1))
+            for ty in tile_starts(y2 - y1, tile_size, overlap)
+            for tx in tile_starts(x2 - x1, tile_size, overlap)]
+
+
+class TiledDetector:
+    def __init__(self, model, tile_size=config.TILE_SIZE, overlap=config.TILE_OVERLAP,
+                 batch_size=config.TILE_BATCH_SIZE, confidence_threshold=config.CONFIDENCE_THRESHOLD,
+                 classes=config.CAR_CLASSES, nms_iou=config.TILE_NMS_IOU,
+                 nms_containment=config.TILE_NMS_CONTAINMENT):
+        """Initialize the detector around a loaded YOLO model"""
+        self.model = model
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.confidence_threshold = confidence_threshold
+        self.classes = classes
+        self.nms_iou = nms_iou
+        self.nms_containment = nms_containment
+        self.last_stats = {}
+
+    def detect(self, image, region=None):
+        """Detect vehicles in the (x1, y1, x2, y2) region of image (default: all of it)
+
+        Boxes are returned in image coordinates.
+        """
+        h, w = image.shape[:2]
+        region = region or (0, 0, w, h)
+        tiles = tile_grid(region, self.tile_size, self.overlap)
+        started = time.perf_counter()
+
+        boxes, classes, confidences = [], [], []
+        for start in range(0, len(tiles), self.batch_size):
+            batch = tiles[start:start + self.batch_size]
+            crops = [image[y:y + th, x:x + tw] for x, y, tw, th in batch]
+            outputs = self.model(crops, imgsz=self.tile_size, conf=self.confidence_threshold,
+                                 classes=self.classes, verbose=False)
+            for (x, y, _, _), output in zip(batch, outputs):
+                if output.boxes is None or len(output.boxes) == 0:
+                    continue
+                boxes.append(to_numpy(output.boxes.xyxy) + [x, y, x, y])
+                classes.append(to_numpy(output.boxes.cls))
+                confidences.append(to_numpy(output.boxes.conf))
+
+        if boxes:
+            boxes, classes, confidences = np.concatenate(boxes), np.concatenate(classes), np.concatenate(confidences)
+        else:
+            boxes, classes, confidences = np.empty((0, 4)), np.empty(0), np.empty(0)
+        # Merge duplicates from overlapping tiles, including cars cut in half by a tile edge
+        keep, merged = merge_nms(boxes, confidences, self.nms_iou, classes, self.nms_containment)
+        elapsed = time.perf_counter() - started
+
+        x1, y1, x2, y2 = region
+        self.last_stats = {
+            'tiles': len(tiles),
+            'raw_detections': len(boxes),
+            'detections': len(keep),
+            'seconds': elapsed,
+            'tiles_per_second': len(tiles) / elapsed if elapsed > 0 else 0.0,
+            'megapixels_per_second': (x2 - x1) * (y2 - y1) / 1e6 / elapsed if elapsed > 0 else 0.0,
+        }
+        logger.info(f"Tiled detection: {len(tiles)} tiles in {elapsed * 1000:.0f} ms "
+                    f"({self.last_stats['tiles_per_second']:.1f} tiles/s, "
+                    f"{self.last_stats['megapixels_per_second']:.1f} MP/s), "
+                    f"{len(boxes)} raw -> {len(keep)} detections")
+
+        return Detections(DetectionBoxes(merged, classes[keep], confidences[keep]),
+                          self.model.names, self.last_stats)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Train the occupancy classifier used by OCCUPANCY_BACKEND = 'classifier'
+Labels are bootstrapped from YOLO vehicle boxes on frames of our own footage
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+import config
+import logging
+from box_ops import best_matches, rects_to_boxes
+from car_detector import CarDetector
+from inference_backend import calibration_frames
+from layout_file import LayoutFile
+from occupancy_classifier import ClassifierOccupancyEngine, OccupancyClassifier, patch_features
+from occupancy_engine import OccupancyEngine
+from patch_extractor import PatchOccupancyEngine
+from preprocess_pipeline import PreprocessPipeline
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def collect_samples(frames, positions, polygons=None, min_iou=config.ASYNC_DETECTION_MIN_IOU):
+    """Return (features, labels, pixel_occupied) for every space of every frame
+
+    A space is labeled occupied when a YOLO vehicle box overlaps it with IoU >= min_iou,
+    matched against the same layout geometry the patches are rectified from (the bounding
+    box of polygon spaces), so a neighbour's bumper does not count. pixel_occupied is the
+    decision of the pixel-count backend, kept for comparison.
+    """
+    width, height = config.PARKING_WIDTH, config.PARKING_HEIGHT
+    patches = PatchOccupancyEngine(width=width, height=height)
+    patches.set_layout(positions, polygons=polygons)
+    pixels = OccupancyEngine(width=width, height=height)
+    pixels.set_layout(positions, polygons=polygons)
+    preprocess = PreprocessPipeline()
+    preprocess.set_regions(pixels.rects())
+    detector = CarDetector()
+    space_boxes = rects_to_boxes(patches.rects())
+
+    features, labels, pixel_occupied = [], [], []
+    for i, frame in enumerate(frames):
+        img_pro = preprocess.process(frame)
+        features.append(patch_features(patches.extractor.extract(img_pro, cv2.INTER_NEAREST)))
+        pixel_occupied.append(pixels.compute(img_pro)[1])
+        boxes, _, _ = detector.vehicle_boxes(detector.detect_cars(frame, pixels.rects()))
+        _, best_iou = best_matches(space_boxes, boxes)
+        labels.append(best_iou >= min_iou)
+        logger.info(f"Labeled frame {i + 1}/{len(frames)}: {int(np.sum(labels[-1]))}/{len(positions)} occupied")
+    return np.concatenate(features), np.concatenate(labels), np.concatenate(pixel_occupied)
+
+
+def split_samples(frame_count, spaces, validation, block_frames=10, seed=0):
+    """Return (train, held_out) sample indices, holding out whole blocks of consecutive frames
+
+    Samples are ordered frame by frame, as from collect_samples. Neighbouring frames give
+    nearly identical patches, so they stay on the same side of the split instead of
+    inflating the held-out agreement.
+    """
+    blocks = np.arange(frame_count) // block_frames
+    block_count = int(blocks[-1]) + 1 if frame_count else 0
+    held_count = min(int(round(block_count * validation)), block_count - 1) if validation > 0 else 0
+    held_blocks = np.random.default_rng(seed).permutation(block_count)[:max(held_count, 0)]
+    held = np.repeat(np.isin(blocks, held_blocks), spaces)
+    return np.flatnonzero(~held), np.flatnonzero(held)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the per-space occupancy classifier')
+    parser.add_argument('--source', default=config.DEFAULT_VIDEO_PATH,
+                        help='Video, image or image directory with frames of the lot')
+    parser.add_argument('--frames', type=int, default=100, help='Frames sampled evenly from the source')
+    parser.add_argument('--output', default=config.OCCUPANCY_CLASSIFIER_PATH)
+    parser.add_argument('--validation', type=float, default=0.2, help='Fraction of frames held out')
+    parser.add_argument('--block-frames', type=int, default=10,
+                        help='Consecutive frames held out or trained on together')
+    args = parser.parse_args()
+
+    positions, polygons = LayoutFile().layout()
+    if not positions:
+        parser.error("No parking layout found; mark the spaces first")
+    frames = calibration_frames(args.source, args.frames)
+    features, labels, pixel_occupied = collect_samples(frames, positions, polygons)
+
+    train, held_out = split_samples(len(frames), len(positions), args.validation, args.block_frames)
+    classifier = OccupancyClassifier().fit(features[train], labels[train])
+    classifier.save(args.output)
+
+    print(f"\nTrained on {len(train)} space samples from {len(train) // len(positions)} frames; "
+          f"saved to {args.output}")
+    if len(held_out):
+        predicted = classifier.predict_proba(features[held_out]) >= config.CLASSIFIER_PROBABILITY
+        print(f"Held-out agreement with YOLO labels on {len(held_out) // len(positions)} frames "
+              f"(blocks of {args.block_frames}): classifier {np.mean(predicted == labels[held_out]):.3f}, "
+              f"pixel count {np.mean(pixel_occupied[held_out] == labels[held_out]):.3f}")
+
+    # Batched inference cost of the whole tier on one frame
+    engine = ClassifierOccupancyEngine(width=config.PARKING_WIDTH, height=config.PARKING_HEIGHT,
+                                       classifier=classifier)
+    engine.set_layout(positions, polygons=polygons)
+    preprocess = PreprocessPipeline()
+    preprocess.set_regions(engine.rects())
+    img_pro = preprocess.process(frames[0])
+    started = time.perf_counter()
+    for _ in range(20):
+        engine.compute(img_pro)
+    per_space = (time.perf_counter() - started) / 20 / len(positions)
+    print(f"Classifier tier: {per_space * 1e6:.1f} us per space ({len(positions)} spaces per call)")
+
+
+if __name__ == "__main__":
+    main()
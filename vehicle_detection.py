@@ -0,0 +1,116 @@
+"""
+Batched vehicle detection for parking space crops
+Letterboxes many small crops to one input size so YOLO classifies them in a few batched calls
+"""
+import threading
+import cv2
+import numpy as np
+import config
+import logging
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LETTERBOX_FILL = 114  # Padding value YOLO models are trained with
+
+
+def letterbox(image, size, dst=None):
+    """Fit image into a (width, height) canvas keeping its aspect ratio
+
+    Returns (canvas, scale, (pad_x, pad_y)) where canvas coordinates map back to the
+    image as (canvas - pad) / scale.
+    """
+    w, h = size
+    ih, iw = image.shape[:2]
+    scale = min(w / iw, h / ih)
+    nw, nh = max(1, round(iw * scale)), max(1, round(ih * scale))
+    pad_x, pad_y = (w - nw) // 2, (h - nh) // 2
+
+    if dst is None:
+        dst = np.empty((h, w, 3), dtype=np.uint8)
+    dst[:] = LETTERBOX_FILL
+    cv2.resize(image, (nw, nh), dst=dst[pad_y:pad_y + nh, pad_x:pad_x + nw], interpolation=cv2.INTER_LINEAR)
+    return dst, scale, (pad_x, pad_y)
+
+
+class VehicleDetector:
+    def __init__(self, model_path=config.MODEL_PATH, confidence_threshold=config.CONFIDENCE_THRESHOLD,
+                 input_size=config.CROP_INPUT_SIZE, batch_size=config.CROP_BATCH_SIZE,
+                 backend=config.INFERENCE_BACKEND, int8=config.INFERENCE_INT8):
+        """Initialize the detector; input_size is the (width, height) every crop is letterboxed to
+
+        The model is loaded on first use through the configured inference backend.
+        """
+        self.model_path = model_path
+        self.backend = backend
+        self.int8 = int8
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.confidence_threshold = confidence_threshold
+        self.input_size = tuple(input_size)
+        self.batch_size = batch_size
+        self.vehicle_classes = config.CAR_CLASSES
+
+    @property
+    def model(self):
+        """The YOLOv8 model, imported and loaded on first access"""
+        with self._model_lock:
+            if self._model is None:
+                self._model = self._load_model()
+            return self._model
+
+    def _load_model(self):
+        logger.info(f"Loading YOLOv8 model from {self.model_path} ({self.backend} backend)...")
+        try:
+            # Importing ultralytics pulls in torch, so it waits until the model is needed
+            from inference_backend import load_model
+            return load_model(self.backend, self.model_path, self.int8)
+        except Exception as e:
+            logger.error(f"Error loading YOLO model: {e}")
+            raise IOError(f"Failed to load YOLO model from {self.model_path}: {e}")
+
+    def detect(self, image):
+        """Return the vehicle detections in a single image"""
+        return self.detect_batch([image])[0]
+
+    def detect_batch(self, images):
+        """Return one list of detections per image, in input order
+
+        Each detection is a dict with class_id, class_name, confidence and bbox
+        (x1, y1, x2, y2 in the coordinates of its own image).
+        """
+        w, h = self.input_size
+        results = [[] for _ in images]
+        valid = [i for i, image in enumerate(images) if image is not None and image.size]
+        canvases = np.empty((self.batch_size, h, w, 3), dtype=np.uint8)
+
+        for start in range(0, len(valid), self.batch_size):
+            indices = valid[start:start + self.batch_size]
+            transforms = []
+            for slot, i in enumerate(indices):
+                _, scale, pad = letterbox(images[i], self.input_size, canvases[slot])
+                transforms.append((scale, pad))
+
+            # Inputs already match imgsz, so the model's own letterboxing is a no-op
+            batch = [canvases[slot] for slot in range(len(indices))]
+            outputs = self.model(batch, imgsz=(h, w), conf=self.confidence_threshold,
+                                 classes=self.vehicle_classes, verbose=False)
+
+            for i, (scale, (pad_x, pad_y)), output in zip(indices, transforms, outputs):
+                boxes = output.boxes
+                if boxes is None or len(boxes) == 0:
+                    continue
+                xyxy = boxes.xyxy.cpu().numpy()
+                xyxy = (xyxy - [pad_x, pad_y, pad_x, pad_y]) / scale
+                ih, iw = images[i].shape[:2]
+                xyxy = np.clip(xyxy, 0, [iw, ih, iw, ih])
+                for box, cls, conf in zip(xyxy.tolist(), boxes.cls.cpu().numpy().astype(int).tolist(),
+                                          boxes.conf.cpu().numpy().tolist()):
+                    results[i].append({
+                        'class_id': cls,
+                        'class_name': output.names[cls],
+                        'confidence': conf,
+                        'bbox': tuple(round(v) for v in box),
+                    })
+        return results
@@ -0,0 +1,81 @@
+"""
+Lightweight IoU vehicle tracker for parking space detection
+Carries detected vehicle boxes across frames with a constant-position model, so parked cars keep
+one track id and the detector only has to rerun occasionally
+"""
+import numpy as np
+import config
+from box_ops import best_matches, iou_matrix
+
+
+class VehicleTracker:
+    def __init__(self, iou_threshold=config.TRACK_IOU_THRESHOLD, max_misses=config.TRACK_MAX_MISSES):
+        """Initialize an empty tracker
+
+        A detection continues a track when their IoU reaches iou_threshold; a track is dropped
+        after max_misses consecutive detection rounds without a match.
+        """
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.classes = np.empty(0, dtype=np.int64)
+        self.confidences = np.empty(0, dtype=np.float32)
+        self.ages = np.empty(0, dtype=np.int64)  # Frames since each track started
+        self.misses = np.empty(0, dtype=np.int64)
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    def step(self):
+        """Advance one frame without a detection; parked vehicles are assumed not to move"""
+        self.ages += 1
+
+    def update(self, boxes, classes, confidences, region=None):
+        """Advance one frame and associate new detections with the existing tracks
+
+        With region (x1, y1, x2, y2) the detections cover only that part of the frame: only
+        tracks centered inside it can be matched or missed, the others are left as they are.
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        classes = np.asarray(classes, dtype=np.int64)
+        confidences = np.asarray(confidences, dtype=np.float32)
+        self.step()
+
+        observed = np.ones(len(self.ids), dtype=bool)
+        if region is not None:
+            x1, y1, x2, y2 = region
+            cx = (self.boxes[:, 0] + self.boxes[:, 2]) / 2
+            cy = (self.boxes[:, 1] + self.boxes[:, 3]) / 2
+            observed = (cx >= x1) & (cx < x2) & (cy >= y1) & (cy < y2)
+
+        # Greedy association, best IoU first
+        iou = iou_matrix(self.boxes, boxes)
+        pairs = np.argwhere((iou >= self.iou_threshold) & observed[:, None])
+        pairs = pairs[np.argsort(-iou[pairs[:, 0], pairs[:, 1]], kind='stable')]
+        track_used = np.zeros(len(self.ids), dtype=bool)
+        detection_used = np.zeros(len(boxes), dtype=bool)
+        for t, d in pairs.tolist():
+            if not track_used[t] and not detection_used[d]:
+                track_used[t] = detection_used[d] = True
+                self.boxes[t] = boxes[d]
+                self.classes[t] = classes[d]
+                self.confidences[t] = confidences[d]
+                self.misses[t] = 0
+
+        self.misses[observed & ~track_used] += 1
+        keep = self.misses <= self.max_misses
+        new = ~detection_used
+        count = int(np.count_nonzero(new))
+        self.boxes = np.concatenate([self.boxes[keep], boxes[new]])
+        self.ids = np.concatenate([self.ids[keep], np.arange(self._next_id, self._next_id + count)])
+        self.classes = np.concatenate([self.classes[keep], classes[new]])
+        self.confidences = np.concatenate([self.confidences[keep], confidences[new]])
+        self.ages = np.concatenate([self.ages[keep], np.zeros(count, dtype=np.int64)])
+        self.misses = np.concatenate([self.misses[keep], np.zeros(count, dtype=np.int64)])
+        self._next_id += count
+
+    def assign(self, space_boxes):
+        """Return the index of the track overlapping each (x1, y1, x2, y2) space most, or -1"""
+        return best_matches(space_boxes, self.boxes)[0]